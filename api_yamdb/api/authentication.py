@@ -0,0 +1,146 @@
+"""
+JWT-аутентификация с кешем в памяти процесса.
+
+Расшифрованные токены и "слепок" юзера (id, username, role,
+is_superuser, is_active) хранятся в ограниченных LRU-кешах с TTL,
+так что проверка прав не ходит в базу на каждый запрос.
+Слепок сбрасывается сигналами при изменении или удалении юзера
+(см. api.signals); в других процессах он устаревает не дольше TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed, InvalidToken
+)
+from rest_framework_simplejwt.settings import api_settings
+
+from reviews.models import User
+
+DEFAULTS = {
+    'MAX_SIZE': 10000,
+    'TTL': 300,
+}
+SNAPSHOT_FIELDS = {'id', 'username', 'role', 'is_superuser', 'is_active'}
+# Model.from_db ожидает значения в порядке полей модели.
+USER_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in SNAPSHOT_FIELDS
+)
+
+
+def get_setting(name):
+    return getattr(settings, 'JWT_AUTH_CACHE', {}).get(name, DEFAULTS[name])
+
+
+class LRUCache:
+    """Потокобезопасный LRU-кеш с ограниченным размером и TTL записей."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            item = self.data.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self.data[key]
+                self.misses += 1
+                return None
+            self.data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self.lock:
+            self.data[key] = (time.monotonic() + ttl, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_size:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'size': len(self.data),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+token_cache = LRUCache(get_setting('MAX_SIZE'), get_setting('TTL'))
+user_cache = LRUCache(get_setting('MAX_SIZE'), get_setting('TTL'))
+
+
+def forget_user(user_id):
+    """Сбрасывает закешированный слепок юзера."""
+    user_cache.delete(user_id)
+
+
+def clear_caches():
+    token_cache.clear()
+    user_cache.clear()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication, который не расшифровывает повторно
+    уже виденные токены и не читает юзера из базы, пока его
+    слепок есть в кеше. request.user - инстанс :model:'reviews.User'
+    с загруженными полями слепка; остальные поля догружаются
+    из базы при первом обращении.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = token_cache.get(raw_token)
+        if token is not None:
+            return token
+        token = super().get_validated_token(raw_token)
+        expires_in = token.payload.get('exp', 0) - time.time()
+        token_cache.set(raw_token, token, expires_in)
+        return token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification')
+            )
+        values = user_cache.get(user_id)
+        if values is None:
+            values = User.objects.filter(
+                **{api_settings.USER_ID_FIELD: user_id}
+            ).values_list(*USER_FIELDS).first()
+            if values is None:
+                raise AuthenticationFailed(
+                    _('User not found'), code='user_not_found'
+                )
+            user_cache.set(user_id, values)
+        user = User.from_db(DEFAULT_DB_ALIAS, USER_FIELDS, values)
+        if not user.is_active:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive'
+            )
+        return user
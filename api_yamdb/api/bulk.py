@@ -0,0 +1,132 @@
+"""
+Пакетное создание и обновление произведений (v1/titles/bulk/).
+
+Слаги категорий и жанров всех элементов разрешаются одним запросом
+на модель, произведения и связи TitleGenre пишутся через bulk_create,
+поэтому число запросов не зависит от размера пакета. Обновление
+пишет только поля, переданные в элементе; жанры элемента заменяют
+прежние целиком. Все элементы
+проверяются до записи: при любой ошибке в базе ничего не меняется.
+"""
+from django.db import connection, transaction
+from django.utils import timezone
+
+from reviews.models import Category, Genre, Title, TitleGenre
+
+from . import cache
+
+MAX_ITEMS = 1000
+TITLE_FIELDS = ('name', 'year', 'description', 'category')
+
+
+def unique(values):
+    """Убирает повторы, сохраняя порядок."""
+    return list(dict.fromkeys(values))
+
+
+def resolve(items):
+    """
+    Разрешает слаги и id всего пакета. Возвращает словари
+    slug -> id для категорий и жанров и список ошибок по элементам.
+    """
+    category_slugs = {item['category'] for item in items
+                      if item.get('category')}
+    genre_slugs = {slug for item in items for slug in item['genre']}
+    ids = {item['id'] for item in items if 'id' in item}
+    categories = dict(
+        Category.objects.filter(slug__in=category_slugs)
+        .values_list('slug', 'id')
+    ) if category_slugs else {}
+    genres = dict(
+        Genre.objects.filter(slug__in=genre_slugs).values_list('slug', 'id')
+    ) if genre_slugs else {}
+    existing = set(
+        Title.objects.filter(pk__in=ids).values_list('pk', flat=True)
+    ) if ids else set()
+
+    errors = []
+    seen_ids = set()
+    for item in items:
+        item_errors = {}
+        category = item.get('category')
+        if category and category not in categories:
+            item_errors['category'] = [f'Категория {category} не найдена.']
+        missing = [slug for slug in item['genre'] if slug not in genres]
+        if missing:
+            item_errors['genre'] = [
+                f'Жанр {slug} не найден.' for slug in missing
+            ]
+        if 'id' in item:
+            if item['id'] not in existing:
+                item_errors['id'] = ['Произведение не найдено.']
+            elif item['id'] in seen_ids:
+                item_errors['id'] = ['Произведение повторяется в пакете.']
+            seen_ids.add(item['id'])
+        errors.append(item_errors)
+    return categories, genres, errors
+
+
+def build_title(item, categories):
+    category = item.get('category')
+    return Title(
+        pk=item.get('id'),
+        name=item['name'],
+        year=item['year'],
+        description=item.get('description', ''),
+        category_id=categories[category] if category else None,
+    )
+
+
+def group_updates(titles, items):
+    """
+    Группирует обновляемые произведения по набору переданных полей:
+    поле, которого нет в элементе, остается в базе как было.
+    """
+    groups = {}
+    for title, item in zip(titles, items):
+        if title.pk is not None:
+            fields = tuple(field for field in TITLE_FIELDS if field in item)
+            groups.setdefault(fields, []).append(title)
+    return groups
+
+
+def assign_ids(titles):
+    """
+    Проставляет id только что вставленным произведениям, если бэкенд
+    не возвращает их из bulk_create (SQLite). После вставки транзакция
+    держит блокировку записи, поэтому последние len(titles) id -
+    наши, в порядке вставки.
+    """
+    if connection.features.can_return_ids_from_bulk_insert:
+        return
+    ids = Title.objects.order_by('-pk').values_list('pk', flat=True)
+    for title, pk in zip(titles, reversed(list(ids[:len(titles)]))):
+        title.pk = pk
+
+
+def save(items, categories, genres):
+    """Записывает проверенный пакет. Возвращает произведения по порядку."""
+    now = timezone.now()
+    titles = [build_title(item, categories) for item in items]
+    updated = [title for title in titles if title.pk is not None]
+    created = [title for title in titles if title.pk is None]
+    with transaction.atomic():
+        for fields, group in group_updates(titles, items).items():
+            for title in group:
+                title.updated_at = now
+            Title.objects.bulk_update(group, fields + ('updated_at',))
+        if updated:
+            TitleGenre.objects.filter(
+                title_id__in=[title.pk for title in updated]
+            ).delete()
+        if created:
+            Title.objects.bulk_create(created)
+            assign_ids(created)
+        TitleGenre.objects.bulk_create([
+            TitleGenre(title_id=title.pk, genre_id=genres[slug])
+            for title, item in zip(titles, items)
+            for slug in unique(item['genre'])
+        ])
+    # bulk-операции не отправляют сигналы моделей.
+    cache.bump_versions('reviews.Title', 'reviews.TitleGenre')
+    return titles
@@ -0,0 +1,175 @@
+"""
+Версионируемый кеш ответов для read-only эндпоинтов каталога.
+
+Ключ ответа складывается из полного URL запроса и текущих версий
+моделей, от которых зависит ответ. Любое изменение такой модели
+увеличивает ее версию (см. api.signals), после чего старые ключи
+перестают запрашиваться и вытесняются по таймауту. Команды, которые
+пишут в обход сигналов (bulk_create, QuerySet.update), увеличивают
+версии сами.
+
+Кеш выключен по умолчанию: версии живут в кеше ALIAS, и с
+кешем в памяти процесса (LocMemCache) запись в одном воркере
+не сбрасывает ответы остальных. Для нескольких воркеров нужен
+общий бэкенд (YAMDB_CACHE_DIR).
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from . import conditional
+
+DEFAULTS = {
+    'ENABLED': False,
+    'ALIAS': 'default',
+    'TIMEOUT': 60,
+    'KEY_PREFIX': 'api',
+}
+SAFE_ACTIONS = ('GET', 'HEAD')
+VALIDATORS = ('ETag', 'Last-Modified')
+
+
+def get_setting(name):
+    return getattr(settings, 'API_RESPONSE_CACHE', {}).get(
+        name, DEFAULTS[name]
+    )
+
+
+def get_cache():
+    return caches[get_setting('ALIAS')]
+
+
+def version_key(label):
+    return f'{get_setting("KEY_PREFIX")}:version:{label}'
+
+
+def initial_version():
+    # Версия, заведенная заново после вытеснения из кеша,
+    # не должна совпасть с одной из прежних.
+    return int(time.time() * 1000)
+
+
+def get_versions(labels):
+    cache = get_cache()
+    keys = [version_key(label) for label in labels]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, initial_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*labels):
+    """Инвалидирует закешированные ответы, зависящие от моделей."""
+    cache = get_cache()
+    for label in labels:
+        key = version_key(label)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, initial_version(), None)
+
+
+def make_key(request, labels):
+    versions = ':'.join(str(version) for version in get_versions(labels))
+    url = hashlib.sha1(
+        request.build_absolute_uri().encode('utf-8')
+    ).hexdigest()
+    # Ответ, собранный с реплики, может отставать: клиентам, которые
+    # читают из основной базы (api.replicas), он не отдается.
+    source = (
+        'replica' if getattr(request, 'use_replicas', False) else 'primary'
+    )
+    return f'{get_setting("KEY_PREFIX")}:response:{source}:{url}:{versions}'
+
+
+class CacheStats:
+    """Счетчики попаданий и промахов кеша ответов в этом процессе."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def hit(self):
+        with self.lock:
+            self.hits += 1
+
+    def miss(self):
+        with self.lock:
+            self.misses += 1
+
+    def snapshot(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'ratio': self.hits / total if total else 0.0,
+            }
+
+    def reset(self):
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+
+
+stats = CacheStats()
+
+
+class CachedResponseMixin:
+    """
+    Основа кеширования ответов вью-сета.
+    'cache_dependencies' - метки моделей ('reviews.Title'),
+    от содержимого которых зависит ответ.
+    """
+
+    cache_dependencies = ()
+
+    def cached_response(self, action, request, *args, **kwargs):
+        if not get_setting('ENABLED') or request.method not in SAFE_ACTIONS:
+            return action(request, *args, **kwargs)
+        cache = get_cache()
+        key = make_key(request, self.cache_dependencies)
+        cached = cache.get(key)
+        if cached is not None:
+            stats.hit()
+            data, headers = cached
+            response = conditional.cached_not_modified(request, headers)
+            if response is None:
+                response = Response(data)
+                for header, value in headers.items():
+                    response[header] = value
+            response['X-Cache'] = 'HIT'
+            return response
+        stats.miss()
+        response = action(request, *args, **kwargs)
+        if response.status_code == 200:
+            headers = {
+                header: response[header] for header in VALIDATORS
+                if header in response
+            }
+            cache.set(key, (response.data, headers), get_setting('TIMEOUT'))
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class CachedListMixin(CachedResponseMixin):
+    """Кеширует ответы действия list."""
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin(CachedResponseMixin):
+    """Кеширует ответы действия retrieve."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
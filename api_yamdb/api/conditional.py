@@ -0,0 +1,127 @@
+"""
+Условные GET-запросы (ETag / Last-Modified) для вью-сетов.
+
+Валидаторы считаются до сериализации: для списка - ETag по ключам
+и updated_at объектов страницы плюс состоянию пагинатора,
+для объекта - по его updated_at. Last-Modified отдается только для
+объектов вью-сетов без зависимостей: у списков и у объектов со
+вложенными жанрами и категориями нет даты, которая менялась бы при
+любом изменении ответа. Совпадение с If-None-Match или
+If-Modified-Since дает 304 без сериализации ответа.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework.response import Response
+
+from . import cache, instrumentation
+
+SAFE_ACTIONS = ('GET', 'HEAD')
+
+
+def not_modified(request, etag=None, last_modified=None):
+    """Ответ 304/412, если валидаторы совпали, иначе None."""
+    return get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+
+
+def cached_not_modified(request, headers):
+    """То же для валидаторов, сохраненных вместе с ответом в кеше."""
+    if not headers:
+        return None
+    return not_modified(
+        request,
+        etag=headers.get('ETag'),
+        last_modified=parse_http_date_safe(headers.get('Last-Modified', '')),
+    )
+
+
+class ConditionalMixin:
+    """
+    Основа условных ответов. Если у вью-сета есть
+    'cache_dependencies', их версии входят в ETag: так
+    учитываются изменения связанных моделей (жанров, категорий).
+    """
+
+    def make_etag(self, request, *parts):
+        labels = getattr(self, 'cache_dependencies', ())
+        versions = cache.get_versions(labels) if labels else []
+        source = '|'.join(
+            str(part) for part in (
+                request.build_absolute_uri(), *parts, *versions
+            )
+        )
+        return quote_etag(hashlib.sha1(source.encode('utf-8')).hexdigest())
+
+    def get_data(self, serializer):
+        """serializer.data с замером этапа 'serialize'."""
+        with instrumentation.serializing(self.request):
+            return serializer.data
+
+    def conditional_response(self, request, etag, updated_at, render):
+        last_modified = int(updated_at.timestamp()) if updated_at else None
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        response = render()
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class ConditionalListMixin(ConditionalMixin):
+    """Условные ответы для действия list."""
+
+    def list(self, request, *args, **kwargs):
+        if request.method not in SAFE_ACTIONS:
+            return super().list(request, *args, **kwargs)
+        queryset = self.get_list_queryset()
+        page = self.paginate_queryset(queryset)
+        objects = list(queryset if page is None else page)
+        keys = [self.get_list_key(obj) for obj in objects]
+        state = () if page is None else self.paginator.get_state()
+        etag = self.make_etag(request, keys, *state)
+        # Без Last-Modified: максимум updated_at страницы не растет
+        # при удалении объектов и сдвиге страниц.
+        return self.conditional_response(
+            request, etag, None,
+            lambda: self.render_list(objects, page is not None),
+        )
+
+    def get_list_queryset(self):
+        return self.filter_queryset(self.get_queryset())
+
+    def get_list_key(self, obj):
+        return obj.pk, obj.updated_at
+
+    def render_list(self, objects, paginated):
+        serializer = self.get_serializer(objects, many=True)
+        return self.list_response(self.get_data(serializer), paginated)
+
+    def list_response(self, data, paginated):
+        if paginated:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
+class ConditionalRetrieveMixin(ConditionalMixin):
+    """Условные ответы для действия retrieve."""
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = self.make_etag(request, instance.pk, instance.updated_at)
+        # Изменения зависимостей (жанров, категорий) не трогают
+        # updated_at объекта, поэтому Last-Modified отдается только
+        # вью-сетами без зависимостей.
+        updated_at = (
+            None if getattr(self, 'cache_dependencies', ())
+            else instance.updated_at
+        )
+        return self.conditional_response(
+            request, etag, updated_at,
+            lambda: Response(self.get_data(self.get_serializer(instance))),
+        )
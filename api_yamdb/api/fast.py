@@ -0,0 +1,231 @@
+"""
+Быстрая сериализация списков через values().
+
+Сериализатор DRF на каждой строке создает модель, обходит поля
+с get_attribute() и проверками None. Для чтения списков это
+делается один раз: compile_serializer() разбирает поля сериализатора
+в план - какой ключ values() читать и каким преобразованием его
+отдавать, - а RowSerializer собирает по плану словари из строк
+values(). Вывод совпадает с выводом сериализатора байт в байт
+(tests/test_32_fast_lists.py).
+
+Поддерживаются поля, которые есть в сериализаторах списков:
+простые поля модели, SlugRelatedField, вложенный сериализатор
+внешнего ключа и вложенный сериализатор many=True по
+ManyToManyField. Для остального compile_serializer() выбрасывает
+ImproperlyConfigured: такой сериализатор на быстрый путь не ставится.
+"""
+import functools
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+
+from . import instrumentation, sparse
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+# Поля, у которых to_representation() значения из базы не меняет:
+# str() для строк и int() для целых.
+IDENTITY_FIELDS = (serializers.CharField, serializers.IntegerField)
+
+
+class Plan:
+    """
+    Разобранный сериализатор: ключи values() и по одному шагу
+    на поле в порядке полей сериализатора.
+    """
+
+    def __init__(self, serializer, prefix=''):
+        self.model = serializer.Meta.model
+        self.lookups = []
+        # (имя поля, вид, ключ строки, преобразование/вложенный план).
+        self.items = []
+        self.many = []
+        for name, field in serializer.fields.items():
+            if not field.write_only:
+                self.add_field(name, field, prefix)
+
+    def add_field(self, name, field, prefix):
+        if field.source == '*' or '.' in field.source:
+            raise ImproperlyConfigured(
+                f'Поле {name} читает не колонку модели {self.model}.'
+            )
+        key = f'{prefix}{field.source}'
+        if isinstance(field, serializers.ListSerializer):
+            if prefix:
+                raise ImproperlyConfigured(
+                    f'Поле {name}: many=True внутри вложенного '
+                    f'сериализатора не поддерживается.'
+                )
+            self.many.append(ManyPlan(self.model, field))
+            self.items.append((name, 'many', None, None))
+            return
+        if isinstance(field, serializers.BaseSerializer):
+            self.lookups.append(key)
+            self.items.append(
+                (name, 'nested', key, Plan(field, prefix=f'{key}__'))
+            )
+            self.lookups.extend(self.items[-1][3].lookups)
+            return
+        if isinstance(field, serializers.SlugRelatedField):
+            key = f'{key}__{field.slug_field}'
+            self.lookups.append(key)
+            self.items.append((name, 'value', key, None))
+            return
+        if isinstance(field, serializers.RelatedField):
+            raise ImproperlyConfigured(f'Связь {name} не поддерживается.')
+        self.lookups.append(key)
+        if isinstance(field, IDENTITY_FIELDS):
+            self.items.append((name, 'value', key, None))
+        else:
+            self.items.append((name, 'convert', key, field.to_representation))
+
+    def compile(self):
+        """
+        Функция (row, related) -> словарь поля: одно выражение-словарь
+        без циклов по полям. related - строки полей many=True,
+        {имя поля: {pk: [словари]}}.
+        """
+        pk = self.model._meta.pk.name
+        namespace = {}
+        items = []
+        for index, (name, kind, key, extra) in enumerate(self.items):
+            value = f'row[{key!r}]'
+            if kind == 'convert':
+                namespace[f'conv{index}'] = extra
+                value = f'(None if {value} is None else conv{index}({value}))'
+            elif kind == 'nested':
+                namespace[f'nested{index}'] = extra.compile()
+                value = f'(None if {value} is None else nested{index}(row))'
+            elif kind == 'many':
+                value = f'related[{name!r}].get(row[{pk!r}], [])'
+            items.append(f'{name!r}: {value}')
+        source = (
+            'def to_dict(row, related=None):\n'
+            f'    return {{{", ".join(items)}}}\n'
+        )
+        exec(source, namespace)
+        return namespace['to_dict']
+
+
+class ManyPlan:
+    """
+    Вложенный сериализатор many=True по ManyToManyField: строки
+    всей страницы читаются одним запросом к промежуточной таблице
+    в порядке Meta.ordering связанной модели.
+    """
+
+    def __init__(self, model, field):
+        self.name = field.field_name
+        relation = model._meta.get_field(field.source)
+        if not relation.many_to_many:
+            raise ImproperlyConfigured(
+                f'Поле {self.name} - не ManyToManyField.'
+            )
+        self.through = relation.remote_field.through
+        through = self.through._meta
+        self.source = through.get_field(relation.m2m_field_name()).attname
+        target = relation.m2m_reverse_field_name()
+        self.child = Plan(field.child, prefix=f'{target}__')
+        self.to_dict = self.child.compile()
+        related = self.child.model._meta
+        ordering = []
+        for name in related.ordering:
+            desc = '-' if name.startswith('-') else ''
+            name = name.lstrip('-')
+            if name in ('pk', related.pk.name):
+                name = through.get_field(target).attname
+            else:
+                name = f'{target}__{name}'
+            ordering.append(f'{desc}{name}')
+        # Ведущая колонка индекса (title, genre) идет в том же
+        # направлении, что и порядок внутри произведения: SQLite
+        # читает индекс без сортировки во временном B-дереве.
+        desc = '-' if ordering and ordering[0].startswith('-') else ''
+        self.ordering = [f'{desc}{self.source}', *ordering]
+
+    def fetch(self, ids):
+        groups = {}
+        rows = self.through.objects.filter(
+            **{f'{self.source}__in': ids}
+        ).order_by(*self.ordering).values(self.source, *self.child.lookups)
+        for row in rows:
+            groups.setdefault(row[self.source], []).append(self.to_dict(row))
+        return groups
+
+
+class RowSerializer:
+    """Сериализация строк values() по плану сериализатора."""
+
+    def __init__(self, serializer_class):
+        self.plan = Plan(serializer_class())
+        self.pk = self.plan.model._meta.pk.name
+        self.to_dict = self.plan.compile()
+
+    def values(self, queryset, *extra):
+        """Кверисет строк-словарей для плана и ключей extra."""
+        lookups = dict.fromkeys(
+            (self.pk, *self.plan.lookups, *extra,
+             *queryset.query.extra_select)
+        )
+        return queryset.select_related(None).prefetch_related(
+            None
+        ).values(*lookups)
+
+    def serialize(self, rows):
+        related = None
+        if self.plan.many:
+            ids = [row[self.pk] for row in rows]
+            related = {
+                plan.name: plan.fetch(ids) if ids else {}
+                for plan in self.plan.many
+            }
+        to_dict = self.to_dict
+        return [to_dict(row, related) for row in rows]
+
+
+@functools.lru_cache(maxsize=None)
+def compile_serializer(serializer_class):
+    return RowSerializer(serializer_class)
+
+
+class FastListMixin:
+    """
+    Быстрый путь действия list для ConditionalListMixin: страница
+    читается через values() и собирается RowSerializer без моделей
+    и полей DRF. С параметрами 'fields' / 'omit' ответ собирается
+    обычным сериализатором.
+    """
+
+    def use_fast_path(self):
+        return (
+            self.action == 'list'
+            and self.request.method in SAFE_METHODS
+            and not sparse.is_sparse(self.request)
+        )
+
+    def get_row_serializer(self):
+        return compile_serializer(self.get_serializer_class())
+
+    def get_list_queryset(self):
+        queryset = super().get_list_queryset()
+        if not self.use_fast_path():
+            return queryset
+        ordering = [
+            name.lstrip('-') for name in getattr(self, 'cursor_ordering', ())
+        ]
+        return self.get_row_serializer().values(
+            queryset, 'updated_at', *ordering
+        )
+
+    def get_list_key(self, obj):
+        if isinstance(obj, dict):
+            return obj[self.get_row_serializer().pk], obj['updated_at']
+        return super().get_list_key(obj)
+
+    def render_list(self, objects, paginated):
+        if not self.use_fast_path():
+            return super().render_list(objects, paginated)
+        with instrumentation.serializing(self.request):
+            data = self.get_row_serializer().serialize(objects)
+        return self.list_response(data, paginated)
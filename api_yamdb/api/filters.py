@@ -1,19 +1,44 @@
 import django_filters
+from django.db import connections
+from django.db.models import Count, Q
+from rest_framework.filters import BaseFilterBackend
 
-from reviews.models import Title
+from reviews import search
+from reviews.models import Category, Genre, Title, TitleGenre
+
+MATCH_MODES = (
+    ('any', 'any'),
+    ('all', 'all'),
+)
+
+
+def slugs_to_ids(model, value):
+    """
+    Одним запросом переводит слаги через запятую в id объектов.
+    Возвращает пару (id, количество уникальных слагов).
+    """
+    slugs = {slug.strip() for slug in value.split(',') if slug.strip()}
+    ids = list(
+        model.objects.filter(slug__in=slugs).values_list('id', flat=True)
+    )
+    return ids, len(slugs)
 
 
 class TitleFilter(django_filters.FilterSet):
     """
     Кастомизация фильтра для Titles.
+    Жанры и категории фильтруются по точному совпадению слага,
+    можно передать несколько через запятую. Для жанров параметр
+    'genre_mode' задает режим: 'any' (хотя бы один, по умолчанию)
+    или 'all' (все сразу). Слаги переводятся в id один раз, дальше
+    фильтрация идет подзапросом по индексу TitleGenre без дублей.
     """
 
-    genre = django_filters.CharFilter(
-        field_name='genre__slug', lookup_expr='icontains'
-    )
-    category = django_filters.CharFilter(
-        field_name='category__slug', lookup_expr='icontains'
+    genre = django_filters.CharFilter(method='filter_genre')
+    genre_mode = django_filters.ChoiceFilter(
+        choices=MATCH_MODES, method='filter_mode'
     )
+    category = django_filters.CharFilter(method='filter_category')
     name = django_filters.CharFilter(
         field_name='name', lookup_expr='icontains'
     )
@@ -21,3 +46,44 @@ class TitleFilter(django_filters.FilterSet):
     class Meta:
         model = Title
         fields = ['name', 'year', 'genre', 'category']
+
+    def filter_mode(self, queryset, name, value):
+        # Режим применяется в filter_genre.
+        return queryset
+
+    def filter_genre(self, queryset, name, value):
+        ids, requested = slugs_to_ids(Genre, value)
+        if not ids:
+            return queryset.none()
+        title_ids = TitleGenre.objects.filter(genre_id__in=ids)
+        if self.form.cleaned_data.get('genre_mode') == 'all':
+            if len(ids) < requested:
+                return queryset.none()
+            title_ids = title_ids.values('title_id').annotate(
+                matched=Count('genre_id', distinct=True)
+            ).filter(matched=len(ids))
+        return queryset.filter(id__in=title_ids.values('title_id'))
+
+    def filter_category(self, queryset, name, value):
+        ids, _ = slugs_to_ids(Category, value)
+        return queryset.filter(category_id__in=ids)
+
+
+class TitleSearchFilter(BaseFilterBackend):
+    """
+    Полнотекстовый поиск по названию и описанию Titles
+    через параметр 'search' с сортировкой по релевантности.
+    На базах без FTS5 сводится к icontains.
+    """
+
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        if search.is_supported(connections[queryset.db]):
+            return search.search(queryset, query)
+        return queryset.filter(
+            Q(name__icontains=query) | Q(description__icontains=query)
+        )
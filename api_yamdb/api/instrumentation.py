@@ -0,0 +1,190 @@
+"""
+Замеры стоимости запросов к API.
+
+Middleware считает SQL-запросы и их суммарное время, время работы
+вью, время сериализации (serializer.data или сборки списка быстрым
+путем, см. serializing), время рендеринга ответа в JSON и общее
+время запроса. Сериализация в этап 'view' не входит.
+Значения отдаются в заголовках Server-Timing и X-Query-Count,
+а длительности копятся по маршрутам для перцентилей (см. snapshot).
+Включается настройкой REQUEST_INSTRUMENTATION['ENABLED'].
+"""
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+DEFAULTS = {
+    'ENABLED': False,
+    'SAMPLES': 1000,
+}
+PERCENTILES = (50, 90, 99)
+STAGES = ('sql', 'view', 'serialize', 'render', 'total')
+
+
+def get_setting(name):
+    return getattr(settings, 'REQUEST_INSTRUMENTATION', {}).get(
+        name, DEFAULTS[name]
+    )
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга для отсортированного списка."""
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[rank - 1]
+
+
+class RequestStats:
+    """Замеры одного запроса; время в секундах."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_finished = None
+        self.queries = 0
+        self.sql = 0.0
+        self.serialize = 0.0
+        self.timings = {}
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - started
+            self.queries += 1
+
+    @contextmanager
+    def track(self):
+        """Считает запросы ко всем базам внутри блока."""
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(self.record_query)
+                )
+            yield self
+
+    def finish(self):
+        finished = time.perf_counter()
+        view_finished = self.view_finished or finished
+        self.timings = {
+            'sql': self.sql,
+            # Сериализация идет внутри вью, но отдается отдельно.
+            'view': view_finished - self.started - self.serialize,
+            'serialize': self.serialize,
+            # Рендеринг ответа после выхода из вью.
+            'render': finished - view_finished,
+            'total': finished - self.started,
+        }
+
+    def server_timing(self):
+        parts = []
+        for stage in STAGES:
+            part = f'{stage};dur={self.timings[stage] * 1000:.2f}'
+            if stage == 'sql':
+                part += f';desc="{self.queries} queries"'
+            parts.append(part)
+        return ', '.join(parts)
+
+
+class RouteStats:
+    """Последние замеры по маршрутам для расчета перцентилей."""
+
+    def __init__(self, samples):
+        self.samples = samples
+        self.routes = {}
+        self.lock = threading.Lock()
+
+    def add(self, route, stats):
+        with self.lock:
+            route_stats = self.routes.get(route)
+            if route_stats is None:
+                route_stats = self.routes[route] = {
+                    'count': 0,
+                    'samples': deque(maxlen=self.samples),
+                }
+            route_stats['count'] += 1
+            route_stats['samples'].append(
+                dict(stats.timings, queries=stats.queries)
+            )
+
+    def snapshot(self):
+        """
+        Для каждого маршрута: число запросов и перцентили
+        времени этапов (в миллисекундах) и числа SQL-запросов.
+        """
+        with self.lock:
+            routes = {
+                route: (data['count'], list(data['samples']))
+                for route, data in self.routes.items()
+            }
+        result = {}
+        for route, (count, samples) in routes.items():
+            route_result = {'count': count}
+            for name in STAGES + ('queries',):
+                values = sorted(sample[name] for sample in samples)
+                scale = 1 if name == 'queries' else 1000
+                for percent in PERCENTILES:
+                    route_result[f'{name}_p{percent}'] = (
+                        percentile(values, percent) * scale
+                    )
+            result[route] = route_result
+        return result
+
+    def clear(self):
+        with self.lock:
+            self.routes.clear()
+
+
+route_stats = RouteStats(DEFAULTS['SAMPLES'])
+
+
+@contextmanager
+def serializing(request):
+    """Относит время блока к этапу 'serialize' запроса."""
+    stats = getattr(request, 'instrumentation', None)
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serialize += time.perf_counter() - started
+
+
+def get_route(request):
+    """Маршрут без значений параметров: 'GET title-detail'."""
+    match = getattr(request, 'resolver_match', None)
+    name = match.view_name if match is not None else 'unresolved'
+    return f'{request.method} {name}'
+
+
+class InstrumentationMiddleware:
+    """Замеряет запрос и добавляет Server-Timing и X-Query-Count."""
+
+    def __init__(self, get_response):
+        if not get_setting('ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        route_stats.samples = get_setting('SAMPLES')
+
+    def __call__(self, request):
+        stats = request.instrumentation = RequestStats()
+        with stats.track():
+            response = self.get_response(request)
+        stats.finish()
+        response['Server-Timing'] = stats.server_timing()
+        response['X-Query-Count'] = str(stats.queries)
+        route_stats.add(get_route(request), stats)
+        return response
+
+    def process_template_response(self, request, response):
+        # Вызывается между вью и рендерингом ответа DRF.
+        request.instrumentation.view_finished = time.perf_counter()
+        return response
@@ -0,0 +1,371 @@
+"""
+Метрики приложения в текстовом формате Prometheus (эндпоинт /metrics).
+
+Каждый процесс копит счетчики и гистограммы запросов в памяти.
+Если задан METRICS['DIR'], процесс периодически сбрасывает свое
+состояние в файл metrics-<pid>.json в этой папке, а /metrics
+складывает файлы всех процессов: так метрики собираются целиком
+под многопроцессным WSGI-сервером, какой бы воркер ни ответил.
+Файлы умерших процессов удаляются при сборке: их счетчики выпадают
+из суммы, что Prometheus видит как обычный сброс счетчика.
+
+Эндпоинт выключен по умолчанию (YAMDB_METRICS=1 включает его).
+Если задан METRICS['TOKEN'], /metrics требует заголовок
+Authorization: Bearer <токен>.
+"""
+import hmac
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404, HttpResponse
+
+from reviews import mail
+
+from . import authentication, cache
+from .instrumentation import RequestStats
+
+DEFAULTS = {
+    'ENABLED': False,
+    'TOKEN': '',
+    'DIR': '',
+    'FLUSH_INTERVAL': 1.0,
+}
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+HISTOGRAMS = {
+    'yamdb_http_request_duration_seconds': LATENCY_BUCKETS,
+    'yamdb_http_request_queries': QUERY_BUCKETS,
+}
+# Имя: (тип, описание). Датчики из разных процессов складываются,
+# кроме отмеченных 'max' (общий для процессов ресурс).
+METRICS = {
+    'yamdb_http_requests_total': (
+        'counter', 'Запросы к API по вью, действию, методу и статусу.'),
+    'yamdb_http_request_duration_seconds': (
+        'histogram', 'Время обработки запроса.'),
+    'yamdb_http_request_queries': (
+        'histogram', 'Число SQL-запросов на запрос к API.'),
+    'yamdb_response_cache_requests_total': (
+        'counter', 'Обращения к кешу ответов каталога.'),
+    'yamdb_response_cache_hit_ratio': (
+        'gauge', 'Доля попаданий в кеш ответов каталога.'),
+    'yamdb_jwt_cache_requests_total': (
+        'counter', 'Обращения к кешам JWT-аутентификации.'),
+    'yamdb_jwt_cache_entries': (
+        'gauge', 'Число записей в кешах JWT-аутентификации.'),
+    'yamdb_email_queue_messages_total': (
+        'counter', 'События очереди писем.'),
+    'yamdb_email_queue_depth': (
+        'gauge', 'Писем в очереди в памяти.'),
+    'yamdb_email_spooled': (
+        'gauge', 'Неотправленных писем в спуле на диске.'),
+}
+MAX_GAUGES = ('yamdb_email_spooled',)
+MAIL_EVENTS = (
+    'enqueued', 'delivered', 'failed', 'retries', 'overflow', 'quarantined'
+)
+
+
+def get_setting(name):
+    return getattr(settings, 'METRICS', {}).get(name, DEFAULTS[name])
+
+
+def escape(value):
+    return (
+        str(value).replace('\\', '\\\\')
+        .replace('"', '\\"').replace('\n', '\\n')
+    )
+
+
+def format_labels(**labels):
+    return ','.join(
+        f'{name}="{escape(value)}"' for name, value in labels.items()
+    )
+
+
+class Registry:
+    """Счетчики и гистограммы запросов этого процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.flushed = 0.0
+
+    def inc(self, name, labels, value=1):
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name]
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            # Счетчики по корзинам (последняя - +Inf), сумма, количество.
+            data = series.get(labels)
+            if data is None:
+                data = series[labels] = [[0] * (len(buckets) + 1), 0, 0]
+            index = next(
+                (i for i, bound in enumerate(buckets) if value <= bound),
+                len(buckets)
+            )
+            data[0][index] += 1
+            data[1] += value
+            data[2] += 1
+
+    def dump(self):
+        with self.lock:
+            return {
+                'counters': {
+                    name: dict(series)
+                    for name, series in self.counters.items()
+                },
+                'histograms': {
+                    name: {
+                        labels: [list(data[0]), data[1], data[2]]
+                        for labels, data in series.items()
+                    }
+                    for name, series in self.histograms.items()
+                },
+            }
+
+    def clear(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+registry = Registry()
+
+
+def process_state():
+    """Состояние процесса: метрики запросов плюс статистика подсистем."""
+    state = registry.dump()
+    state['pid'] = os.getpid()
+    counters = state['counters']
+    gauges = state['gauges'] = {}
+
+    cache_stats = cache.stats.snapshot()
+    counters['yamdb_response_cache_requests_total'] = {
+        format_labels(result='hit'): cache_stats['hits'],
+        format_labels(result='miss'): cache_stats['misses'],
+    }
+
+    jwt_requests = counters['yamdb_jwt_cache_requests_total'] = {}
+    jwt_entries = gauges['yamdb_jwt_cache_entries'] = {}
+    for name, lru in (('token', authentication.token_cache),
+                      ('user', authentication.user_cache)):
+        snapshot = lru.snapshot()
+        for result, key in (('hit', 'hits'), ('miss', 'misses')):
+            labels = format_labels(cache=name, result=result)
+            jwt_requests[labels] = snapshot[key]
+        jwt_entries[format_labels(cache=name)] = snapshot['size']
+
+    # Очередь не создается ради метрик, только если уже запущена.
+    queue = mail._queue
+    if queue is not None:
+        snapshot = queue.snapshot()
+        counters['yamdb_email_queue_messages_total'] = {
+            format_labels(event=event): snapshot[event]
+            for event in MAIL_EVENTS
+        }
+        gauges['yamdb_email_queue_depth'] = {'': snapshot['depth']}
+        gauges['yamdb_email_spooled'] = {'': snapshot['spooled']}
+    return state
+
+
+def state_path(directory, pid):
+    return os.path.join(directory, f'metrics-{pid}.json')
+
+
+def flush(force=False):
+    """Сбрасывает состояние процесса в общую папку, если она задана."""
+    directory = get_setting('DIR')
+    if not directory:
+        return
+    now = time.monotonic()
+    if not force and now - registry.flushed < get_setting('FLUSH_INTERVAL'):
+        return
+    registry.flushed = now
+    os.makedirs(directory, exist_ok=True)
+    path = state_path(directory, os.getpid())
+    temporary = f'{path}.{threading.get_ident()}.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(process_state(), file)
+    os.replace(temporary, path)
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def load_states():
+    """Состояния всех процессов; текущий берется из памяти."""
+    current = process_state()
+    directory = get_setting('DIR')
+    if not directory or not os.path.isdir(directory):
+        return [current]
+    states = [current]
+    for name in os.listdir(directory):
+        if not (name.startswith('metrics-') and name.endswith('.json')):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            continue
+        if state['pid'] == current['pid']:
+            continue
+        if not is_alive(state['pid']):
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+            continue
+        states.append(state)
+    return states
+
+
+def aggregate(states):
+    result = {'counters': {}, 'histograms': {}, 'gauges': {}}
+    for state in states:
+        for name, series in state['counters'].items():
+            target = result['counters'].setdefault(name, {})
+            for labels, value in series.items():
+                target[labels] = target.get(labels, 0) + value
+        for name, series in state['histograms'].items():
+            target = result['histograms'].setdefault(name, {})
+            for labels, (buckets, total, count) in series.items():
+                data = target.setdefault(
+                    labels, [[0] * len(buckets), 0, 0]
+                )
+                data[0] = [a + b for a, b in zip(data[0], buckets)]
+                data[1] += total
+                data[2] += count
+        for name, series in state['gauges'].items():
+            target = result['gauges'].setdefault(name, {})
+            combine = max if name in MAX_GAUGES else sum
+            for labels, value in series.items():
+                target[labels] = combine((target.get(labels, 0), value))
+    cache_requests = result['counters'].get(
+        'yamdb_response_cache_requests_total', {}
+    )
+    hits = cache_requests.get(format_labels(result='hit'), 0)
+    total = hits + cache_requests.get(format_labels(result='miss'), 0)
+    result['gauges']['yamdb_response_cache_hit_ratio'] = {
+        '': hits / total if total else 0.0
+    }
+    return result
+
+
+def sample(name, labels, value):
+    return f'{name}{{{labels}}} {value}' if labels else f'{name} {value}'
+
+
+def render_histogram(name, series):
+    buckets = HISTOGRAMS[name]
+    lines = []
+    for labels, (counts, total, count) in sorted(series.items()):
+        prefix = f'{labels},' if labels else ''
+        cumulative = 0
+        for bound, bucket_count in zip(buckets + ('+Inf',), counts):
+            cumulative += bucket_count
+            lines.append(sample(
+                f'{name}_bucket', f'{prefix}le="{bound}"', cumulative
+            ))
+        lines.append(sample(f'{name}_sum', labels, total))
+        lines.append(sample(f'{name}_count', labels, count))
+    return lines
+
+
+def render(metrics):
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        group = 'histograms' if kind == 'histogram' else f'{kind}s'
+        series = metrics[group].get(name)
+        if not series:
+            continue
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'histogram':
+            lines.extend(render_histogram(name, series))
+            continue
+        for labels, value in sorted(series.items()):
+            lines.append(sample(name, labels, value))
+    return '\n'.join(lines) + '\n'
+
+
+def is_authorized(request):
+    token = get_setting('TOKEN')
+    if not token:
+        return True
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    return hmac.compare_digest(header, f'Bearer {token}')
+
+
+def metrics_view(request):
+    if not get_setting('ENABLED'):
+        raise Http404
+    if not is_authorized(request):
+        response = HttpResponse('Unauthorized', status=401)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    return HttpResponse(
+        render(aggregate(load_states())), content_type=CONTENT_TYPE
+    )
+
+
+def get_view_labels(request):
+    """Вью-класс и действие DRF; для прочих вью - имя маршрута."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved', request.method.lower()
+    view_class = getattr(match.func, 'cls', None)
+    if view_class is None:
+        return match.view_name, request.method.lower()
+    actions = getattr(match.func, 'actions', None) or {}
+    return (
+        view_class.__name__,
+        actions.get(request.method.lower(), request.method.lower())
+    )
+
+
+class MetricsMiddleware:
+    """Считает запросы, их длительность и число SQL-запросов."""
+
+    def __init__(self, get_response):
+        if not get_setting('ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        with stats.track():
+            response = self.get_response(request)
+        stats.finish()
+        view, action = get_view_labels(request)
+        labels = format_labels(view=view, action=action)
+        registry.inc('yamdb_http_requests_total', format_labels(
+            view=view, action=action,
+            method=request.method, status=response.status_code,
+        ))
+        registry.observe(
+            'yamdb_http_request_duration_seconds', labels,
+            stats.timings['total']
+        )
+        registry.observe('yamdb_http_request_queries', labels, stats.queries)
+        flush()
+        return response
@@ -0,0 +1,64 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Курсорная пагинация по ключу сортировки вью-сета.
+    Не выполняет COUNT(*) и OFFSET-сканов: глубокие страницы
+    стоят столько же, сколько первая.
+    """
+
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def __init__(self, ordering, page_size):
+        self.ordering = ordering
+        self.page_size = page_size
+
+
+class ApiPagination(PageNumberPagination):
+    """
+    Постраничная пагинация проекта.
+    Размер страницы можно задать параметром 'page_size',
+    но не больше 'max_page_size'.
+    Если вью-сет объявляет 'cursor_ordering', то наличие в запросе
+    параметра 'cursor' (в том числе пустого - для первой страницы)
+    переключает ответ на курсорную пагинацию.
+    """
+
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering and self.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination(ordering, self.page_size)
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_state(self):
+        """
+        Состояние пагинатора для ETag: общее количество для
+        постраничного режима, ссылки на соседние страницы - для
+        курсорного.
+        """
+        if self.keyset is not None:
+            return (
+                self.keyset.get_next_link(),
+                self.keyset.get_previous_link(),
+            )
+        return (self.page.paginator.count, )
+
+    def get_html_context(self):
+        if self.keyset is not None:
+            return self.keyset.get_html_context()
+        return super().get_html_context()
@@ -0,0 +1,207 @@
+"""
+Чтение с реплик базы.
+
+ReplicaRouter отправляет чтения безопасных HTTP-запросов на реплики
+из settings.DATABASE_REPLICAS, а записи, небезопасные запросы и все,
+что выполняется вне запроса (команды, миграции), - в основную базу.
+ReplicaMiddleware решает, может ли запрос читать с реплики: после
+записи клиент STICKY_SECONDS читает из основной базы и видит свои
+изменения, пока реплики их не догнали. Клиент с заголовком
+Authorization узнается по его хешу в общем кеше, аноним - по cookie:
+IP за прокси у всех анонимов один.
+
+Кеш привязки и версий ответов должен быть общим для всех процессов:
+refresh_replicas сбрасывает ответы, собранные с устаревших реплик,
+из отдельного процесса. С кешем в памяти процесса (LocMemCache)
+реплики не включаются - ImproperlyConfigured.
+
+Реплики SQLite - копии основной базы, которые refresh() обновляет
+онлайн-бэкапом (команда refresh_replicas). Роутер знает о репликах
+только их алиасы, поэтому их можно заменить настоящими репликами
+без правок кода.
+"""
+import contextvars
+import hashlib
+import os
+import random
+import sqlite3
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from . import cache
+from .signals import CACHED_MODELS
+
+DEFAULTS = {
+    'STICKY_SECONDS': 10,
+    'CACHE_ALIAS': 'default',
+    'KEY_PREFIX': 'replicas',
+    'COOKIE_NAME': 'yamdb_primary',
+    'REFRESH_INTERVAL': 5,
+    # Модели, которые всегда читаются из основной базы: роль
+    # или блокировка юзера должны действовать сразу.
+    'PRIMARY_MODELS': ('reviews.User',),
+}
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Можно ли текущему запросу читать с реплик.
+use_replicas = contextvars.ContextVar('use_replicas', default=False)
+# Реплики SQLite, в которые уже хотя бы раз скопирована база.
+_ready = set()
+
+
+def get_setting(name):
+    return getattr(settings, 'DATABASE_REPLICATION', {}).get(
+        name, DEFAULTS[name]
+    )
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+def is_sqlite(alias):
+    return connections[alias].vendor == 'sqlite'
+
+
+def ready_replicas():
+    """Реплики, с которых можно читать; пустые файлы SQLite пропускаются."""
+    ready = []
+    for alias in get_replicas():
+        if alias not in _ready:
+            if is_sqlite(alias):
+                path = connections.databases[alias]['NAME']
+                if not os.path.isfile(path) or not os.path.getsize(path):
+                    continue
+            _ready.add(alias)
+        ready.append(alias)
+    return ready
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if (not use_replicas.get()
+                or model._meta.label in get_setting('PRIMARY_MODELS')):
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Связанные объекты читаем оттуда же, откуда сам объект.
+            return instance._state.db
+        replicas = ready_replicas()
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Во всех базах одни и те же данные.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Реплики получают схему вместе с данными из основной базы.
+        return db not in get_replicas()
+
+
+def client_key(request):
+    """Ключ привязки клиента в кеше; у анонима ключа нет."""
+    credentials = request.META.get('HTTP_AUTHORIZATION')
+    if not credentials:
+        return None
+    digest = hashlib.sha1(credentials.encode('utf-8')).hexdigest()
+    return f'{get_setting("KEY_PREFIX")}:sticky:{digest}'
+
+
+def get_cache():
+    return caches[get_setting('CACHE_ALIAS')]
+
+
+def check_caches():
+    """
+    Проверяет, что кеш привязки и кеш ответов общие для процессов.
+    Иначе сброс ответов после обновления реплик не дойдет
+    до воркеров, а привязка после записи - до соседнего воркера.
+    """
+    aliases = {get_setting('CACHE_ALIAS')}
+    if cache.get_setting('ENABLED'):
+        aliases.add(cache.get_setting('ALIAS'))
+    for alias in sorted(aliases):
+        if isinstance(caches[alias], (LocMemCache, DummyCache)):
+            raise ImproperlyConfigured(
+                f'Реплики требуют общего для процессов кеша, а кеш '
+                f'{alias!r} - {type(caches[alias]).__name__}. '
+                f'Задайте YAMDB_CACHE_DIR.'
+            )
+
+
+class ReplicaMiddleware:
+    """Разрешает чтение с реплик безопасным запросам, кроме клиентов,
+    которые недавно писали."""
+
+    def __init__(self, get_response):
+        if not get_replicas():
+            raise MiddlewareNotUsed
+        check_caches()
+        self.get_response = get_response
+
+    def is_sticky(self, request, key):
+        if key is None:
+            return get_setting('COOKIE_NAME') in request.COOKIES
+        return get_cache().get(key) is not None
+
+    def stick(self, response, key):
+        seconds = get_setting('STICKY_SECONDS')
+        if key is None:
+            response.set_cookie(
+                get_setting('COOKIE_NAME'), '1', max_age=seconds,
+                httponly=True, samesite='Lax',
+            )
+        else:
+            get_cache().set(key, 1, seconds)
+
+    def __call__(self, request):
+        key = client_key(request)
+        safe = request.method in SAFE_METHODS
+        request.use_replicas = safe and not self.is_sticky(request, key)
+        token = use_replicas.set(request.use_replicas)
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replicas.reset(token)
+        if not safe:
+            self.stick(response, key)
+        return response
+
+
+def refresh(alias, source=DEFAULT_DB_ALIAS):
+    """
+    Копирует основную базу в реплику SQLite онлайн-бэкапом.
+    Бэкап идет одним шагом: читатели реплики видят либо прежнюю,
+    либо новую версию целиком.
+    """
+    connection = connections[source]
+    connection.ensure_connection()
+    target = sqlite3.connect(
+        connections.databases[alias]['NAME'],
+        timeout=connections.databases[alias]['OPTIONS'].get('timeout', 5),
+    )
+    try:
+        with connection.wrap_database_errors:
+            connection.connection.backup(target)
+    finally:
+        target.close()
+
+
+def refresh_all():
+    """Обновляет все реплики SQLite; возвращает их алиасы."""
+    refreshed = [alias for alias in get_replicas() if is_sqlite(alias)]
+    for alias in refreshed:
+        refresh(alias)
+    if refreshed:
+        # Ответы, собранные с устаревших реплик, больше не отдаются.
+        cache.bump_versions(*(model._meta.label for model in CACHED_MODELS))
+    return refreshed
@@ -1,14 +1,19 @@
-from django.contrib.auth import authenticate
-from django.contrib.auth.tokens import default_token_generator
-from django.db.models import Avg
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError, NotFound
+from rest_framework.relations import MANY_RELATION_KWARGS
 from rest_framework_simplejwt.tokens import AccessToken
 
-from reviews.models import User, Review, Comments, Category, Genre, Title
+from reviews.backends import ConfirmationCodeBackend
+from reviews.models import (
+    User, Review, Comments, Category, Genre, Title, TitleGenre
+)
 
+from . import cache
+from .sparse import SparseModelSerializer, SparseSerializer
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserSerializer(SparseModelSerializer):
     """
     Общий сериализатор для :model:'reviews.Users'.
     Не предусматривает специальных настроек,
@@ -29,7 +34,7 @@ class UserSerializer(serializers.ModelSerializer):
         )
 
 
-class MeUserSerializer(serializers.ModelSerializer):
+class MeUserSerializer(SparseModelSerializer):
     """
     Сериализация detail-представления для инстанса,
     относящегося к :model:'reviews.Users'.
@@ -52,7 +57,7 @@ class MeUserSerializer(serializers.ModelSerializer):
         read_only_fields = ['role']
 
 
-class RegistrationSerializer(serializers.ModelSerializer):
+class RegistrationSerializer(SparseModelSerializer):
     """
     Сериализация для регистрации новых инстансов,
     относящихся к :model:'reviews.User'.
@@ -73,7 +78,7 @@ class RegistrationSerializer(serializers.ModelSerializer):
         return value
 
 
-class YAMDbTokenObtainSerializer(serializers.Serializer):
+class YAMDbTokenObtainSerializer(SparseSerializer):
     """
     Сериализатор для выдачи токенов по запросу
     на эндпоинт v1/auth/token.
@@ -104,40 +109,42 @@ class YAMDbTokenObtainSerializer(serializers.Serializer):
         return value
 
     def validate(self, attrs):
-        token = attrs['confirmation_code']
-        # Проверяем наличие юзера с запрошенным 'username' в базе.
-        if not User.objects.filter(username=attrs['username']).exists():
+        # Юзер выбирается одним запросом, confirmation_code проверяется
+        # без обращения к базе, поэтому authenticate() с обходом всех
+        # бэкендов не нужен.
+        backend = ConfirmationCodeBackend()
+        user = backend.get_by_username(attrs['username'])
+        if user is None:
             raise NotFound(
                 {'username': 'Юзер с таким username отсутствует в базе.'}
             )
-        user = User.objects.get(username=attrs['username'])
-        # Проверка правильности введенного в поле 'confirmation_code'
-        # дефолтного токена Django.
-        if not default_token_generator.check_token(user=user, token=token):
+        if not backend.check_code(user, attrs['confirmation_code']):
             raise ValidationError(
                 {'confirmation_code':
                     'Введен не присвоенный юзеру confirmation_code.'}
             )
-        # Далее излагается логика сериализатора-родителя
-        # с поправкой на кастомные поля.
-        authenticate_kwargs = {
-            self.username_field: attrs[self.username_field],
-            "confirmation_code": attrs["confirmation_code"],
-        }
-        try:
-            authenticate_kwargs["request"] = self.context["request"]
-        except KeyError:
-            pass
-
-        self.user = authenticate(**authenticate_kwargs)
+        self.user = user
         # Возвращаем аксесс-токен как словарь 'data'.
-        data = {}
-        data["access"] = str(self.token.for_user(user))
+        return {'access': str(self.token.for_user(user))}
 
-        return data
+
+class TitleBulkItemSerializer(SparseModelSerializer):
+    """
+    Элемент пакета для v1/titles/bulk/. Слаги проверяются только
+    по формату: их наличие в базе проверяется для всего пакета
+    сразу (см. api.bulk). Элемент с 'id' обновляет произведение.
+    """
+    id = serializers.IntegerField(required=False)
+    category = serializers.SlugField(required=False, allow_null=True)
+    genre = serializers.ListField(child=serializers.SlugField())
+    description = serializers.CharField(required=False, allow_blank=True)
+
+    class Meta:
+        model = Title
+        fields = ('id', 'name', 'year', 'description', 'category', 'genre')
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseModelSerializer):
     """Сериализация отзывов."""
 
     author = serializers.SlugRelatedField(
@@ -162,7 +169,7 @@ class ReviewSerializer(serializers.ModelSerializer):
         return data
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseModelSerializer):
     """Сериализация комментариев."""
 
     author = serializers.SlugRelatedField(
@@ -175,49 +182,88 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ('id', 'text', 'author', 'pub_date')
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(SparseModelSerializer):
     """
     Сериализатор для жанров.
     """
 
     class Meta:
         model = Genre
-        exclude = ('id', )
+        exclude = ('id', 'updated_at')
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseModelSerializer):
 
     class Meta:
         model = Category
-        exclude = ('id', )
+        exclude = ('id', 'updated_at')
 
 
-class TitleListSerializer(serializers.ModelSerializer):
+class TitleListSerializer(SparseModelSerializer):
     """
     Сериализатор для представления списка Titles.
+    Рейтинг читается из хранимого поля произведения.
     """
 
     category = CategorySerializer(read_only=True)
-    rating = serializers.SerializerMethodField()
+    rating = serializers.FloatField(read_only=True)
     genre = GenreSerializer(read_only=True, many=True)
 
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = ('rating_sum', 'rating_count', 'updated_at')
+
+
+class BatchManyRelatedField(serializers.ManyRelatedField):
+    """Разрешает все слаги списка одним запросом, а не по одному."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        child = self.child_relation
+        for slug in data:
+            if not isinstance(slug, str):
+                child.fail('invalid')
+        found = {
+            getattr(obj, child.slug_field): obj
+            for obj in child.get_queryset().filter(
+                **{f'{child.slug_field}__in': data}
+            )
+        }
+        for slug in data:
+            if slug not in found:
+                child.fail(
+                    'does_not_exist', slug_name=child.slug_field, value=slug
+                )
+        return [found[slug] for slug in data]
 
-    def get_rating(self, obj):
-        return obj.reviews.aggregate(Avg('score'))['score__avg']
 
+class BatchSlugRelatedField(serializers.SlugRelatedField):
+    """SlugRelatedField, который с many=True проверяет слаги пакетом."""
 
-class TitleCreateSerializer(serializers.ModelSerializer):
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BatchManyRelatedField(**list_kwargs)
+
+
+class TitleCreateSerializer(SparseModelSerializer):
     """
     Сериализатор создания Title.
+    Жанры сохраняются разницей множеств: добавляются и удаляются
+    только изменившиеся строки TitleGenre, одной пакетной вставкой
+    и одним удалением.
     """
     category = serializers.SlugRelatedField(
         slug_field='slug',
         queryset=Category.objects.all()
     )
-    genre = serializers.SlugRelatedField(
+    genre = BatchSlugRelatedField(
         slug_field='slug',
         queryset=Genre.objects.all(),
         many=True
@@ -226,7 +272,7 @@ class TitleCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = ('rating', 'rating_sum', 'rating_count', 'updated_at')
 
     def validate(self, data):
         try:
@@ -234,3 +280,62 @@ class TitleCreateSerializer(serializers.ModelSerializer):
         except KeyError:
             print('Необходимо указать год')
         return data
+
+    @staticmethod
+    def set_genres(title, genres):
+        """
+        Приводит жанры произведения к списку genres.
+        Возвращает True, если набор жанров изменился.
+        """
+        # Берет предвыбранные жанры, если вью их подтянул.
+        current = {genre.pk for genre in title.genre.all()}
+        target = list(dict.fromkeys(genre.pk for genre in genres))
+        to_add = [pk for pk in target if pk not in current]
+        to_remove = current.difference(target)
+        if to_remove:
+            # Один DELETE без выборки строк и post_delete на каждую:
+            # у TitleGenre нет каскадов, версия сбрасывается ниже.
+            removed = TitleGenre.objects.filter(
+                title=title, genre_id__in=to_remove
+            )
+            removed._raw_delete(removed.db)
+        if to_add:
+            TitleGenre.objects.bulk_create([
+                TitleGenre(title=title, genre_id=pk) for pk in to_add
+            ])
+        if not (to_add or to_remove):
+            return False
+        # bulk_create и _raw_delete сигналов не отправляют.
+        cache.bump_versions('reviews.TitleGenre')
+        return True
+
+    def create(self, validated_data):
+        genres = validated_data.pop('genre')
+        with transaction.atomic():
+            title = Title.objects.create(**validated_data)
+            self.set_genres(title, genres)
+        return title
+
+    def update(self, instance, validated_data):
+        genres = validated_data.pop('genre', None)
+        changed = []
+        for name, value in validated_data.items():
+            # Внешние ключи сравниваются по id, без запроса объекта.
+            attname = Title._meta.get_field(name).attname
+            current = getattr(instance, attname)
+            if attname != name:
+                changed_value = current != getattr(value, 'pk', None)
+            else:
+                changed_value = current != value
+            if changed_value:
+                setattr(instance, name, value)
+                changed.append(name)
+        with transaction.atomic():
+            genres_changed = (
+                genres is not None and self.set_genres(instance, genres)
+            )
+            # Сохраняются только изменившиеся поля: индекс поиска
+            # обновляется лишь при смене name или description.
+            if changed or genres_changed:
+                instance.save(update_fields=changed + ['updated_at'])
+        return instance
@@ -0,0 +1,53 @@
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_migrate, post_save
+)
+from django.dispatch import receiver
+
+from reviews.models import (
+    Category, Genre, Review, Title, TitleGenre, User
+)
+
+from . import authentication, cache
+
+CACHED_MODELS = (Title, Genre, Category, TitleGenre, Review)
+
+
+def bump_model_version(sender, **kwargs):
+    cache.bump_versions(sender._meta.label)
+
+
+for model in CACHED_MODELS:
+    post_save.connect(
+        bump_model_version, sender=model,
+        dispatch_uid=f'api_cache_save_{model._meta.label}',
+    )
+    post_delete.connect(
+        bump_model_version, sender=model,
+        dispatch_uid=f'api_cache_delete_{model._meta.label}',
+    )
+
+
+@receiver(m2m_changed, sender=TitleGenre)
+def bump_title_genre_version(sender, action, **kwargs):
+    if action.startswith('post_'):
+        cache.bump_versions(TitleGenre._meta.label)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    """Роль или активность юзера могли измениться - сбрасываем слепок."""
+    authentication.forget_user(instance.pk)
+
+
+@receiver(post_migrate)
+def reset_caches(sender, **kwargs):
+    """
+    Миграции и flush меняют данные в обход сигналов моделей,
+    поэтому после них сбрасываем версии и кеш аутентификации.
+    Счетчики лимитов не трогаем: миграция при выкладке не должна
+    снимать ограничения.
+    """
+    if sender.label == 'reviews':
+        cache.bump_versions(*(model._meta.label for model in CACHED_MODELS))
+        authentication.clear_caches()
@@ -0,0 +1,170 @@
+"""
+Разреженные наборы полей: ?fields=id,name и ?omit=genre.
+
+'fields' оставляет в ответе только перечисленные поля, 'omit'
+убирает перечисленные; параметры действуют только на безопасные
+запросы и только на поля верхнего уровня. Неизвестное имя поля -
+ошибка 400, а не молча полный ответ.
+
+SparseFieldsSerializerMixin (базы SparseSerializer и
+SparseModelSerializer) убирает поля из сериализатора,
+SparseFieldsViewMixin - из кверисета вью-сета: колонки через only(),
+а select_related и prefetch_related остаются только для связей,
+которые попадут в ответ.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def parse_names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def is_sparse(request):
+    """Просит ли запрос неполный набор полей."""
+    if request is None or request.method not in SAFE_METHODS:
+        return False
+    params = getattr(request, 'query_params', request.GET)
+    return bool(params.get(FIELDS_PARAM) or params.get(OMIT_PARAM))
+
+
+def requested_fields(request, available):
+    """
+    Имена полей ответа из available в их исходном порядке
+    или None, если запрос просит все поля.
+    """
+    if not is_sparse(request):
+        return None
+    params = getattr(request, 'query_params', request.GET)
+    fields = parse_names(params.get(FIELDS_PARAM, ''))
+    omit = parse_names(params.get(OMIT_PARAM, ''))
+    errors = {}
+    for param, names in ((FIELDS_PARAM, fields), (OMIT_PARAM, omit)):
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            errors[param] = (
+                f'Неизвестные поля: {", ".join(unknown)}. '
+                f'Доступны: {", ".join(available)}.'
+            )
+    if errors:
+        raise ValidationError(errors)
+    return [
+        name for name in available
+        if (not fields or name in fields) and name not in omit
+    ]
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Убирает из сериализатора поля, не запрошенные параметрами
+    'fields' / 'omit'. Вложенные сериализаторы создаются без
+    контекста и отдаются целиком.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        keep = requested_fields(request, list(self.fields))
+        if keep is not None:
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
+
+
+class SparseSerializer(SparseFieldsSerializerMixin, serializers.Serializer):
+    pass
+
+
+class SparseModelSerializer(
+    SparseFieldsSerializerMixin, serializers.ModelSerializer
+):
+    pass
+
+
+def lookup_root(lookup):
+    if isinstance(lookup, Prefetch):
+        lookup = lookup.prefetch_to
+    return lookup.split('__')[0]
+
+
+def select_related_paths(tree, prefix=''):
+    """Пути select_related из дерева query.select_related."""
+    paths = []
+    for name, subtree in tree.items():
+        path = f'{prefix}{name}'
+        paths.extend(select_related_paths(subtree, f'{path}__') or [path])
+    return paths
+
+
+def restrict_queryset(queryset, sources, required=()):
+    """
+    Сужает кверисет до атрибутов sources (source полей сериализатора)
+    и required. Колонки, джойны и предвыборки остальных полей
+    в запрос не попадают.
+    """
+    model = queryset.model
+    opts = model._meta
+    if '*' in sources or queryset.query.select_related is True:
+        # Поле читает весь объект или джойнятся все связи - сузить
+        # запрос без риска лишних запросов на объект нельзя.
+        return queryset
+    roots = {source.split('.')[0] for source in sources}
+    roots.update(required)
+    # Кверисет связанного менеджера (title.reviews) проставляет
+    # объектам внешний ключ на владельца и читает его колонку.
+    roots.update(field.name for field in queryset._known_related_objects)
+    columns = [opts.pk.name]
+    for name in roots:
+        try:
+            field = opts.get_field(name)
+        except FieldDoesNotExist:
+            # Свойство модели или аннотация: неизвестно, какие
+            # колонки ему нужны.
+            return queryset
+        if field.concrete and not field.many_to_many:
+            columns.append(name)
+    select = queryset.query.select_related
+    select = select_related_paths(select) if select else []
+    prefetch = queryset._prefetch_related_lookups
+    queryset = queryset.select_related(None).prefetch_related(None)
+    select = [path for path in select if path.split('__')[0] in roots]
+    if select:
+        queryset = queryset.select_related(*select)
+    prefetch = [lookup for lookup in prefetch if lookup_root(lookup) in roots]
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset.only(*dict.fromkeys(columns))
+
+
+class SparseFieldsViewMixin:
+    """
+    Применяет 'fields' / 'omit' к кверисету вью-сета. Кроме полей
+    ответа загружаются поля, нужные самому вью-сету: updated_at
+    для ETag и ключ курсорной пагинации.
+    """
+
+    def get_sparse_required(self, model):
+        opts = model._meta
+        required = [
+            name.lstrip('-') for name in getattr(self, 'cursor_ordering', ())
+        ]
+        if any(field.name == 'updated_at' for field in opts.fields):
+            required.append('updated_at')
+        return required
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if not is_sparse(self.request):
+            return queryset
+        fields = self.get_serializer_class()().fields
+        keep = requested_fields(self.request, list(fields))
+        return restrict_queryset(
+            queryset, [fields[name].source for name in keep],
+            self.get_sparse_required(queryset.model),
+        )
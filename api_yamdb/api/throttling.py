@@ -0,0 +1,229 @@
+"""
+Ограничение частоты запросов к эндпоинтам регистрации и выдачи токена.
+
+Счетчики хранятся в отдельном SQLite-файле, общем для всех процессов
+сервера. Используется скользящее окно из двух корзин: число запросов
+в текущем окне плюс доля запросов предыдущего окна, пропорциональная
+еще не истекшей его части. Проверка - один INSERT ... ON CONFLICT
+по первичному ключу (ключ, номер окна), так что хранилище не становится
+узким местом; отказ в запросе счетчик не увеличивает. UPSERT требует
+SQLite 3.24 и новее (см. check_sqlite).
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import throttling
+
+DEFAULTS = {
+    'PATH': 'throttle.sqlite3',
+    'TIMEOUT': 5,
+    'PURGE_EVERY': 1000,
+}
+# INSERT ... ON CONFLICT DO UPDATE.
+MIN_SQLITE_VERSION = (3, 24, 0)
+
+SCHEMA_SQL = '''
+CREATE TABLE IF NOT EXISTS throttle (
+    key TEXT NOT NULL,
+    window INTEGER NOT NULL,
+    hits INTEGER NOT NULL,
+    expires INTEGER NOT NULL,
+    PRIMARY KEY (key, window)
+) WITHOUT ROWID
+'''
+
+HIT_SQL = '''
+INSERT INTO throttle (key, window, hits, expires)
+SELECT :key, :window, 1, :expires
+WHERE coalesce(
+    (SELECT hits FROM throttle WHERE key = :key AND window = :window), 0
+) + :weight * coalesce(
+    (SELECT hits FROM throttle WHERE key = :key AND window = :window - 1), 0
+) < :limit
+ON CONFLICT (key, window) DO UPDATE SET hits = hits + 1
+'''
+
+COUNTS_SQL = '''
+SELECT window, hits FROM throttle
+WHERE key = :key AND window IN (:window, :window - 1)
+'''
+
+
+def get_setting(name):
+    return getattr(settings, 'API_THROTTLE', {}).get(name, DEFAULTS[name])
+
+
+def check_sqlite():
+    """Проверяет, что SQLite поддерживает UPSERT."""
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        raise ImproperlyConfigured(
+            f'Лимиты запросов требуют SQLite '
+            f'{".".join(map(str, MIN_SQLITE_VERSION))} и новее, '
+            f'установлена {sqlite3.sqlite_version}.'
+        )
+
+
+def retry_after(limit, period, elapsed, current, previous):
+    """
+    Через сколько целых секунд оценка окна станет строго меньше
+    лимита, если новых запросов не будет.
+    """
+    if current >= limit:
+        # Ждем начала следующего окна и затухания текущего.
+        wait = period - elapsed + period * (1 - limit / current)
+    else:
+        wait = period * (1 - (limit - current) / previous) - elapsed
+    return max(1, math.floor(wait) + 1)
+
+
+class SlidingWindowStore:
+    """Счетчики скользящего окна в SQLite-файле, общем для процессов."""
+
+    def __init__(self, path, timeout=5, purge_every=1000):
+        check_sqlite()
+        self.path = path
+        self.timeout = timeout
+        self.purge_every = purge_every
+        self.local = threading.local()
+        self.checks = 0
+
+    def connect(self):
+        connection = getattr(self.local, 'connection', None)
+        # После fork соединение родителя использовать нельзя.
+        if connection is not None and self.local.pid == os.getpid():
+            return connection
+        connection = sqlite3.connect(
+            self.path, timeout=self.timeout,
+            isolation_level=None, check_same_thread=False,
+        )
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(SCHEMA_SQL)
+        self.local.connection = connection
+        self.local.pid = os.getpid()
+        return connection
+
+    def hit(self, key, limit, period, now=None):
+        """
+        Учитывает запрос, если лимит не исчерпан.
+        Возвращает (разрешен ли запрос, сколько секунд ждать).
+        """
+        now = time.time() if now is None else now
+        window, elapsed = divmod(now, period)
+        window = int(window)
+        params = {
+            'key': key,
+            'window': window,
+            'expires': (window + 2) * period,
+            'weight': 1 - elapsed / period,
+            'limit': limit,
+        }
+        connection = self.connect()
+        # Строка вставлена или обновлена, только если лимит не исчерпан.
+        allowed = connection.execute(HIT_SQL, params).rowcount == 1
+        self.checks += 1
+        if self.checks % self.purge_every == 0:
+            self.purge(now)
+        if allowed:
+            return True, None
+        counts = dict(connection.execute(COUNTS_SQL, params).fetchall())
+        return False, retry_after(
+            limit, period, elapsed,
+            counts.get(window, 0), counts.get(window - 1, 0),
+        )
+
+    def purge(self, now=None):
+        now = time.time() if now is None else now
+        self.connect().execute(
+            'DELETE FROM throttle WHERE expires < ?', (now,)
+        )
+
+    def clear(self):
+        self.connect().execute('DELETE FROM throttle')
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            path = get_setting('PATH')
+            if not os.path.isabs(path):
+                path = os.path.join(settings.BASE_DIR, path)
+            _store = SlidingWindowStore(
+                path,
+                timeout=get_setting('TIMEOUT'),
+                purge_every=get_setting('PURGE_EVERY'),
+            )
+        return _store
+
+
+class SlidingWindowThrottle(throttling.SimpleRateThrottle):
+    """
+    Ограничение по скользящему окну. Как и в ScopedRateThrottle,
+    область берется из атрибута вью throttle_scope и дополняется
+    суффиксом класса: 'signup_ip', 'token_username' и т.д.
+    """
+
+    scope_attr = 'throttle_scope'
+    scope_suffix = None
+
+    def __init__(self):
+        # Лимит зависит от вью, поэтому определяется в allow_request.
+        self.wait_seconds = None
+
+    def allow_request(self, request, view):
+        scope = getattr(view, self.scope_attr, None)
+        if not scope:
+            return True
+        self.scope = f'{scope}_{self.scope_suffix}'
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        allowed, self.wait_seconds = get_store().hit(
+            key, self.num_requests, self.duration
+        )
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class AuthIPThrottle(SlidingWindowThrottle):
+    """Лимит запросов с одного IP-адреса."""
+
+    scope_suffix = 'ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request),
+        }
+
+
+class AuthUsernameThrottle(SlidingWindowThrottle):
+    """Лимит запросов для одного username, с какого бы IP они ни шли."""
+
+    scope_suffix = 'username'
+
+    def get_cache_key(self, request, view):
+        data = request.data
+        username = data.get('username') if hasattr(data, 'get') else None
+        if not isinstance(username, str) or not username.strip():
+            return None
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': username.strip().lower()[:150],
+        }
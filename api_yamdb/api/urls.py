@@ -25,5 +25,6 @@ urlpatterns = [
     path('v1/auth/signup/', views.RegistrationView.as_view()),
     path('v1/auth/token/', views.TokenObtainApiYamdbView.as_view()),
     path('v1/users/me/', views.MeUserAPIView.as_view()),
+    path('v1/titles/export/', views.TitleExportView.as_view()),
     path('v1/', include(router.urls)),
 ]
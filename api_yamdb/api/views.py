@@ -1,19 +1,28 @@
+from django.db.models import Prefetch
+from django.db.models.expressions import RawSQL
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets, filters, mixins
+from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenViewBase
-from django.db.models import Avg
 
-from . import serializers as s
+from . import bulk, serializers as s
+from .cache import CachedListMixin, CachedRetrieveMixin
+from .conditional import ConditionalListMixin, ConditionalRetrieveMixin
+from .fast import FastListMixin
+from .pagination import ApiPagination
 from .permissions import (
     AdminOnly, SelfOnly, IsAdminOrReadOnly, ReviewCommentPermission)
-from reviews.models import User, Review, Category, Genre, Title
-from api.filters import TitleFilter
+from .sparse import SparseFieldsViewMixin
+from .throttling import AuthIPThrottle, AuthUsernameThrottle
+from reviews import export
+from reviews.models import User, Review, Category, Genre, Title, TitleGenre
+from api.filters import TitleFilter, TitleSearchFilter
 
 
 class ListCreateDeleteViewSet(
@@ -23,7 +32,7 @@ class ListCreateDeleteViewSet(
     pass
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """
     Отображает, создает, обновляет и удаляет
     инстансы, относящиеся к :model:'posts.Post'.
@@ -36,10 +45,11 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = s.UserSerializer
     permission_classes = [AdminOnly, ]
-    pagination_class = PageNumberPagination
+    pagination_class = ApiPagination
     filter_backends = (filters.SearchFilter,)
     search_fields = ('username',)
     lookup_field = 'username'
+    cursor_ordering = ('-id',)
 
 
 class MeUserAPIView(APIView):
@@ -55,7 +65,7 @@ class MeUserAPIView(APIView):
 
     def get(self, request):
         user = get_object_or_404(User, username=request.user.username)
-        serializer = s.MeUserSerializer(user)
+        serializer = s.MeUserSerializer(user, context={'request': request})
         return Response(serializer.data)
 
     def patch(self, request):
@@ -76,9 +86,12 @@ class RegistrationView(APIView):
     Любой допущен к регистрации таких инстансов.
     Также отправляет confirmation_code для получения jwt-токена.
     Поля - 'username' и 'email'.
+    Частота запросов ограничена по IP и по username.
     """
 
     permission_classes = [AllowAny, ]
+    throttle_classes = (AuthIPThrottle, AuthUsernameThrottle)
+    throttle_scope = 'signup'
 
     def post(self, request):
         """"Обработка POST-запроса на эндпоинт v1/auth/signup."""
@@ -124,19 +137,26 @@ class TokenObtainApiYamdbView(TokenViewBase):
     По сравнению с базовым: переопределен сериализатор.
     Введена настройка доступа - "для всех" - отличная
     от настроек проекта в settings.py.
+    Частота запросов ограничена по IP и по username.
     """
 
     permission_classes = (AllowAny,)
+    throttle_classes = (AuthIPThrottle, AuthUsernameThrottle)
+    throttle_scope = 'token'
     serializer_class = s.YAMDbTokenObtainSerializer
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(
+    SparseFieldsViewMixin, FastListMixin, ConditionalListMixin,
+    ConditionalRetrieveMixin, viewsets.ModelViewSet
+):
     """
     Вью-сет для отзывов.
     """
     serializer_class = s.ReviewSerializer
     permission_classes = [ReviewCommentPermission]
-    pagination_class = PageNumberPagination
+    pagination_class = ApiPagination
+    cursor_ordering = ('pub_date', 'id')
 
     def get_queryset(self):
         title_id = self.kwargs.get('title_id')
@@ -150,14 +170,18 @@ class ReviewViewSet(viewsets.ModelViewSet):
         serializer.save(title=title, author=author)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(
+    SparseFieldsViewMixin, FastListMixin, ConditionalListMixin,
+    ConditionalRetrieveMixin, viewsets.ModelViewSet
+):
     """
     Вью-сет для комментариев.
     """
 
     serializer_class = s.CommentSerializer
     permission_classes = [ReviewCommentPermission]
-    pagination_class = PageNumberPagination
+    pagination_class = ApiPagination
+    cursor_ordering = ('pub_date', 'id')
 
     def get_queryset(self):
         title_id = self.kwargs.get('title_id')
@@ -173,47 +197,137 @@ class CommentViewSet(viewsets.ModelViewSet):
         serializer.save(review=review, author=author)
 
 
-class TitlesViewSet(viewsets.ModelViewSet):
+class TitlesViewSet(
+    SparseFieldsViewMixin, CachedListMixin, CachedRetrieveMixin,
+    FastListMixin, ConditionalListMixin, ConditionalRetrieveMixin,
+    viewsets.ModelViewSet
+):
     """
     Вью-сет для Titles.
+    Категория подтягивается джойном, жанры - одним пакетным
+    запросом через TitleGenre, рейтинг хранится в самой модели,
+    поэтому число запросов на страницу не зависит от ее размера.
     """
 
-    queryset = Title.objects.all().annotate(
-        Avg("reviews__score")).order_by("id")
-    filter_backends = (DjangoFilterBackend, )
+    queryset = Title.objects.select_related('category').prefetch_related(
+        Prefetch('genre', queryset=Genre.objects.order_by(
+            # Порядок индекса titlegenre_title_genre_idx: SQLite читает
+            # жанры страницы без сортировки во временном B-дереве,
+            # а внутри произведения они идут по убыванию id, как
+            # в Genre.Meta.ordering.
+            RawSQL(f'"{TitleGenre._meta.db_table}"."title_id"', ()).desc(),
+            RawSQL(f'"{TitleGenre._meta.db_table}"."genre_id"', ()).desc(),
+        ))
+    ).order_by("id")
+    filter_backends = (DjangoFilterBackend, TitleSearchFilter)
     filterset_class = TitleFilter
     permission_classes = (IsAdminOrReadOnly, )
-    pagination_class = PageNumberPagination
+    pagination_class = ApiPagination
+    cursor_ordering = ('-id',)
+    cache_dependencies = (
+        'reviews.Title', 'reviews.Genre', 'reviews.Category',
+        'reviews.TitleGenre', 'reviews.Review',
+    )
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return s.TitleListSerializer
+        if self.action == 'bulk':
+            return s.TitleBulkItemSerializer
         return s.TitleCreateSerializer
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Создает и обновляет произведения пакетом. Пакет записывается
+        целиком или не записывается вовсе; ошибки возвращаются списком
+        в порядке элементов, как у сериализатора с many=True.
+        """
+        if not isinstance(request.data, list) or not request.data:
+            raise ValidationError(
+                {'detail': 'Ожидается непустой список произведений.'}
+            )
+        if len(request.data) > bulk.MAX_ITEMS:
+            raise ValidationError({'detail': (
+                f'В пакете не может быть больше {bulk.MAX_ITEMS} элементов.'
+            )})
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data
+        categories, genres, errors = bulk.resolve(items)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        titles = bulk.save(items, categories, genres)
+        for item, title in zip(items, titles):
+            item['id'] = title.pk
+        return Response(
+            self.get_serializer(items, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
+
+
+class TitleExportView(APIView):
+    """
+    Потоковая выгрузка всего каталога для партнеров.
+    Доступна только администраторам. Параметры запроса:
+    'output' - ndjson (по умолчанию) или csv;
+    'updated_since' - дата или дата-время последнего изменения;
+    'include' - reviews и/или comments (только для ndjson).
+    """
+
+    permission_classes = [AdminOnly, ]
+
+    def get(self, request):
+        params = request.query_params
+        output = params.get('output', 'ndjson')
+        try:
+            updated_since = params.get('updated_since')
+            if updated_since:
+                updated_since = export.parse_updated_since(updated_since)
+            include = export.parse_include(params.get('include'))
+            rows = export.export_catalog(output, updated_since, include)
+        except ValueError as error:
+            raise ValidationError({'detail': str(error)})
+        response = StreamingHttpResponse(
+            rows, content_type=export.CONTENT_TYPES[output]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="titles.{output}"'
+        )
+        return response
+
 
-class GenresViewSet(ListCreateDeleteViewSet):
+class GenresViewSet(
+    SparseFieldsViewMixin, CachedListMixin, FastListMixin,
+    ConditionalListMixin, ListCreateDeleteViewSet
+):
     """
     Вью-сет для жанров.
     """
 
     queryset = Genre.objects.all()
     serializer_class = s.GenreSerializer
+    cache_dependencies = ('reviews.Genre', )
     filter_backends = (filters.SearchFilter, )
     search_fields = ('name', )
     permission_classes = (IsAdminOrReadOnly, )
     lookup_field = 'slug'
-    pagination_class = PageNumberPagination
+    pagination_class = ApiPagination
 
 
-class CategoriesViewSet(ListCreateDeleteViewSet):
+class CategoriesViewSet(
+    SparseFieldsViewMixin, CachedListMixin, FastListMixin,
+    ConditionalListMixin, ListCreateDeleteViewSet
+):
     """
     Вью-сет для категорий.
     """
 
     queryset = Category.objects.all()
     serializer_class = s.CategorySerializer
+    cache_dependencies = ('reviews.Category', )
     filter_backends = (filters.SearchFilter, )
     search_fields = ('name', )
     permission_classes = (IsAdminOrReadOnly, )
     lookup_field = 'slug'
-    pagination_class = PageNumberPagination
+    pagination_class = ApiPagination
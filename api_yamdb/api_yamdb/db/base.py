@@ -0,0 +1,112 @@
+"""
+Бэкенд SQLite с профилями для продакшена (ENGINE 'api_yamdb.db').
+
+Поверх стандартного django.db.backends.sqlite3 умеет:
+- выполнять PRAGMAS из настроек базы на каждом новом соединении
+  (journal_mode=WAL, synchronous, cache_size, mmap_size, temp_store);
+- открывать транзакции atomic() через BEGIN IMMEDIATE
+  (IMMEDIATE_TRANSACTIONS), чтобы пишущая транзакция брала блокировку
+  сразу, а не падала на повышении блокировки с чтения до записи;
+- повторять запросы вне транзакции, в том числе BEGIN, получившие
+  "database is locked", с экспоненциальной паузой и случайным
+  разбросом (BUSY_RETRY): конкурирующие писатели расходятся во времени
+  вместо того, чтобы будить друг друга одновременно.
+
+Без этих ключей бэкенд ведет себя как стандартный.
+"""
+import random
+import time
+
+from django.db.backends.sqlite3 import base
+
+DEFAULT_BUSY_RETRY = {
+    # Общее время ожидания, с.
+    'TIMEOUT': 0,
+    'BASE_DELAY': 0.002,
+    'MAX_DELAY': 0.1,
+}
+
+
+def is_locked(error):
+    message = str(error)
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def retry_locked(func, timeout, base_delay, max_delay):
+    """
+    Вызывает func, пока она падает на блокировке базы, но не дольше
+    timeout секунд. Пауза растет вдвое, фактическая - случайная
+    в [0, пауза] ("full jitter").
+    """
+    deadline = time.monotonic() + timeout
+    delay = base_delay
+    while True:
+        try:
+            return func()
+        except base.Database.OperationalError as error:
+            if not is_locked(error) or time.monotonic() >= deadline:
+                raise
+        time.sleep(random.uniform(0, delay))
+        delay = min(max_delay, delay * 2)
+
+
+class RetryingCursorWrapper(base.SQLiteCursorWrapper):
+    """Повторяет запросы на блокировке, если транзакция не открыта:
+    внутри транзакции повтор одного запроса небезопасен."""
+
+    busy_retry = None
+
+    def execute(self, query, params=None):
+        if self.busy_retry is None or self.connection.in_transaction:
+            return super().execute(query, params)
+        return retry_locked(
+            lambda: super(RetryingCursorWrapper, self).execute(query, params),
+            **self.busy_retry
+        )
+
+    def executemany(self, query, param_list):
+        if self.busy_retry is None or self.connection.in_transaction:
+            return super().executemany(query, param_list)
+        param_list = list(param_list)
+        return retry_locked(
+            lambda: super(RetryingCursorWrapper, self).executemany(
+                query, param_list
+            ),
+            **self.busy_retry
+        )
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        retry = self.settings_dict.get('BUSY_RETRY')
+        self.busy_retry = retry and {
+            name.lower(): retry.get(name, default)
+            for name, default in DEFAULT_BUSY_RETRY.items()
+        } or None
+        self.cursor_class = type(
+            'CursorWrapper', (RetryingCursorWrapper,),
+            {'busy_retry': self.busy_retry}
+        )
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in (self.settings_dict.get('PRAGMAS') or {}).items():
+            # Переключение в WAL тоже может упереться в блокировку.
+            self.execute_pragma(conn, f'PRAGMA {name} = {value}')
+        return conn
+
+    def execute_pragma(self, conn, sql):
+        if self.busy_retry is None:
+            return conn.execute(sql)
+        return retry_locked(lambda: conn.execute(sql), **self.busy_retry)
+
+    def create_cursor(self, name=None):
+        return self.connection.cursor(factory=self.cursor_class)
+
+    def _start_transaction_under_autocommit(self):
+        if self.settings_dict.get('IMMEDIATE_TRANSACTIONS'):
+            self.cursor().execute('BEGIN IMMEDIATE')
+        else:
+            super()._start_transaction_under_autocommit()
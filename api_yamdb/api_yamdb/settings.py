@@ -30,6 +30,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Стоят первыми, чтобы замерять весь запрос.
+    'api.metrics.MetricsMiddleware',
+    'api.instrumentation.InstrumentationMiddleware',
+    'api.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,11 +67,94 @@ WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
 # Database
 
+# Профили SQLite (api_yamdb.db): development - настройки по умолчанию,
+# production - WAL, прагмы на каждом соединении, постоянные соединения,
+# BEGIN IMMEDIATE и повтор на блокировке с разбросом пауз.
+DATABASE_PROFILES = {
+    'development': {},
+    'production': {
+        'CONN_MAX_AGE': 600,
+        # Короткое ожидание внутри SQLite, дальше - повторы BUSY_RETRY.
+        'OPTIONS': {'timeout': 0.05},
+        'PRAGMAS': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'cache_size': -65536,
+            'mmap_size': 268435456,
+            'temp_store': 'MEMORY',
+        },
+        'IMMEDIATE_TRANSACTIONS': True,
+        'BUSY_RETRY': {
+            'TIMEOUT': 10,
+            'BASE_DELAY': 0.002,
+            'MAX_DELAY': 0.1,
+        },
+    },
+}
+DATABASE_PROFILE = os.getenv('YAMDB_DB_PROFILE', 'development')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': 'api_yamdb.db',
+        'NAME': os.getenv(
+            'YAMDB_DB_PATH', os.path.join(BASE_DIR, 'db.sqlite3')
+        ),
+        **DATABASE_PROFILES[DATABASE_PROFILE],
+    }
+}
+
+# Реплики для чтения (api.replicas): YAMDB_DB_REPLICAS копий основной
+# базы рядом с ней, их обновляет команда refresh_replicas. Кеш
+# должен быть общим (YAMDB_CACHE_DIR): через него команда сбрасывает
+# ответы, собранные с устаревших реплик, а воркеры узнают о недавних
+# записях клиента.
+DATABASE_REPLICAS = [
+    f'replica{number}'
+    for number in range(1, int(os.getenv('YAMDB_DB_REPLICAS', '0')) + 1)
+]
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias] = dict(
+        DATABASES['default'],
+        NAME='{0}.{2}{1}'.format(
+            *os.path.splitext(DATABASES['default']['NAME']), alias
+        ),
+        PRAGMAS=dict(
+            DATABASES['default'].get('PRAGMAS', {}), query_only='ON'
+        ),
+        TEST={'MIRROR': 'default'},
+    )
+
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+
+DATABASE_REPLICATION = {
+    # Сколько секунд после записи клиент читает из основной базы.
+    'STICKY_SECONDS': 10,
+    'CACHE_ALIAS': 'default',
+    'REFRESH_INTERVAL': 5,
+}
+
+
+# Cache
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'api_yamdb',
+    }
+}
+# Общий для всех процессов кеш: нужен нескольким воркерам и репликам.
+if os.getenv('YAMDB_CACHE_DIR'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('YAMDB_CACHE_DIR'),
     }
+
+# Кеш ответов каталога (api.cache), включается YAMDB_RESPONSE_CACHE=1.
+# Для нескольких воркеров нужен общий бэкенд (YAMDB_CACHE_DIR).
+API_RESPONSE_CACHE = {
+    'ENABLED': os.getenv('YAMDB_RESPONSE_CACHE', '0') == '1',
+    'ALIAS': 'default',
+    'TIMEOUT': 60,
 }
 
 
@@ -110,20 +197,71 @@ STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static/'),)
 
 AUTH_USER_MODEL = 'reviews.User'
 
+AUTHENTICATION_BACKENDS = [
+    'django.contrib.auth.backends.ModelBackend',
+    # Вход по username и confirmation_code (v1/auth/token/).
+    'reviews.backends.ConfirmationCodeBackend',
+]
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Для SMTP в продакшене: 'reviews.email_backends.PooledSMTPEmailBackend'
+# держит пул из EMAIL_POOL_SIZE постоянных соединений.
+EMAIL_POOL_SIZE = 4
+
+# Фоновая очередь писем (reviews.mail). Выключена по умолчанию:
+# тогда письма отправляются синхронно в запросе.
+EMAIL_QUEUE = {
+    'ENABLED': os.getenv('YAMDB_EMAIL_QUEUE', '') == '1',
+    'WORKERS': 2,
+    'QUEUE_SIZE': 1000,
+    'BATCH_SIZE': 50,
+    'RETRIES': 5,
+    'BACKOFF': 0.5,
+    'SPOOL_DIR': os.path.join(BASE_DIR, 'email_spool'),
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
-    'DEFAULT_PAGINATION_CLASS':
-        'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.ApiPagination',
     'PAGE_SIZE': 5,
+    # Лимиты для эндпоинтов v1/auth/ (api.throttling).
+    'DEFAULT_THROTTLE_RATES': {
+        'signup_ip': os.getenv('YAMDB_SIGNUP_IP_RATE', '100/m'),
+        'signup_username': os.getenv('YAMDB_SIGNUP_USERNAME_RATE', '10/m'),
+        'token_ip': os.getenv('YAMDB_TOKEN_IP_RATE', '100/m'),
+        'token_username': os.getenv('YAMDB_TOKEN_USERNAME_RATE', '10/m'),
+    },
+}
+
+# Заголовки Server-Timing и X-Query-Count и перцентили по маршрутам.
+REQUEST_INSTRUMENTATION = {
+    'ENABLED': os.getenv('YAMDB_INSTRUMENTATION', '') == '1',
+    'SAMPLES': 1000,
+}
+
+# Эндпоинт /metrics (api.metrics), включается явно. С TOKEN требует
+# Authorization: Bearer <токен>. В DIR процессы WSGI-сервера
+# складывают свои метрики, чтобы /metrics отдавал их сумму.
+METRICS = {
+    'ENABLED': os.getenv('YAMDB_METRICS', '0') == '1',
+    'TOKEN': os.getenv('YAMDB_METRICS_TOKEN', ''),
+    'DIR': os.getenv('YAMDB_METRICS_DIR', ''),
+    'FLUSH_INTERVAL': 1.0,
+}
+
+# Общее для всех процессов хранилище счетчиков лимитов.
+API_THROTTLE = {
+    'PATH': os.path.join(BASE_DIR, 'throttle.sqlite3'),
+    'TIMEOUT': 5,
+    'PURGE_EVERY': 1000,
 }
 
 SIMPLE_JWT = {
@@ -131,3 +269,9 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
+
+# Кеш расшифрованных токенов и слепков юзеров (api.authentication).
+JWT_AUTH_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 300,
+}
@@ -0,0 +1,38 @@
+"""
+Бэкенд аутентификации по confirmation_code.
+
+confirmation_code - дефолтный токен Django, который отправляется
+юзеру на email при запросе к v1/auth/signup/. Проверка токена не требует
+дополнительных запросов к базе, поэтому выдача jwt-токена обходится
+одной выборкой юзера.
+"""
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.tokens import default_token_generator
+
+from .models import User
+
+
+class ConfirmationCodeBackend(ModelBackend):
+    """Проверяет пару username/confirmation_code."""
+
+    def get_by_username(self, username):
+        """Возвращает юзера одним запросом или None."""
+        try:
+            return User._default_manager.get(username=username)
+        except User.DoesNotExist:
+            return None
+
+    def check_code(self, user, confirmation_code):
+        return (
+            self.user_can_authenticate(user)
+            and default_token_generator.check_token(user, confirmation_code)
+        )
+
+    def authenticate(self, request, username=None, confirmation_code=None,
+                     **kwargs):
+        if username is None or confirmation_code is None:
+            return None
+        user = self.get_by_username(username)
+        if user is not None and self.check_code(user, confirmation_code):
+            return user
+        return None
@@ -0,0 +1,143 @@
+"""
+SMTP-бэкенд с пулом постоянных соединений.
+
+Django-бэкенд SMTP открывает и закрывает соединение на каждый
+вызов send_messages вне контекста open()/close(). Здесь открытые
+соединения возвращаются в общий для процесса пул и переиспользуются,
+а разорванное сервером соединение переоткрывается с повтором
+отправки письма, на котором случился обрыв.
+"""
+import queue
+import smtplib
+import socket
+import threading
+
+from django.conf import settings
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.backends.smtp import EmailBackend as SMTPEmailBackend
+
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, socket.error)
+
+
+class ConnectionPool:
+    """Пул открытых SMTP-соединений к одному серверу."""
+
+    def __init__(self, factory, size):
+        self.factory = factory
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            create = self.created < self.size
+            if create:
+                self.created += 1
+        if create:
+            try:
+                return self.connect()
+            except Exception:
+                with self.lock:
+                    self.created -= 1
+                raise
+        return self.idle.get(timeout=timeout)
+
+    def release(self, connection):
+        self.idle.put(connection)
+
+    def discard(self, connection):
+        """Закрывает сломанное соединение и освобождает место в пуле."""
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self.lock:
+            self.created -= 1
+
+    def connect(self):
+        connection = self.factory()
+        connection.open()
+        return connection
+
+    def close_all(self):
+        while True:
+            try:
+                connection = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            self.discard(connection)
+
+
+class PooledSMTPEmailBackend(BaseEmailBackend):
+    """
+    Почтовый бэкенд поверх пула SMTP-соединений.
+    Размер пула - EMAIL_POOL_SIZE (по умолчанию 4). Параметры
+    соединения - те же, что у django.core.mail.backends.smtp.
+    """
+
+    pools = {}
+    pools_lock = threading.Lock()
+
+    def __init__(self, fail_silently=False, pool_size=None, **kwargs):
+        super().__init__(fail_silently=fail_silently)
+        self.smtp_kwargs = kwargs
+        probe = SMTPEmailBackend(**kwargs)
+        key = (
+            probe.host, probe.port, probe.username,
+            probe.use_tls, probe.use_ssl,
+        )
+        size = pool_size or getattr(settings, 'EMAIL_POOL_SIZE', 4)
+        with self.pools_lock:
+            if key not in self.pools:
+                self.pools[key] = ConnectionPool(self.make_connection, size)
+            self.pool = self.pools[key]
+
+    def make_connection(self):
+        return SMTPEmailBackend(fail_silently=False, **self.smtp_kwargs)
+
+    @classmethod
+    def close_pools(cls):
+        with cls.pools_lock:
+            pools, cls.pools = cls.pools, {}
+        for pool in pools.values():
+            pool.close_all()
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+        connection = None
+        sent = 0
+        try:
+            connection = self.pool.acquire()
+            for message in email_messages:
+                sent += self.send_one(connection, message)
+        except Exception:
+            if connection is not None:
+                self.pool.discard(connection)
+                connection = None
+            if not self.fail_silently:
+                raise
+        finally:
+            if connection is not None:
+                self.pool.release(connection)
+        return sent
+
+    def send_one(self, connection, message):
+        """
+        Отправляет письмо; если сервер закрыл соединение,
+        переоткрывает его и повторяет только это письмо.
+        """
+        try:
+            return connection.send_messages([message])
+        except RECONNECT_ERRORS:
+            try:
+                connection.close()
+            except Exception:
+                connection.connection = None
+        connection.open()
+        return connection.send_messages([message])
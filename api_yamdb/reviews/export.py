@@ -0,0 +1,179 @@
+import csv
+import datetime
+import json
+from collections import defaultdict
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Comments, Review, Title, TitleGenre
+
+FORMATS = ('ndjson', 'csv')
+INCLUDES = ('reviews', 'comments')
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+CSV_HEADER = (
+    'id', 'name', 'year', 'description', 'category', 'genre',
+    'rating', 'updated_at',
+)
+
+
+def parse_updated_since(value):
+    """
+    Разбирает дату или дату-время из параметра updated_since.
+    Выбрасывает ValueError при неверном формате.
+    """
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Неверная дата: {value}')
+        moment = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, timezone.utc)
+    return moment
+
+
+def parse_include(value):
+    """Разбирает список вложенных сущностей: 'reviews,comments'."""
+    include = {item for item in value.split(',') if item} if value else set()
+    unknown = include - set(INCLUDES)
+    if unknown:
+        raise ValueError(f'Неизвестные значения include: {sorted(unknown)}')
+    if 'comments' in include:
+        include.add('reviews')
+    return include
+
+
+def isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def iter_titles(updated_since=None, include=(), chunk_size=500):
+    """
+    Генератор произведений каталога в виде словарей.
+    Читает таблицу пачками по первичному ключу (keyset), на каждую
+    пачку - один запрос за жанрами и, по запросу, за отзывами
+    и комментариями. Память не зависит от размера таблицы.
+    """
+    queryset = Title.objects.order_by('id')
+    if updated_since is not None:
+        queryset = queryset.filter(updated_at__gte=updated_since)
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).values(
+            'id', 'name', 'year', 'description', 'rating', 'updated_at',
+            'category__name', 'category__slug',
+        )[:chunk_size])
+        if not rows:
+            return
+        ids = [row['id'] for row in rows]
+        genres = defaultdict(list)
+        title_genres = TitleGenre.objects.filter(
+            title_id__in=ids
+        ).order_by('title_id', '-genre_id').values_list(
+            'title_id', 'genre__name', 'genre__slug'
+        )
+        for title_id, name, slug in title_genres:
+            genres[title_id].append({'name': name, 'slug': slug})
+        reviews = iter_reviews(ids, 'comments' in include) if include else {}
+        for row in rows:
+            category = None
+            if row['category__slug'] is not None:
+                category = {
+                    'name': row['category__name'],
+                    'slug': row['category__slug'],
+                }
+            item = {
+                'id': row['id'],
+                'name': row['name'],
+                'year': row['year'],
+                'description': row['description'],
+                'category': category,
+                'genre': genres[row['id']],
+                'rating': row['rating'],
+                'updated_at': isoformat(row['updated_at']),
+            }
+            if include:
+                item['reviews'] = reviews.get(row['id'], [])
+            yield item
+        last_id = ids[-1]
+
+
+def iter_reviews(title_ids, with_comments):
+    """Отзывы (и комментарии к ним) для пачки произведений."""
+    reviews = defaultdict(list)
+    by_id = {}
+    rows = Review.objects.filter(title_id__in=title_ids).order_by(
+        'title_id', 'pub_date', 'id'
+    ).values(
+        'id', 'title_id', 'text', 'author__username', 'score', 'pub_date'
+    )
+    for row in rows:
+        review = {
+            'id': row['id'],
+            'text': row['text'],
+            'author': row['author__username'],
+            'score': row['score'],
+            'pub_date': isoformat(row['pub_date']),
+        }
+        if with_comments:
+            review['comments'] = []
+            by_id[row['id']] = review
+        reviews[row['title_id']].append(review)
+    if by_id:
+        comments = Comments.objects.filter(review_id__in=by_id).order_by(
+            'review_id', 'pub_date', 'id'
+        ).values('id', 'review_id', 'text', 'author__username', 'pub_date')
+        for row in comments:
+            by_id[row['review_id']]['comments'].append({
+                'id': row['id'],
+                'text': row['text'],
+                'author': row['author__username'],
+                'pub_date': isoformat(row['pub_date']),
+            })
+    return reviews
+
+
+def render_ndjson(items):
+    for item in items:
+        yield json.dumps(item, ensure_ascii=False) + '\n'
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(items):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for item in items:
+        category = item['category']
+        yield writer.writerow((
+            item['id'],
+            item['name'],
+            item['year'],
+            item['description'],
+            category['slug'] if category else '',
+            ','.join(genre['slug'] for genre in item['genre']),
+            '' if item['rating'] is None else item['rating'],
+            item['updated_at'],
+        ))
+
+
+def export_catalog(output='ndjson', updated_since=None, include=(),
+                   chunk_size=500):
+    """Потоковый экспорт каталога: генератор строк выбранного формата."""
+    if output not in FORMATS:
+        raise ValueError(f'Неизвестный формат: {output}')
+    if include and output != 'ndjson':
+        raise ValueError('Вложенные отзывы доступны только в формате ndjson')
+    items = iter_titles(updated_since, include, chunk_size)
+    if output == 'csv':
+        return render_csv(items)
+    return render_ndjson(items)
@@ -0,0 +1,353 @@
+"""
+Генератор нагрузки на asyncio для запущенного экземпляра API.
+
+Каждый виртуальный юзер держит свое keep-alive соединение
+(HTTP/1.1 поверх asyncio streams, без сторонних библиотек)
+и выполняет сценарии из взвешенной смеси: просмотр каталога,
+чтение отзывов и комментариев, публикация отзывов и комментариев
+с jwt-токеном, полученным через v1/auth/token/.
+"""
+import asyncio
+import json
+import random
+import time
+from urllib.parse import urlencode, urlsplit
+
+from api.instrumentation import percentile
+
+SEARCH_WORDS = ('война', 'море', 'звезда', 'город')
+# Методы, которые можно повторить после обрыва соединения.
+RETRY_METHODS = ('GET', 'HEAD')
+DEFAULT_MIX = {
+    'browse': 40,
+    'title': 15,
+    'reviews': 20,
+    'comments': 10,
+    'review': 10,
+    'comment': 5,
+}
+
+
+class HTTPError(Exception):
+    pass
+
+
+class HTTPClient:
+    """Минимальный HTTP/1.1-клиент с keep-alive поверх asyncio streams."""
+
+    def __init__(self, host, port, timeout=30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None, headers=None):
+        """Возвращает (статус, тело). Идемпотентный запрос повторяется
+        один раз, если сервер успел закрыть простаивавшее соединение:
+        POST мог дойти до сервера, и повтор создал бы второй объект."""
+        reused = self.writer is not None
+        try:
+            return await asyncio.wait_for(
+                self.send(method, path, body, headers), self.timeout
+            )
+        except (ConnectionError, asyncio.IncompleteReadError, HTTPError):
+            await self.close()
+            if not reused or method not in RETRY_METHODS:
+                raise
+        return await asyncio.wait_for(
+            self.send(method, path, body, headers), self.timeout
+        )
+
+    async def send(self, method, path, body, headers):
+        if self.writer is None:
+            await self.connect()
+        data = b'' if body is None else json.dumps(body).encode()
+        lines = [
+            f'{method} {path} HTTP/1.1',
+            f'Host: {self.host}:{self.port}',
+            'Accept: application/json',
+            f'Content-Length: {len(data)}',
+        ]
+        if body is not None:
+            lines.append('Content-Type: application/json')
+        lines.extend(f'{name}: {value}'
+                     for name, value in (headers or {}).items())
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + data)
+        await self.writer.drain()
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise HTTPError('Сервер закрыл соединение.')
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+        content = await self.read_body(response_headers)
+        if response_headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, content
+
+    async def read_body(self, headers):
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await self.reader.readline()
+                    return b''.join(chunks)
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+        if 'content-length' in headers:
+            return await self.reader.readexactly(
+                int(headers['content-length'])
+            )
+        content = await self.reader.read()
+        await self.close()
+        return content
+
+
+class Account:
+    """
+    Юзер, от имени которого виртуальный юзер пишет отзывы. Если
+    виртуальных юзеров больше, чем аккаунтов, аккаунт делят
+    несколько из них: вход и выбор произведения для отзыва идут
+    под блокировкой аккаунта (LoadTest.account_lock).
+    """
+
+    def __init__(self, username, confirmation_code, reviewed):
+        self.username = username
+        self.confirmation_code = confirmation_code
+        self.reviewed = set(reviewed)
+        self.token = None
+
+
+class LoadTest:
+    """
+    Запускает виртуальных юзеров и копит замеры по маршрутам.
+    Тест идет duration секунд или до max_requests запросов.
+    """
+
+    def __init__(self, base_url, users, title_ids, reviews, accounts,
+                 duration=30, max_requests=0, think_time=0, mix=None,
+                 seed=None, timeout=30):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.prefix = url.path.rstrip('/')
+        self.users = users
+        self.title_ids = title_ids
+        self.reviews = reviews
+        self.accounts = accounts
+        self.duration = duration
+        self.max_requests = max_requests
+        self.think_time = think_time
+        self.mix = mix or DEFAULT_MIX
+        self.rng = random.Random(seed)
+        self.timeout = timeout
+        self.samples = {}
+        self.sent = 0
+        # Блокировки создаются в цикле событий run(), а не здесь.
+        self.locks = {}
+
+    def done(self):
+        if self.max_requests and self.sent >= self.max_requests:
+            return True
+        return time.monotonic() >= self.deadline
+
+    def record(self, route, elapsed, status):
+        samples = self.samples.setdefault(
+            route, {'latencies': [], 'statuses': {}}
+        )
+        samples['latencies'].append(elapsed)
+        samples['statuses'][status] = samples['statuses'].get(status, 0) + 1
+
+    async def call(self, client, route, method, path, body=None, token=None):
+        self.sent += 1
+        headers = {'Authorization': f'Bearer {token}'} if token else None
+        started = time.monotonic()
+        try:
+            status, content = await client.request(
+                method, self.prefix + path, body, headers
+            )
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+                HTTPError, ValueError, IndexError) as error:
+            self.record(route, time.monotonic() - started,
+                        type(error).__name__)
+            return None, None
+        self.record(route, time.monotonic() - started, status)
+        return status, content
+
+    def account_lock(self, account):
+        lock = self.locks.get(account.username)
+        if lock is None:
+            lock = self.locks[account.username] = asyncio.Lock()
+        return lock
+
+    async def get_token(self, client, account):
+        async with self.account_lock(account):
+            return account.token or await self.login(client, account)
+
+    async def login(self, client, account):
+        status, content = await self.call(
+            client, 'token', 'POST', '/api/v1/auth/token/', {
+                'username': account.username,
+                'confirmation_code': account.confirmation_code,
+            }
+        )
+        if status == 200:
+            account.token = json.loads(content)['access']
+        return account.token
+
+    # Сценарии.
+
+    async def browse(self, client, account):
+        params = self.rng.choice((
+            {},
+            {'search': self.rng.choice(SEARCH_WORDS)},
+            {'name': self.rng.choice(SEARCH_WORDS)},
+            {'page': self.rng.randint(1, 5)},
+        ))
+        path = '/api/v1/titles/'
+        if params:
+            path += '?' + urlencode(params)
+        await self.call(client, 'titles_list', 'GET', path)
+
+    async def title(self, client, account):
+        title_id = self.rng.choice(self.title_ids)
+        await self.call(
+            client, 'title_detail', 'GET', f'/api/v1/titles/{title_id}/'
+        )
+
+    async def read_reviews(self, client, account):
+        title_id = self.rng.choice(self.title_ids)
+        await self.call(
+            client, 'reviews_list', 'GET',
+            f'/api/v1/titles/{title_id}/reviews/'
+        )
+
+    async def read_comments(self, client, account):
+        if not self.reviews:
+            return await self.read_reviews(client, account)
+        title_id, review_id = self.rng.choice(self.reviews)
+        await self.call(
+            client, 'comments_list', 'GET',
+            f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+        )
+
+    async def post_review(self, client, account):
+        # Пока запрос идет, другие виртуальные юзеры с этим аккаунтом
+        # не выберут то же произведение: иначе второй отзыв - 400.
+        async with self.account_lock(account):
+            token = account.token or await self.login(client, account)
+            candidates = [pk for pk in self.title_ids
+                          if pk not in account.reviewed]
+            if token and candidates:
+                title_id = self.rng.choice(candidates)
+                status, _ = await self.call(
+                    client, 'review_create', 'POST',
+                    f'/api/v1/titles/{title_id}/reviews/',
+                    {'text': 'Нагрузочный отзыв',
+                     'score': self.rng.randint(1, 10)},
+                    token,
+                )
+                if status == 201:
+                    account.reviewed.add(title_id)
+                return
+        await self.title(client, account)
+
+    async def post_comment(self, client, account):
+        token = await self.get_token(client, account)
+        if not token or not self.reviews:
+            return await self.read_comments(client, account)
+        title_id, review_id = self.rng.choice(self.reviews)
+        await self.call(
+            client, 'comment_create', 'POST',
+            f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/',
+            {'text': 'Нагрузочный комментарий'}, token,
+        )
+
+    SCENARIOS = {
+        'browse': browse,
+        'title': title,
+        'reviews': read_reviews,
+        'comments': read_comments,
+        'review': post_review,
+        'comment': post_comment,
+    }
+
+    async def virtual_user(self, number):
+        client = HTTPClient(self.host, self.port, self.timeout)
+        account = self.accounts[number % len(self.accounts)]
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        try:
+            while not self.done():
+                name = self.rng.choices(names, weights)[0]
+                await self.SCENARIOS[name](self, client, account)
+                if self.think_time:
+                    await asyncio.sleep(self.rng.uniform(0, self.think_time))
+        finally:
+            await client.close()
+
+    async def run(self):
+        self.started = time.monotonic()
+        self.deadline = self.started + self.duration
+        await asyncio.gather(*(
+            self.virtual_user(number) for number in range(self.users)
+        ))
+        self.elapsed = time.monotonic() - self.started
+        return self.report()
+
+    def report(self):
+        """Пропускная способность, перцентили и доля ошибок по маршрутам."""
+        routes = {}
+        total = errors = 0
+        for route, samples in sorted(self.samples.items()):
+            latencies = sorted(samples['latencies'])
+            route_errors = sum(
+                number for status, number in samples['statuses'].items()
+                if not isinstance(status, int) or status >= 400
+            )
+            routes[route] = {
+                'requests': len(latencies),
+                'rps': len(latencies) / self.elapsed,
+                'errors': route_errors,
+                'error_rate': route_errors / len(latencies),
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p90_ms': percentile(latencies, 90) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000,
+                'max_ms': latencies[-1] * 1000,
+                'statuses': {
+                    str(status): number
+                    for status, number in samples['statuses'].items()
+                },
+            }
+            total += len(latencies)
+            errors += route_errors
+        return {
+            'users': self.users,
+            'elapsed': self.elapsed,
+            'requests': total,
+            'rps': total / self.elapsed if self.elapsed else 0.0,
+            'errors': errors,
+            'error_rate': errors / total if total else 0.0,
+            'routes': routes,
+        }
@@ -0,0 +1,445 @@
+"""
+Фоновая очередь отправки писем.
+
+Письмо сначала атомарно пишется в спул на диске, затем его номер
+ставится в ограниченную очередь, которую разбирает пул потоков.
+Поток забирает из очереди до BATCH_SIZE писем и отправляет их
+через одно соединение бэкенда, удаляя каждое письмо из спула сразу
+после отправки. Неотправленные письма повторяются поштучно
+с экспоненциальной задержкой.
+Файл удаляется из спула только после успешной отправки, поэтому
+письма, не отправленные из-за падения процесса или переполнения
+очереди, подбираются при следующем старте или командой
+drain_email_spool.
+В спул пишутся все поля письма (копии, заголовки, альтернативы,
+вложения); письмо, которое нельзя сохранить без потерь, в очередь
+не ставится. Файл спула, который не читается, переносится в папку
+QUARANTINE_DIR и больше не отправляется.
+"""
+import base64
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.mail import (
+    EmailMessage, EmailMultiAlternatives, get_connection
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'WORKERS': 2,
+    'QUEUE_SIZE': 1000,
+    'BATCH_SIZE': 50,
+    'RETRIES': 5,
+    'BACKOFF': 0.5,
+    'SPOOL_DIR': os.path.join(settings.BASE_DIR, 'email_spool'),
+    # Через сколько секунд зависшее "в отправке" письмо
+    # считается потерянным и снова отправляется из спула.
+    'STALE_AFTER': 300,
+}
+SPOOL_SUFFIX = '.json'
+SENDING_SUFFIX = '.sending'
+QUARANTINE_DIR = 'quarantine'
+
+
+def get_setting(name):
+    return getattr(settings, 'EMAIL_QUEUE', {}).get(name, DEFAULTS[name])
+
+
+def dump_attachment(attachment):
+    if not isinstance(attachment, tuple):
+        raise ValueError('Вложение MIMEBase в спул не записывается.')
+    filename, content, mimetype = attachment
+    if isinstance(content, str):
+        return [filename, content, mimetype, False]
+    return [
+        filename, base64.b64encode(content).decode('ascii'), mimetype, True
+    ]
+
+
+def load_attachment(filename, content, mimetype, binary):
+    if binary:
+        content = base64.b64decode(content)
+    return filename, content, mimetype
+
+
+def dump_message(message):
+    """
+    Поля письма для спула. ValueError, если письмо нельзя
+    сохранить без потерь: подкласс с собственными полями,
+    вложение MIMEBase или кодировка-объект Charset.
+    """
+    if type(message) not in (EmailMessage, EmailMultiAlternatives):
+        raise ValueError(
+            f'{type(message).__name__} в спул не записывается.'
+        )
+    if message.encoding is not None and not isinstance(
+        message.encoding, str
+    ):
+        raise ValueError('Кодировка письма должна быть строкой.')
+    alternatives = getattr(message, 'alternatives', ())
+    if any(not isinstance(content, str) for content, _ in alternatives):
+        raise ValueError('Альтернатива письма должна быть строкой.')
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': list(message.to),
+        'cc': list(message.cc),
+        'bcc': list(message.bcc),
+        'reply_to': list(message.reply_to),
+        'headers': {
+            name: str(value) for name, value in message.extra_headers.items()
+        },
+        'alternatives': [list(alternative) for alternative in alternatives],
+        'attachments': [
+            dump_attachment(attachment) for attachment in message.attachments
+        ],
+        'content_subtype': message.content_subtype,
+        'mixed_subtype': message.mixed_subtype,
+        'encoding': message.encoding,
+        'multi_alternatives': isinstance(message, EmailMultiAlternatives),
+    }
+
+
+def load_message(payload):
+    message_class = (
+        EmailMultiAlternatives if payload['multi_alternatives']
+        else EmailMessage
+    )
+    message = message_class(
+        subject=payload['subject'],
+        body=payload['body'],
+        from_email=payload['from_email'],
+        to=payload['to'],
+        cc=payload['cc'],
+        bcc=payload['bcc'],
+        reply_to=payload['reply_to'],
+        headers=payload['headers'],
+        attachments=[
+            load_attachment(*attachment)
+            for attachment in payload['attachments']
+        ],
+    )
+    for content, mimetype in payload['alternatives']:
+        message.attach_alternative(content, mimetype)
+    message.content_subtype = payload['content_subtype']
+    message.mixed_subtype = payload['mixed_subtype']
+    message.encoding = payload['encoding']
+    return message
+
+
+class MailQueue:
+    """Очередь писем с пулом потоков-отправителей и спулом на диске."""
+
+    def __init__(self, spool_dir, workers=2, queue_size=1000, retries=5,
+                 backoff=0.5, stale_after=300, batch_size=50):
+        self.spool_dir = spool_dir
+        self.workers = workers
+        self.batch_size = batch_size
+        self.retries = retries
+        self.backoff = backoff
+        self.stale_after = stale_after
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.threads = []
+        self.lock = threading.Lock()
+        self.stats = {
+            'enqueued': 0,
+            'batches': 0,
+            'delivered': 0,
+            'failed': 0,
+            'retries': 0,
+            'overflow': 0,
+            'quarantined': 0,
+            'latency_sum': 0.0,
+            'latency_max': 0.0,
+        }
+        os.makedirs(spool_dir, exist_ok=True)
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.stats[name] += value
+
+    def snapshot(self):
+        with self.lock:
+            data = dict(self.stats)
+        data['depth'] = self.queue.qsize()
+        data['spooled'] = len(self.spooled())
+        delivered = data['delivered']
+        data['latency_avg'] = (
+            data['latency_sum'] / delivered if delivered else 0.0
+        )
+        return data
+
+    # Спул.
+
+    def spool(self, message):
+        """
+        Атомарно записывает письмо в спул, возвращает имя файла.
+        ValueError - письмо в спул не записывается (см. dump_message).
+        """
+        payload = dump_message(message)
+        payload['queued_at'] = time.time()
+        name = f'{time.time_ns()}-{uuid.uuid4().hex}{SPOOL_SUFFIX}'
+        path = os.path.join(self.spool_dir, name)
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as file:
+            json.dump(payload, file, ensure_ascii=False)
+        os.replace(f'{path}.tmp', path)
+        return name
+
+    def spooled(self):
+        return sorted(
+            name for name in os.listdir(self.spool_dir)
+            if name.endswith(SPOOL_SUFFIX)
+        )
+
+    def claim(self, name):
+        """
+        Забирает письмо из спула переименованием: если файл уже
+        забрал другой поток или процесс, возвращает None.
+        """
+        path = os.path.join(self.spool_dir, name)
+        claimed = path + SENDING_SUFFIX
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            return None
+        return claimed
+
+    def release_stale(self):
+        """Возвращает в спул письма, зависшие в отправке."""
+        deadline = time.time() - self.stale_after
+        for name in os.listdir(self.spool_dir):
+            if not name.endswith(SENDING_SUFFIX):
+                continue
+            path = os.path.join(self.spool_dir, name)
+            try:
+                if os.path.getmtime(path) < deadline:
+                    os.rename(path, path[:-len(SENDING_SUFFIX)])
+            except FileNotFoundError:
+                continue
+
+    # Отправка.
+
+    def enqueue(self, message):
+        """Ставит письмо в очередь. Не блокирует вызывающий поток."""
+        name = self.spool(message)
+        self.count('enqueued')
+        self.start()
+        try:
+            self.queue.put_nowait(name)
+        except queue.Full:
+            # Письмо останется в спуле до drain или рестарта.
+            self.count('overflow')
+            logger.warning('Очередь писем переполнена, %s в спуле.', name)
+
+    def start(self):
+        with self.lock:
+            if self.threads:
+                return
+            for number in range(self.workers):
+                thread = threading.Thread(
+                    target=self.work, name=f'mail-queue-{number}',
+                    daemon=True,
+                )
+                thread.start()
+                self.threads.append(thread)
+        self.release_stale()
+        for name in self.spooled():
+            try:
+                self.queue.put_nowait(name)
+            except queue.Full:
+                break
+
+    def work(self):
+        while True:
+            names = [self.queue.get()]
+            while len(names) < self.batch_size:
+                try:
+                    names.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.deliver_batch([name for name in names if name])
+            except Exception:
+                logger.exception('Ошибка отправки писем %s.', names)
+            finally:
+                for _ in names:
+                    self.queue.task_done()
+            stops = names.count(None)
+            if stops:
+                # Лишние сигналы остановки - другим потокам.
+                for _ in range(stops - 1):
+                    self.queue.put(None)
+                return
+
+    def load(self, claimed):
+        with open(claimed, encoding='utf-8') as file:
+            payload = json.load(file)
+        return load_message(payload), payload['queued_at']
+
+    def load_or_quarantine(self, claimed):
+        """
+        Письмо и время постановки в очередь или None, если файл
+        не читается: тогда он переносится в карантин, чтобы не
+        возвращаться в спул при каждом старте.
+        """
+        try:
+            return self.load(claimed)
+        except (ValueError, KeyError, TypeError) as error:
+            # json.JSONDecodeError и UnicodeDecodeError - ValueError.
+            directory = os.path.join(self.spool_dir, QUARANTINE_DIR)
+            os.makedirs(directory, exist_ok=True)
+            name = os.path.basename(claimed)[:-len(SENDING_SUFFIX)]
+            os.replace(claimed, os.path.join(directory, name))
+            self.count('quarantined')
+            logger.error('Письмо %s не читается (%s), в карантине.',
+                         name, error)
+            return None
+
+    def delivered(self, claimed, queued_at):
+        os.remove(claimed)
+        latency = time.time() - queued_at
+        with self.lock:
+            self.stats['delivered'] += 1
+            self.stats['latency_sum'] += latency
+            self.stats['latency_max'] = max(
+                self.stats['latency_max'], latency
+            )
+
+    def unclaim(self, claimed):
+        os.rename(claimed, claimed[:-len(SENDING_SUFFIX)])
+
+    def deliver_batch(self, names):
+        """
+        Отправляет пачку писем через одно соединение бэкенда, по
+        письму за вызов: каждое отправленное письмо сразу удаляется
+        из спула. При ошибке неотправленный остаток возвращается
+        в спул и отправляется поштучно с повторами, уже ушедшие
+        письма повторно не отправляются.
+        """
+        claimed, loaded = [], []
+        for path in filter(None, map(self.claim, names)):
+            item = self.load_or_quarantine(path)
+            if item is not None:
+                claimed.append(path)
+                loaded.append(item)
+        if not claimed:
+            return
+        sent = 0
+        try:
+            with get_connection() as connection:
+                for path, (message, queued_at) in zip(claimed, loaded):
+                    connection.send_messages([message])
+                    sent += 1
+                    self.delivered(path, queued_at)
+        except Exception:
+            rest = claimed[sent:]
+            logger.warning(
+                'Из пачки в %s писем не отправлено %s.',
+                len(claimed), len(rest),
+            )
+            for path in rest:
+                self.unclaim(path)
+            for path in rest:
+                self.deliver(os.path.basename(path)[:-len(SENDING_SUFFIX)])
+            return
+        self.count('batches')
+
+    def deliver(self, name, retries=None):
+        """Отправляет письмо из спула с повторами. True - если отправлено."""
+        claimed = self.claim(name)
+        if claimed is None:
+            return False
+        loaded = self.load_or_quarantine(claimed)
+        if loaded is None:
+            return False
+        message, queued_at = loaded
+        retries = self.retries if retries is None else retries
+        for attempt in range(retries + 1):
+            try:
+                get_connection().send_messages([message])
+                break
+            except Exception:
+                if attempt == retries:
+                    self.count('failed')
+                    self.unclaim(claimed)
+                    logger.exception('Письмо %s не отправлено.', name)
+                    return False
+                self.count('retries')
+                delay = self.backoff * 2 ** attempt
+                time.sleep(delay + random.uniform(0, self.backoff))
+        self.delivered(claimed, queued_at)
+        return True
+
+    def drain(self, retries=0):
+        """Синхронно отправляет все письма из спула."""
+        self.release_stale()
+        sent = failed = 0
+        for name in self.spooled():
+            if self.deliver(name, retries):
+                sent += 1
+            else:
+                failed += 1
+        return sent, failed
+
+    def join(self):
+        """Ждет, пока очередь опустеет."""
+        self.queue.join()
+
+    def stop(self):
+        with self.lock:
+            threads, self.threads = self.threads, []
+        for _ in threads:
+            self.queue.put(None)
+        for thread in threads:
+            thread.join()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = MailQueue(
+                spool_dir=get_setting('SPOOL_DIR'),
+                workers=get_setting('WORKERS'),
+                queue_size=get_setting('QUEUE_SIZE'),
+                retries=get_setting('RETRIES'),
+                backoff=get_setting('BACKOFF'),
+                stale_after=get_setting('STALE_AFTER'),
+                batch_size=get_setting('BATCH_SIZE'),
+            )
+        return _queue
+
+
+def shutdown():
+    """Останавливает потоки очереди; следующий вызов создаст новую."""
+    global _queue
+    with _queue_lock:
+        current, _queue = _queue, None
+    if current is not None:
+        current.stop()
+
+
+def send_mail(subject, message, recipient_list, from_email=None):
+    """
+    Отправляет письмо через фоновую очередь, если она включена
+    (EMAIL_QUEUE['ENABLED']), иначе - синхронно.
+    """
+    email = EmailMessage(subject, message, from_email, recipient_list)
+    if not get_setting('ENABLED'):
+        return email.send()
+    get_queue().enqueue(email)
+    return 1
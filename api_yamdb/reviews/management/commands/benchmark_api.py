@@ -0,0 +1,412 @@
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from contextlib import contextmanager
+
+import django
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import cache
+from api.instrumentation import RequestStats, percentile
+from api.throttling import SlidingWindowThrottle
+from reviews.models import (
+    Category, Comments, Genre, Review, Title, User
+)
+
+BENCHMARK_ADMIN = 'benchmark_admin'
+SAFE_METHODS = ('get', 'head', 'options')
+SEARCH_WORDS = ('война', 'море', 'звезда', 'город')
+# Лимиты не должны срабатывать, но проверка по хранилищу остается.
+THROTTLE_RATES = {
+    scope: '1000000/s' for scope in (
+        'signup_ip', 'signup_username', 'token_ip', 'token_username',
+    )
+}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(durations, queries, errors):
+    durations = sorted(durations)
+    total = sum(durations)
+    return {
+        'requests': len(durations),
+        'errors': errors,
+        'rps': len(durations) / total if total else 0.0,
+        'mean_ms': total / len(durations) * 1000,
+        'min_ms': durations[0] * 1000,
+        'p50_ms': percentile(durations, 50) * 1000,
+        'p90_ms': percentile(durations, 90) * 1000,
+        'p99_ms': percentile(durations, 99) * 1000,
+        'max_ms': durations[-1] * 1000,
+        'queries_p50': percentile(sorted(queries), 50),
+        'queries_max': max(queries),
+    }
+
+
+@contextmanager
+def throttle_rates(rates):
+    previous = SlidingWindowThrottle.THROTTLE_RATES
+    SlidingWindowThrottle.THROTTLE_RATES = rates
+    try:
+        yield
+    finally:
+        SlidingWindowThrottle.THROTTLE_RATES = previous
+
+
+class Command(BaseCommand):
+    """
+    Замеряет задержку и пропускную способность маршрутов api/urls.py
+    на текущей базе (см. generate_dataset). Запросы идут через
+    тестовый клиент Django в этом процессе, без сетевого стека.
+    Пишущие запросы (регистрация, создание, изменение и удаление
+    произведений, отзывов и комментариев, пакетная запись) идут
+    от имени администратора и откатываются. Кеш ответов по умолчанию
+    выключен, чтобы списки мерили работу вью, а не попадания в кеш;
+    с --cache для каждого маршрута сохраняется доля попаданий.
+    Результат сохраняется в JSON для сравнения между коммитами
+    (--compare).
+    """
+
+    help = 'Бенчмарк эндпоинтов API с сохранением результатов в JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--routes', default='',
+            help='Маршруты через запятую; по умолчанию все.',
+        )
+        parser.add_argument(
+            '--output', default='',
+            help='Файл для результатов; по умолчанию '
+                 'benchmarks/<время>.json.',
+        )
+        parser.add_argument(
+            '--compare', default='',
+            help='JSON предыдущего запуска для сравнения.',
+        )
+        parser.add_argument(
+            '--cache', action='store_true',
+            help='Включить кеш ответов каталога.',
+        )
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations должен быть положительным.')
+        self.rng = random.Random(options['seed'])
+        self.load_samples()
+        routes = self.get_routes()
+        if options['routes']:
+            names = options['routes'].split(',')
+            unknown = set(names) - set(routes)
+            if unknown:
+                raise CommandError(
+                    f'Неизвестные маршруты: {", ".join(sorted(unknown))}'
+                )
+            routes = {name: routes[name] for name in names}
+        overrides = {
+            'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+        }
+        overrides['API_RESPONSE_CACHE'] = dict(
+            getattr(settings, 'API_RESPONSE_CACHE', {}),
+            ENABLED=options['cache'],
+        )
+        results = {}
+        with override_settings(**overrides), throttle_rates(THROTTLE_RATES):
+            try:
+                for name, build in routes.items():
+                    results[name] = self.run_route(name, build, options)
+            finally:
+                User.objects.filter(username=BENCHMARK_ADMIN).delete()
+        report = {
+            'meta': self.get_meta(options),
+            'routes': results,
+        }
+        self.save(report, options['output'])
+        if options['compare']:
+            self.compare(report, options['compare'])
+
+    def load_samples(self):
+        """Выбирает id и слаги, по которым пойдут запросы."""
+        self.title_ids = list(Title.objects.values_list('id', flat=True)
+                              .order_by('?')[:1000])
+        if not self.title_ids:
+            raise CommandError(
+                'В базе нет произведений: запустите generate_dataset.'
+            )
+        self.reviews = list(
+            Review.objects.filter(comments__isnull=False)
+            .values_list('title_id', 'id').distinct().order_by('?')[:1000]
+        ) or list(Review.objects.values_list('title_id', 'id')[:1000])
+        self.comments = list(
+            Comments.objects.values_list('review__title_id', 'review_id', 'id')
+            .order_by('?')[:1000]
+        )
+        self.genres = list(Genre.objects.values_list('slug', flat=True))
+        self.categories = list(
+            Category.objects.values_list('slug', flat=True)
+        )
+        self.users = list(
+            User.objects.exclude(username=BENCHMARK_ADMIN)
+            .order_by('?')[:1000]
+        )
+        admin, _ = User.objects.get_or_create(
+            username=BENCHMARK_ADMIN,
+            defaults={'email': f'{BENCHMARK_ADMIN}@yamdb.fake',
+                      'role': 'admin'},
+        )
+        token = AccessToken.for_user(admin)
+        self.client = Client(HTTP_HOST='localhost')
+        self.admin_client = Client(
+            HTTP_HOST='localhost', HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+        self.signups = 0
+
+    def review(self):
+        if not self.reviews:
+            raise CommandError('В базе нет отзывов.')
+        return self.rng.choice(self.reviews)
+
+    def comment(self):
+        if not self.comments:
+            raise CommandError('В базе нет комментариев.')
+        return self.rng.choice(self.comments)
+
+    def get_routes(self):
+        """Имя маршрута -> функция, возвращающая (клиент, метод, url, data)."""
+        title = '/api/v1/titles/'
+        review = '{0}{1}/reviews/{2}/'
+        comment = '{0}{1}/reviews/{2}/comments/{3}/'
+        return {
+            'titles_list': lambda: (self.client, 'get', title, None),
+            'title_create': lambda: (
+                self.admin_client, 'post', title, self.title_data()),
+            'title_update': lambda: (
+                self.admin_client, 'patch',
+                f'{title}{self.rng.choice(self.title_ids)}/',
+                {'name': self.words(), 'year': 2000}),
+            'title_delete': lambda: (
+                self.admin_client, 'delete',
+                f'{title}{self.rng.choice(self.title_ids)}/', None),
+            'titles_bulk': self.bulk_request,
+            'titles_export': lambda: (
+                self.admin_client, 'get', f'{title}export/', None),
+            'titles_filter_genre': lambda: (
+                self.client, 'get',
+                f'{title}?genre={self.rng.choice(self.genres)}', None),
+            'titles_filter_category': lambda: (
+                self.client, 'get',
+                f'{title}?category={self.rng.choice(self.categories)}',
+                None),
+            'titles_filter_name': lambda: (
+                self.client, 'get',
+                f'{title}?name={self.rng.choice(SEARCH_WORDS)}', None),
+            'titles_search': lambda: (
+                self.client, 'get',
+                f'{title}?search={self.rng.choice(SEARCH_WORDS)}', None),
+            'title_detail': lambda: (
+                self.client, 'get',
+                f'{title}{self.rng.choice(self.title_ids)}/', None),
+            'reviews_list': lambda: (
+                self.client, 'get',
+                f'{title}{self.rng.choice(self.title_ids)}/reviews/', None),
+            'review_detail': lambda: (
+                self.client, 'get',
+                '{0}{1}/reviews/{2}/'.format(title, *self.review()), None),
+            'review_create': lambda: (
+                self.admin_client, 'post',
+                f'{title}{self.rng.choice(self.title_ids)}/reviews/',
+                {'text': self.words(), 'score': self.rng.randint(1, 10)}),
+            'review_update': lambda: (
+                self.admin_client, 'patch',
+                review.format(title, *self.review()),
+                {'score': self.rng.randint(1, 10)}),
+            'review_delete': lambda: (
+                self.admin_client, 'delete',
+                review.format(title, *self.review()), None),
+            'comments_list': lambda: (
+                self.client, 'get',
+                '{0}{1}/reviews/{2}/comments/'.format(title, *self.review()),
+                None),
+            'comment_create': lambda: (
+                self.admin_client, 'post',
+                '{0}{1}/reviews/{2}/comments/'.format(title, *self.review()),
+                {'text': self.words()}),
+            'comment_update': lambda: (
+                self.admin_client, 'patch',
+                comment.format(title, *self.comment()),
+                {'text': self.words()}),
+            'comment_delete': lambda: (
+                self.admin_client, 'delete',
+                comment.format(title, *self.comment()), None),
+            'genres_list': lambda: (
+                self.client, 'get', '/api/v1/genres/', None),
+            'categories_list': lambda: (
+                self.client, 'get', '/api/v1/categories/', None),
+            'users_search': lambda: (
+                self.admin_client, 'get',
+                '/api/v1/users/?search='
+                f'{self.rng.choice(self.users).username}', None),
+            'user_detail': lambda: (
+                self.admin_client, 'get',
+                f'/api/v1/users/{self.rng.choice(self.users).username}/',
+                None),
+            'users_me': lambda: (
+                self.admin_client, 'get', '/api/v1/users/me/', None),
+            'signup': self.signup_request,
+            'token': self.token_request,
+        }
+
+    def words(self):
+        return ' '.join(self.rng.choice(SEARCH_WORDS) for _ in range(3))
+
+    def title_data(self):
+        return {
+            'name': self.words(),
+            'year': self.rng.randint(1900, 2000),
+            'description': self.words(),
+            'category': self.rng.choice(self.categories),
+            'genre': self.rng.sample(self.genres, min(2, len(self.genres))),
+        }
+
+    def bulk_request(self):
+        """Пакет из 10 произведений: половина новых, половина обновлений."""
+        items = [self.title_data() for _ in range(10)]
+        ids = self.rng.sample(self.title_ids, min(5, len(self.title_ids)))
+        for item, title_id in zip(items, ids):
+            item['id'] = title_id
+        return self.admin_client, 'post', '/api/v1/titles/bulk/', items
+
+    def signup_request(self):
+        self.signups += 1
+        username = f'bench_signup{os.getpid()}_{self.signups}'
+        return self.client, 'post', '/api/v1/auth/signup/', {
+            'username': username, 'email': f'{username}@yamdb.fake',
+        }
+
+    def token_request(self):
+        user = self.rng.choice(self.users)
+        return self.client, 'post', '/api/v1/auth/token/', {
+            'username': user.username,
+            'confirmation_code': default_token_generator.make_token(user),
+        }
+
+    def send(self, client, method, url, data):
+        """Запрос с замером времени; потоковый ответ читается целиком."""
+        started = time.perf_counter()
+        if method in SAFE_METHODS:
+            response = getattr(client, method)(url, data=data)
+        else:
+            response = getattr(client, method)(
+                url, data=json.dumps(data), content_type='application/json'
+            )
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return time.perf_counter() - started, response
+
+    def request(self, build):
+        client, method, url, data = build()
+        stats = RequestStats()
+        with stats.track():
+            if method in SAFE_METHODS:
+                elapsed, response = self.send(client, method, url, data)
+            else:
+                # Пишущие запросы не должны менять набор данных. Чтения
+                # идут без транзакции: в профиле production она берет
+                # блокировку записи (BEGIN IMMEDIATE).
+                with transaction.atomic():
+                    elapsed, response = self.send(client, method, url, data)
+                    transaction.set_rollback(True)
+        return elapsed, stats.queries, response.status_code >= 400
+
+    def run_route(self, name, build, options):
+        for _ in range(options['warmup']):
+            self.request(build)
+        durations, queries, errors = [], [], 0
+        before = cache.stats.snapshot()
+        for _ in range(options['iterations']):
+            elapsed, query_count, failed = self.request(build)
+            durations.append(elapsed)
+            queries.append(query_count)
+            errors += failed
+        result = summarize(durations, queries, errors)
+        after = cache.stats.snapshot()
+        hits = after['hits'] - before['hits']
+        lookups = hits + after['misses'] - before['misses']
+        result['cache_hit_ratio'] = hits / lookups if lookups else None
+        line = (
+            f'{name}: p50 {result["p50_ms"]:.2f} мс, '
+            f'p99 {result["p99_ms"]:.2f} мс, {result["rps"]:.0f} запр/с, '
+            f'SQL p50 {result["queries_p50"]}, ошибок {errors}'
+        )
+        if lookups:
+            line += f', попаданий в кеш {result["cache_hit_ratio"]:.0%}'
+        self.stdout.write(line)
+        return result
+
+    def get_meta(self, options):
+        return {
+            'revision': git_revision(),
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': settings.DATABASES['default']['ENGINE'],
+            'iterations': options['iterations'],
+            'response_cache': options['cache'],
+            'dataset': {
+                'users': User.objects.count(),
+                'titles': Title.objects.count(),
+                'reviews': Review.objects.count(),
+                'comments': Comments.objects.count(),
+            },
+        }
+
+    def save(self, report, output):
+        if not output:
+            name = timezone.now().strftime('%Y%m%d-%H%M%S')
+            output = os.path.join(
+                settings.BASE_DIR, 'benchmarks', f'{name}.json'
+            )
+        directory = os.path.dirname(os.path.abspath(output))
+        os.makedirs(directory, exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Результаты сохранены в {output}')
+
+    def compare(self, report, path):
+        with open(path, encoding='utf-8') as file:
+            previous = json.load(file)
+        self.stdout.write(
+            f'Сравнение с {previous["meta"].get("revision") or path}:'
+        )
+        for name, result in report['routes'].items():
+            old = previous['routes'].get(name)
+            if old is None:
+                continue
+            change = (result['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100
+            self.stdout.write(
+                f'{name}: p50 {old["p50_ms"]:.2f} -> '
+                f'{result["p50_ms"]:.2f} мс ({change:+.1f}%), '
+                f'SQL {old["queries_p50"]} -> {result["queries_p50"]}'
+            )
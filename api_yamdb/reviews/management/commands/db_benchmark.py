@@ -0,0 +1,249 @@
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError
+
+from api.instrumentation import percentile
+from reviews.models import Comments, Review, Title, User
+
+MANAGE_PY = os.path.join(settings.BASE_DIR, 'manage.py')
+
+
+def summarize(latencies, elapsed):
+    latencies = sorted(latencies)
+    if not latencies:
+        return {'operations': 0, 'ops': 0.0}
+    return {
+        'operations': len(latencies),
+        'ops': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'max_ms': latencies[-1] * 1000,
+    }
+
+
+class Worker:
+    """Смесь чтений и записей одного процесса-воркера."""
+
+    def __init__(self, index, write_ratio, seed):
+        self.rng = random.Random(seed)
+        self.write_ratio = write_ratio
+        self.user, _ = User.objects.get_or_create(
+            username=f'db_bench{index}',
+            defaults={'email': f'db_bench{index}@yamdb.fake'},
+        )
+        self.title_ids = list(Title.objects.values_list('id', flat=True))
+        self.review_ids = list(Review.objects.values_list('id', flat=True))
+        if not self.title_ids or not self.review_ids:
+            raise CommandError('В базе нет произведений или отзывов.')
+        self.review = None
+
+    def read(self):
+        if self.rng.random() < 0.5:
+            page = Title.objects.select_related('category').prefetch_related(
+                'genre'
+            ).order_by('-id')[:10]
+            list(page)
+        else:
+            list(
+                Review.objects.filter(title_id=self.rng.choice(self.title_ids))
+                .select_related('author').order_by('-pub_date')[:10]
+            )
+
+    def write(self):
+        if self.rng.random() < 0.5:
+            Comments.objects.create(
+                review_id=self.rng.choice(self.review_ids),
+                author=self.user, text='Комментарий бенчмарка',
+            )
+        elif self.review is None:
+            # Отзыв и сдвиг рейтинга - одна транзакция (Review.save).
+            self.review = Review.objects.create(
+                title_id=self.rng.choice(self.title_ids),
+                author=self.user, text='Отзыв бенчмарка',
+                score=self.rng.randint(1, 10),
+            )
+        else:
+            self.review.delete()
+            self.review = None
+
+    def run(self, duration):
+        samples = {'read': [], 'write': []}
+        errors = {'read': 0, 'write': 0}
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            kind = 'write' if self.rng.random() < self.write_ratio else 'read'
+            started = time.perf_counter()
+            try:
+                getattr(self, kind)()
+            except OperationalError:
+                errors[kind] += 1
+                continue
+            samples[kind].append(time.perf_counter() - started)
+        return {'samples': samples, 'errors': errors}
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает пропускную способность SQLite под смешанной нагрузкой
+    в разных профилях базы (settings.DATABASE_PROFILES). Команда
+    генерирует базу во временной папке, для каждого профиля копирует
+    ее и запускает --workers процессов, которые duration секунд
+    читают страницы произведений и отзывов и пишут отзывы
+    и комментарии. Рабочая база проекта не затрагивается.
+    """
+
+    help = 'Бенчмарк SQLite под конкурентной нагрузкой по профилям базы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles', default='development,production',
+            help='Профили из settings.DATABASE_PROFILES через запятую.',
+        )
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.2,
+            help='Доля пишущих операций.',
+        )
+        parser.add_argument('--titles', type=int, default=1000)
+        parser.add_argument('--reviews', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--output', default='')
+        # Служебный параметр: номер процесса-воркера.
+        parser.add_argument('--worker', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options['worker'] is not None:
+            return self.run_worker(options)
+        if options['workers'] < 1:
+            raise CommandError('--workers должен быть положительным.')
+        if not 0 <= options['write_ratio'] <= 1:
+            raise CommandError('--write-ratio должен быть от 0 до 1.')
+        profiles = options['profiles'].split(',')
+        unknown = set(profiles) - set(settings.DATABASE_PROFILES)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные профили: {", ".join(sorted(unknown))}'
+            )
+        directory = tempfile.mkdtemp(prefix='yamdb-db-benchmark-')
+        try:
+            template = os.path.join(directory, 'template.sqlite3')
+            self.prepare(template, options)
+            report = {
+                'workers': options['workers'],
+                'duration': options['duration'],
+                'write_ratio': options['write_ratio'],
+                'profiles': {},
+            }
+            for profile in profiles:
+                path = os.path.join(directory, f'{profile}.sqlite3')
+                shutil.copyfile(template, path)
+                result = self.run_profile(profile, path, options)
+                report['profiles'][profile] = result
+                self.print_result(profile, result)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        return None
+
+    def manage(self, path, profile, *args, **kwargs):
+        env = dict(
+            os.environ, YAMDB_DB_PATH=path, YAMDB_DB_PROFILE=profile,
+            YAMDB_METRICS='0',
+        )
+        return subprocess.Popen(
+            [sys.executable, MANAGE_PY, *args], env=env,
+            cwd=settings.BASE_DIR, **kwargs
+        )
+
+    def prepare(self, path, options):
+        """Создает базу с синтетическими данными в режиме rollback journal."""
+        dataset = [
+            'generate_dataset', '--users', '1000',
+            '--titles', str(options['titles']),
+            '--reviews', str(options['reviews']),
+            '--comments', str(options['comments']),
+        ]
+        if options['seed'] is not None:
+            dataset += ['--seed', str(options['seed'])]
+        for command in (['migrate', '--no-input'], dataset):
+            process = self.manage(
+                path, 'development', *command, stdout=subprocess.DEVNULL
+            )
+            if process.wait():
+                raise CommandError(f'Не удалось выполнить {command[0]}.')
+
+    def run_profile(self, profile, path, options):
+        seed = options['seed']
+        processes = [
+            self.manage(
+                path, profile, 'db_benchmark',
+                '--worker', str(index),
+                '--duration', str(options['duration']),
+                '--write-ratio', str(options['write_ratio']),
+                '--seed', str(index if seed is None else seed * 1000 + index),
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            )
+            for index in range(options['workers'])
+        ]
+        # Нагрузка начинается, когда все воркеры загрузили Django.
+        for process in processes:
+            if process.stdout.readline().strip() != b'ready':
+                raise CommandError(f'Воркер профиля {profile} не запустился.')
+        for process in processes:
+            process.stdin.write(b'start\n')
+            process.stdin.flush()
+        samples = {'read': [], 'write': []}
+        errors = {'read': 0, 'write': 0}
+        for process in processes:
+            output, _ = process.communicate()
+            if process.returncode:
+                raise CommandError(f'Воркер профиля {profile} упал.')
+            result = json.loads(output)
+            for kind in samples:
+                samples[kind].extend(result['samples'][kind])
+                errors[kind] += result['errors'][kind]
+        return {
+            kind: dict(
+                summarize(samples[kind], options['duration']),
+                errors=errors[kind],
+            )
+            for kind in samples
+        }
+
+    def run_worker(self, options):
+        worker = Worker(
+            options['worker'], options['write_ratio'], options['seed']
+        )
+        self.stdout.write('ready')
+        self.stdout.flush()
+        sys.stdin.readline()
+        result = worker.run(options['duration'])
+        self.stdout.write(json.dumps(result))
+
+    def print_result(self, profile, result):
+        parts = []
+        for kind, name in (('read', 'чтения'), ('write', 'записи')):
+            data = result[kind]
+            if data['operations']:
+                parts.append(
+                    f'{name} {data["ops"]:.0f} оп/с '
+                    f'(p50 {data["p50_ms"]:.1f} мс, '
+                    f'p99 {data["p99_ms"]:.1f} мс, '
+                    f'ошибок {data["errors"]})'
+                )
+            else:
+                parts.append(f'{name}: нет, ошибок {data["errors"]}')
+        self.stdout.write(f'{profile}: ' + '; '.join(parts))
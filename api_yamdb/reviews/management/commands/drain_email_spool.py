@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from reviews import mail
+
+
+class Command(BaseCommand):
+    """
+    Синхронно отправляет письма, оставшиеся в спуле очереди:
+    после падения процесса или переполнения очереди.
+    """
+
+    help = 'Отправить все письма из спула EMAIL_QUEUE.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retries', type=int, default=0,
+            help='Количество повторов отправки каждого письма.',
+        )
+
+    def handle(self, *args, **options):
+        queue = mail.MailQueue(
+            spool_dir=mail.get_setting('SPOOL_DIR'),
+            backoff=mail.get_setting('BACKOFF'),
+            stale_after=mail.get_setting('STALE_AFTER'),
+        )
+        sent, failed = queue.drain(options['retries'])
+        self.stdout.write(f'Отправлено: {sent}, не отправлено: {failed}.')
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews import export
+
+
+class Command(BaseCommand):
+    """
+    Потоковая выгрузка каталога в файл или stdout.
+    Формат и параметры совпадают с эндпоинтом v1/titles/export/.
+    """
+
+    help = 'Выгрузить каталог произведений в NDJSON или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', choices=export.FORMATS, default='ndjson',
+            help='Формат выгрузки.',
+        )
+        parser.add_argument(
+            '--updated-since',
+            help='Только произведения, измененные начиная с даты.',
+        )
+        parser.add_argument(
+            '--include', default='',
+            help='Вложенные сущности через запятую: reviews,comments.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Количество произведений, читаемых за один запрос.',
+        )
+        parser.add_argument(
+            '--file', help='Файл для выгрузки, по умолчанию stdout.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            updated_since = options['updated_since']
+            if updated_since:
+                updated_since = export.parse_updated_since(updated_since)
+            include = export.parse_include(options['include'])
+            rows = export.export_catalog(
+                options['output'], updated_since, include,
+                options['chunk_size'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        if options['file']:
+            with open(options['file'], 'w', encoding='utf-8',
+                      newline='') as file:
+                file.writelines(rows)
+        else:
+            for row in rows:
+                self.stdout.write(row, ending='')
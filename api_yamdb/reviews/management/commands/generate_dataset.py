@@ -0,0 +1,236 @@
+import datetime
+import random
+import time
+from bisect import bisect_left
+from itertools import accumulate, count
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from api import cache
+from api.signals import CACHED_MODELS
+from reviews.bulk import chunked, keep_auto_now_add, reset_sequences
+from reviews.models import (
+    Category, Comments, Genre, Review, Title, TitleGenre, User
+)
+
+WORDS = (
+    'война', 'мир', 'тень', 'ветер', 'город', 'море', 'звезда', 'дорога',
+    'сад', 'зима', 'огонь', 'остров', 'песня', 'ночь', 'дом', 'река',
+)
+MODELS = (User, Category, Genre, Title, TitleGenre, Review, Comments)
+
+
+class Zipf:
+    """
+    Распределение Ципфа на [0, size): ранг r выпадает с весом
+    1 / (r + 1) ** exponent. Ранги перемешаны умножением на шаг,
+    взаимно простой с size, чтобы популярные объекты не шли подряд.
+    """
+
+    def __init__(self, rng, size, exponent):
+        self.rng = rng
+        self.size = size
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent for rank in range(1, size + 1)
+        ))
+        self.stride = next(
+            step for step in count(max(1, size // 2 + 1))
+            if self.gcd(step, size) == 1
+        )
+
+    @staticmethod
+    def gcd(a, b):
+        while b:
+            a, b = b, a % b
+        return a
+
+    def position(self, rank):
+        return rank * self.stride % self.size
+
+    def sample(self, k):
+        total = self.cum_weights[-1]
+        ranks = (
+            bisect_left(self.cum_weights, self.rng.random() * total)
+            for _ in range(k)
+        )
+        return [self.position(min(rank, self.size - 1)) for rank in ranks]
+
+    def distinct(self, k):
+        """k различных значений; при большом k добирает равномерно."""
+        k = min(k, self.size)
+        result = set()
+        for _ in range(5):
+            result.update(self.sample(k - len(result)))
+            if len(result) >= k:
+                break
+        if len(result) < k:
+            rest = [value for value in range(self.size)
+                    if value not in result]
+            result.update(self.rng.sample(rest, k - len(result)))
+        return list(result)[:k]
+
+
+def next_id(model):
+    return (model.objects.aggregate(value=Max('id'))['value'] or 0) + 1
+
+
+class Command(BaseCommand):
+    """
+    Генерирует синтетический набор данных для бенчмарков.
+    Отзывы и комментарии распределяются по произведениям, отзывам
+    и юзерам по закону Ципфа; у произведения не больше одного
+    отзыва от каждого юзера. Данные пишутся bulk_create пачками
+    с явными id после уже существующих, рейтинги пересчитываются
+    одним запросом в конце.
+    """
+
+    help = 'Генерация синтетических данных для бенчмарков.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--genres', type=int, default=30)
+        parser.add_argument('--titles', type=int, default=1000)
+        parser.add_argument('--reviews', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Показатель распределения Ципфа.',
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Количество строк в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        for name in ('users', 'categories', 'genres', 'titles'):
+            if options[name] < 1:
+                raise CommandError(f'--{name} должен быть положительным.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным.')
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        self.now = timezone.now()
+        started = time.monotonic()
+
+        self.users = self.insert(User, self.build_users())
+        self.categories = self.insert(Category, self.build_categories())
+        self.genres = self.insert(Genre, self.build_genres())
+        self.titles = self.insert(Title, self.build_titles())
+        self.insert(TitleGenre, self.build_title_genres())
+        self.reviews = self.insert(Review, self.build_reviews())
+        self.insert(Comments, self.build_comments())
+        reset_sequences(MODELS)
+        Title.objects.rebuild_ratings()
+        # bulk_create и UPDATE идут в обход сигналов.
+        cache.bump_versions(*(model._meta.label for model in CACHED_MODELS))
+        self.stdout.write(
+            f'Готово за {time.monotonic() - started:.2f} с.'
+        )
+
+    def insert(self, model, objects):
+        """Вставляет объекты пачками; возвращает диапазон их id."""
+        started = time.monotonic()
+        first_id = next_id(model)
+        ids = count(first_id)
+        rows = 0
+        with keep_auto_now_add(model):
+            for batch in chunked(objects, self.options['batch_size']):
+                for obj in batch:
+                    obj.id = next(ids)
+                with transaction.atomic():
+                    model.objects.bulk_create(batch)
+                rows += len(batch)
+        elapsed = time.monotonic() - started
+        speed = rows / elapsed if elapsed else rows
+        self.stdout.write(
+            f'{model._meta.label}: {rows} строк за {elapsed:.2f} с '
+            f'({speed:.0f} строк/с)'
+        )
+        return range(first_id, first_id + rows)
+
+    def random_date(self):
+        seconds = self.rng.randrange(self.options['days'] * 86400)
+        return self.now - datetime.timedelta(seconds=seconds)
+
+    def words(self, number):
+        return ' '.join(self.rng.choice(WORDS) for _ in range(number))
+
+    def build_users(self):
+        password = make_password(None)
+        first = next_id(User)
+        for number in range(first, first + self.options['users']):
+            yield User(
+                username=f'bench_user{number}',
+                email=f'bench_user{number}@yamdb.fake',
+                password=password,
+                role='user',
+                bio='',
+            )
+
+    def build_categories(self):
+        first = next_id(Category)
+        for number in range(first, first + self.options['categories']):
+            yield Category(name=f'Категория {number}', slug=f'cat{number}')
+
+    def build_genres(self):
+        first = next_id(Genre)
+        for number in range(first, first + self.options['genres']):
+            yield Genre(name=f'Жанр {number}', slug=f'genre{number}')
+
+    def build_titles(self):
+        year = self.now.year
+        for number in range(self.options['titles']):
+            yield Title(
+                name=f'{self.words(2).capitalize()} {number}',
+                year=self.rng.randint(year - 100, year),
+                description=self.words(8),
+                category_id=self.rng.choice(self.categories),
+            )
+
+    def build_title_genres(self):
+        for title_id in self.titles:
+            genres = self.rng.sample(
+                self.genres, min(len(self.genres), self.rng.randint(1, 3))
+            )
+            for genre_id in genres:
+                yield TitleGenre(title_id=title_id, genre_id=genre_id)
+
+    def build_reviews(self):
+        per_title = [0] * len(self.titles)
+        titles = Zipf(self.rng, len(self.titles), self.options['zipf'])
+        for position in titles.sample(self.options['reviews']):
+            per_title[position] += 1
+        authors = Zipf(self.rng, len(self.users), self.options['zipf'])
+        for position, reviews in enumerate(per_title):
+            # Один отзыв на произведение от юзера: лишние отбрасываются.
+            for author in authors.distinct(reviews):
+                yield Review(
+                    title_id=self.titles[position],
+                    author_id=self.users[author],
+                    text=self.words(12),
+                    score=self.rng.randint(1, 10),
+                    pub_date=self.random_date(),
+                )
+
+    def build_comments(self):
+        if not self.reviews or not self.options['comments']:
+            return
+        reviews = Zipf(self.rng, len(self.reviews), self.options['zipf'])
+        authors = Zipf(self.rng, len(self.users), self.options['zipf'])
+        for chunk in chunked(range(self.options['comments']), 10000):
+            pairs = zip(reviews.sample(len(chunk)),
+                        authors.sample(len(chunk)))
+            for review, author in pairs:
+                yield Comments(
+                    review_id=self.reviews[review],
+                    author_id=self.users[author],
+                    text=self.words(6),
+                    pub_date=self.random_date(),
+                )
@@ -0,0 +1,169 @@
+import csv
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from api import cache
+from api.signals import CACHED_MODELS
+from reviews.bulk import chunked, keep_auto_now_add, reset_sequences
+from reviews.models import (
+    Category, Comments, Genre, Review, Title, TitleGenre, User
+)
+
+
+def optional_int(value):
+    return int(value) if value else None
+
+
+def build_user(row):
+    return User(
+        id=int(row['id']),
+        username=row['username'],
+        email=row['email'],
+        role=row['role'] or 'user',
+        bio=row['bio'],
+        first_name=row['first_name'],
+        last_name=row['last_name'],
+        password=make_password(None),
+    )
+
+
+def build_category(row):
+    return Category(id=int(row['id']), name=row['name'], slug=row['slug'])
+
+
+def build_genre(row):
+    return Genre(id=int(row['id']), name=row['name'], slug=row['slug'])
+
+
+def build_title(row):
+    return Title(
+        id=int(row['id']),
+        name=row['name'],
+        year=int(row['year']),
+        description=row.get('description', ''),
+        category_id=optional_int(row['category']),
+    )
+
+
+def build_title_genre(row):
+    return TitleGenre(
+        id=int(row['id']),
+        title_id=int(row['title_id']),
+        genre_id=int(row['genre_id']),
+    )
+
+
+def build_review(row):
+    return Review(
+        id=int(row['id']),
+        title_id=int(row['title_id']),
+        text=row['text'],
+        author_id=int(row['author']),
+        score=int(row['score']),
+        pub_date=parse_datetime(row['pub_date']),
+    )
+
+
+def build_comment(row):
+    return Comments(
+        id=int(row['id']),
+        review_id=int(row['review_id']),
+        text=row['text'],
+        author_id=int(row['author']),
+        pub_date=parse_datetime(row['pub_date']),
+    )
+
+
+# Порядок загрузки учитывает внешние ключи между таблицами.
+SOURCES = (
+    ('users.csv', User, build_user),
+    ('category.csv', Category, build_category),
+    ('genre.csv', Genre, build_genre),
+    ('titles.csv', Title, build_title),
+    ('genre_title.csv', TitleGenre, build_title_genre),
+    ('review.csv', Review, build_review),
+    ('comments.csv', Comments, build_comment),
+)
+
+
+class Command(BaseCommand):
+    """
+    Загружает данные из static/data/*.csv.
+    Строки читаются потоково и вставляются через bulk_create
+    пачками, каждая пачка - в своей транзакции. Внешние ключи
+    из CSV присваиваются напрямую по id, без запросов на строку.
+    Сигналы при bulk_create не срабатывают, поэтому рейтинг
+    произведений пересчитывается одним запросом в конце.
+    """
+
+    help = 'Импорт CSV-файлов из static/data в базу.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=os.path.join(settings.BASE_DIR, 'static', 'data'),
+            help='Каталог с CSV-файлами.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Количество строк в одной транзакции.',
+        )
+        parser.add_argument(
+            '--ignore-conflicts',
+            action='store_true',
+            help='Пропускать строки, которые уже есть в базе.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть положительным.')
+        total_rows = 0
+        started = time.monotonic()
+        for filename, model, build in SOURCES:
+            filepath = os.path.join(path, filename)
+            if not os.path.exists(filepath):
+                self.stderr.write(f'{filename} не найден, пропускаем.')
+                continue
+            rows = self.load(
+                filepath, model, build, batch_size,
+                options['ignore_conflicts'],
+            )
+            total_rows += rows
+        reset_sequences([model for _, model, _ in SOURCES])
+        Title.objects.rebuild_ratings()
+        # bulk_create и UPDATE идут в обход сигналов.
+        cache.bump_versions(*(model._meta.label for model in CACHED_MODELS))
+        self.report('Итого', total_rows, time.monotonic() - started)
+
+    def load(self, filepath, model, build, batch_size, ignore_conflicts):
+        started = time.monotonic()
+        rows = 0
+        with open(filepath, encoding='utf-8', newline='') as file:
+            objects = (build(row) for row in csv.DictReader(file))
+            with keep_auto_now_add(model):
+                for batch in chunked(objects, batch_size):
+                    with transaction.atomic():
+                        model.objects.bulk_create(
+                            batch, ignore_conflicts=ignore_conflicts
+                        )
+                    rows += len(batch)
+        self.report(os.path.basename(filepath), rows,
+                    time.monotonic() - started)
+        return rows
+
+    def report(self, label, rows, elapsed):
+        speed = rows / elapsed if elapsed else rows
+        self.stdout.write(
+            f'{label}: {rows} строк за {elapsed:.2f} с '
+            f'({speed:.0f} строк/с)'
+        )
@@ -0,0 +1,133 @@
+import asyncio
+import json
+
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.loadtest import DEFAULT_MIX, Account, LoadTest
+from reviews.models import Review, Title, User
+
+
+def parse_mix(value):
+    """'browse=40,review=10' -> {'browse': 40, 'review': 10}."""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise CommandError(
+                f'Неизвестный сценарий {name}; доступны: '
+                f'{", ".join(DEFAULT_MIX)}.'
+            )
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise CommandError(f'Некорректный вес сценария {name}.')
+    if not any(weight > 0 for weight in mix.values()):
+        raise CommandError('Хотя бы один сценарий должен иметь вес.')
+    return mix
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный тест запущенного сервера смесью сценариев
+    (см. reviews.loadtest). Команда читает ту же базу, что и сервер:
+    берет из нее произведения, отзывы и юзеров и вычисляет им
+    confirmation_code, чтобы виртуальные юзеры получили jwt-токены
+    через v1/auth/token/.
+    """
+
+    help = 'Нагрузочный тест API виртуальными юзерами на asyncio.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument(
+            '--users', type=int, default=50,
+            help='Число одновременных виртуальных юзеров.',
+        )
+        parser.add_argument(
+            '--duration', type=float, default=30,
+            help='Длительность теста в секундах.',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=0,
+            help='Остановиться после стольких запросов (0 - без лимита).',
+        )
+        parser.add_argument(
+            '--think-time', type=float, default=0,
+            help='Максимальная пауза между сценариями, с.',
+        )
+        parser.add_argument(
+            '--mix',
+            default=','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()),
+            help='Веса сценариев: browse, title, reviews, comments, '
+                 'review, comment.',
+        )
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--output', default='')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('--users должен быть положительным.')
+        title_ids = list(
+            Title.objects.values_list('id', flat=True).order_by('?')[:1000]
+        )
+        if not title_ids:
+            raise CommandError(
+                'В базе нет произведений: запустите generate_dataset.'
+            )
+        reviews = list(
+            Review.objects.values_list('title_id', 'id').order_by('?')[:1000]
+        )
+        test = LoadTest(
+            options['url'], options['users'], title_ids, reviews,
+            self.get_accounts(options['users']),
+            duration=options['duration'],
+            max_requests=options['requests'],
+            think_time=options['think_time'],
+            mix=parse_mix(options['mix']),
+            seed=options['seed'],
+            timeout=options['timeout'],
+        )
+        report = asyncio.run(test.run())
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+    def get_accounts(self, count):
+        users = list(
+            User.objects.filter(role='user', is_active=True)
+            .order_by('?')[:count]
+        )
+        if not users:
+            raise CommandError('В базе нет юзеров с ролью user.')
+        reviewed = {}
+        for title_id, author_id in Review.objects.filter(
+            author__in=users
+        ).values_list('title_id', 'author_id'):
+            reviewed.setdefault(author_id, []).append(title_id)
+        return [
+            Account(
+                user.username,
+                default_token_generator.make_token(user),
+                reviewed.get(user.pk, ()),
+            )
+            for user in users
+        ]
+
+    def print_report(self, report):
+        for route, result in report['routes'].items():
+            self.stdout.write(
+                f'{route}: {result["requests"]} запросов, '
+                f'{result["rps"]:.1f} запр/с, p50 {result["p50_ms"]:.1f} мс, '
+                f'p90 {result["p90_ms"]:.1f} мс, '
+                f'p99 {result["p99_ms"]:.1f} мс, '
+                f'ошибок {result["error_rate"]:.1%}'
+            )
+        self.stdout.write(
+            f'Итого: {report["requests"]} запросов за '
+            f'{report["elapsed"]:.1f} с, {report["rps"]:.1f} запр/с, '
+            f'ошибок {report["error_rate"]:.1%}'
+        )
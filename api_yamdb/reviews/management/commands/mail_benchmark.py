@@ -0,0 +1,68 @@
+import tempfile
+import time
+
+from django.core.mail import EmailMessage
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from reviews.email_backends import PooledSMTPEmailBackend
+from reviews.mail import MailQueue
+from reviews.smtp_sink import SMTPSink
+
+
+class Command(BaseCommand):
+    """
+    Замеряет пропускную способность доставки писем от очереди
+    до локального SMTP-приемника: сравнивает обычный SMTP-бэкенд
+    и бэкенд с пулом соединений.
+    """
+
+    help = 'Бенчмарк доставки писем через очередь и SMTP (писем/с).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        backends = (
+            'django.core.mail.backends.smtp.EmailBackend',
+            'reviews.email_backends.PooledSMTPEmailBackend',
+        )
+        for backend in backends:
+            with SMTPSink() as sink:
+                elapsed = self.run(backend, sink, options)
+            speed = options['messages'] / elapsed
+            self.stdout.write(
+                f'{backend}: {options["messages"]} писем за {elapsed:.2f} с, '
+                f'{speed:.0f} писем/с, SMTP-сессий: {sink.sessions}'
+            )
+        PooledSMTPEmailBackend.close_pools()
+
+    def run(self, backend, sink, options):
+        overrides = {
+            'EMAIL_BACKEND': backend,
+            'EMAIL_HOST': sink.host,
+            'EMAIL_PORT': sink.port,
+            'EMAIL_POOL_SIZE': options['workers'],
+        }
+        with override_settings(**overrides), \
+                tempfile.TemporaryDirectory() as spool_dir:
+            queue = MailQueue(
+                spool_dir,
+                workers=options['workers'],
+                queue_size=options['messages'],
+                batch_size=options['batch_size'],
+                backoff=0.01,
+            )
+            started = time.monotonic()
+            for number in range(options['messages']):
+                queue.enqueue(EmailMessage(
+                    f'Benchmark {number}', 'confirmation_code',
+                    'bench@yamdb.fake', [f'user{number}@yamdb.fake'],
+                ))
+            queue.join()
+            sink.wait_for(options['messages'])
+            elapsed = time.monotonic() - started
+            queue.stop()
+        return elapsed
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from reviews import search
+
+
+class Command(BaseCommand):
+    """Пересобирает полнотекстовый индекс произведений."""
+
+    help = 'Перестроить FTS5-индекс по названиям и описаниям произведений.'
+
+    def handle(self, *args, **options):
+        if not search.is_supported(connection):
+            raise CommandError(
+                'Полнотекстовый индекс доступен только для SQLite.'
+            )
+        search.rebuild(connection)
+        self.stdout.write(self.style.SUCCESS('Индекс пересобран.'))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api import cache
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает хранимый рейтинг произведений по таблице отзывов.
+    С флагом --check только сверяет рейтинг и завершается с ошибкой,
+    если найдены расхождения.
+    """
+
+    help = 'Пересчитать rating_sum/rating_count/rating у произведений.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить согласованность, ничего не меняя.',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            broken = Title.objects.inconsistent_ratings().order_by('pk')
+            broken = list(broken.values_list(
+                'pk', 'rating_sum', 'rating_count',
+                'actual_sum', 'actual_count',
+            ))
+            for pk, stored_sum, stored_count, real_sum, real_count in broken:
+                self.stderr.write(
+                    f'Title {pk}: хранится {stored_sum}/{stored_count}, '
+                    f'по отзывам {real_sum}/{real_count}.'
+                )
+            if broken:
+                raise CommandError(
+                    f'Рейтинг рассогласован у {len(broken)} произведений.'
+                )
+            self.stdout.write(self.style.SUCCESS('Рейтинг согласован.'))
+            return
+        with transaction.atomic():
+            updated = Title.objects.rebuild_ratings()
+        # UPDATE идет в обход сигналов - сбрасываем кеш ответов сами.
+        cache.bump_versions(Title._meta.label)
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитан рейтинг {updated} произведений.')
+        )
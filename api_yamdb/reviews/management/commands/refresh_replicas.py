@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import replicas
+
+
+class Command(BaseCommand):
+    """
+    Копирует основную базу в реплики SQLite из DATABASE_REPLICAS
+    онлайн-бэкапом. Без --once повторяет копирование каждые
+    --interval секунд: запускается рядом с сервером.
+    """
+
+    help = 'Обновить реплики SQLite из основной базы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            default=replicas.get_setting('REFRESH_INTERVAL'),
+            help='Пауза между обновлениями, с.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Обновить реплики один раз и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        if not replicas.get_replicas():
+            raise CommandError(
+                'Реплики не настроены: задайте YAMDB_DB_REPLICAS.'
+            )
+        replicas.check_caches()
+        if options['interval'] <= 0:
+            raise CommandError('--interval должен быть положительным.')
+        while True:
+            started = time.monotonic()
+            refreshed = replicas.refresh_all()
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'Обновлены реплики {", ".join(refreshed) or "-"} '
+                f'за {elapsed:.2f} с.'
+            )
+            if options['once']:
+                return
+            time.sleep(max(0.0, options['interval'] - elapsed))
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from reviews import search
+    search.rebuild(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from reviews import search
+    if not search.is_supported(schema_editor.connection):
+        return
+    table = search.INDEX_TABLE
+    for trigger in ('ai', 'ad', 'au'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {table}_{trigger}')
+    schema_editor.execute(f'DROP TABLE IF EXISTS {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_title_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, drop_search_index),
+    ]
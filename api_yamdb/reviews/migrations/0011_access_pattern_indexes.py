@@ -0,0 +1,42 @@
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0010_updated_at'),
+    ]
+
+    operations = [
+        # Индекс year объявлен в модели, но в базе его не было.
+        # AlterField пересобрал бы в SQLite всю таблицу произведений,
+        # поэтому в базе индекс создается напрямую под именем Django.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='title',
+                    name='year',
+                    field=models.IntegerField(db_index=True, validators=[django.core.validators.MaxValueValidator(2026, 'Год выпуска не может быть больше текущего')]),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    'CREATE INDEX "reviews_title_year_25306d5f" ON "reviews_title" ("year");',
+                    'DROP INDEX "reviews_title_year_25306d5f";',
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['author', 'pub_date'], name='review_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'year'], name='title_category_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='titlegenre',
+            index=models.Index(fields=['title', 'genre'], name='titlegenre_title_genre_idx'),
+        ),
+    ]
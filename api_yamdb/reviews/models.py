@@ -5,13 +5,19 @@ from django.contrib.auth.models import (
     BaseUserManager
 )
 from django.contrib.auth.tokens import default_token_generator
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import (
+    Case, Count, F, FloatField, OuterRef, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Cast, Coalesce, Now
 from django.forms import ValidationError
 from django.core.validators import (
     MaxValueValidator,
     MinValueValidator
 )
 
+from . import mail
+
 ROLE_CHOICES = [
     ('user', 'user'),
     ('moderator', 'moderator'),
@@ -105,13 +111,17 @@ class User(AbstractUser):
             )
 
     def send_confirmation_code(self):
-        """Отправка сообщения с кодом для получения jwt-токена."""
+        """
+        Отправка сообщения с кодом для получения jwt-токена.
+        При включенной очереди (EMAIL_QUEUE) письмо уходит в фоне.
+        """
 
         confirmation_code = default_token_generator.make_token(self)
         message = f'Введите {confirmation_code} в запрос к v1/auth/token.'
-        self.email_user(
+        mail.send_mail(
             subject='Ваш confirmation_code для YaMDb.',
-            message=message
+            message=message,
+            recipient_list=[self.email]
         )
 
     # Проверяем, что юзер выполняет роль админа.
@@ -140,6 +150,9 @@ class Category(models.Model):
     """Модель для категорий."""
     name = models.TextField(max_length=256)
     slug = models.SlugField(unique=True, max_length=50)
+    updated_at = models.DateTimeField(
+        auto_now=True
+    )
 
     class Meta:
         ordering = ('-id',)
@@ -153,6 +166,9 @@ class Genre(models.Model):
 
     name = models.TextField()
     slug = models.SlugField(unique=True)
+    updated_at = models.DateTimeField(
+        auto_now=True
+    )
 
     class Meta:
         ordering = ('-id',)
@@ -161,8 +177,68 @@ class Genre(models.Model):
         return self.name
 
 
+class TitleQuerySet(models.QuerySet):
+    """
+    Кверисет для :model:'reviews.Title'.
+    Содержит операции над хранимым рейтингом произведений.
+    """
+
+    def apply_review_delta(self, title_id, score_delta, count_delta):
+        """
+        Атомарно сдвигает сумму и количество оценок произведения
+        и пересчитывает рейтинг одним UPDATE-запросом.
+        В выражениях SET используются значения до обновления,
+        поэтому новое количество оценок - rating_count + count_delta.
+        """
+        new_sum = F('rating_sum') + score_delta
+        new_count = F('rating_count') + count_delta
+        return self.filter(pk=title_id).update(
+            rating_sum=new_sum,
+            rating_count=new_count,
+            rating=Case(
+                When(rating_count=-count_delta, then=Value(None)),
+                default=Cast(new_sum, FloatField()) / new_count,
+                output_field=FloatField(),
+            ),
+            updated_at=Now(),
+        )
+
+    def with_actual_rating(self):
+        """Аннотирует сумму и количество оценок по таблице отзывов."""
+        return self.annotate(
+            actual_sum=Coalesce(Sum('reviews__score'), 0),
+            actual_count=Count('reviews'),
+        )
+
+    def inconsistent_ratings(self):
+        """Произведения, у которых хранимый рейтинг разошелся с отзывами."""
+        return self.with_actual_rating().exclude(
+            rating_sum=F('actual_sum'),
+            rating_count=F('actual_count'),
+        )
+
+    def rebuild_ratings(self):
+        """Пересчитывает хранимый рейтинг с нуля одним UPDATE-запросом."""
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+        score_sum = reviews.annotate(value=Sum('score')).values('value')
+        score_count = reviews.annotate(value=Count('pk')).values('value')
+        return self.update(
+            rating_sum=Coalesce(Subquery(score_sum), 0),
+            rating_count=Coalesce(Subquery(score_count), 0),
+            rating=Cast(Subquery(score_sum), FloatField())
+            / Subquery(score_count),
+        )
+
+
 class Title(models.Model):
-    """Модель для произведений."""
+    """
+    Модель для произведений.
+    Рейтинг хранится денормализованно: сумма и количество
+    оценок обновляются при изменении отзывов (см. reviews.signals),
+    поэтому список произведений не обращается к таблице отзывов.
+    """
 
     name = models.TextField()
     year = models.IntegerField(
@@ -186,18 +262,79 @@ class Title(models.Model):
         Genre,
         through='TitleGenre'
     )
+    rating = models.FloatField(
+        null=True,
+        blank=True,
+        editable=False
+    )
+    rating_sum = models.PositiveIntegerField(
+        default=0,
+        editable=False
+    )
+    rating_count = models.PositiveIntegerField(
+        default=0,
+        editable=False
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True
+    )
+
+    objects = TitleQuerySet.as_manager()
+
+    # Меняются только запросами TitleQuerySet с F()-выражениями.
+    RATING_FIELDS = ('rating', 'rating_sum', 'rating_count')
 
     class Meta:
         ordering = ('-id',)
+        indexes = [
+            # Фильтр по категории вместе с годом и без него.
+            models.Index(
+                fields=['category', 'year'],
+                name='title_category_year_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """
+        Полное сохранение существующего произведения не пишет рейтинг:
+        значения в объекте могли устареть, пока сигналы отзывов
+        сдвигали его в базе. Рейтинг сохраняется, только если он
+        явно перечислен в update_fields.
+        """
+        if (not self._state.adding and not kwargs.get('force_insert')
+                and kwargs.get('update_fields') is None):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.RATING_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
 
 class TitleGenre(models.Model):
     title = models.ForeignKey(Title, on_delete=models.CASCADE)
     genre = models.ForeignKey(Genre, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            # Покрывающий индекс для фильтрации произведений по жанрам.
+            models.Index(
+                fields=['genre', 'title'],
+                name='titlegenre_genre_title_idx'
+            ),
+            # Жанры страницы произведений в порядке вывода.
+            models.Index(
+                fields=['title', 'genre'],
+                name='titlegenre_title_genre_idx'
+            ),
+        ]
+
 
 class Review(models.Model):
     """Отзывы на произведение."""
@@ -234,11 +371,27 @@ class Review(models.Model):
         auto_now_add=True,
         db_index=True
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения отзыва',
+        auto_now=True
+    )
 
     class Meta:
         verbose_name = 'Отзыв',
         verbose_name_plural = 'Отзывы',
         ordering = ['pub_date']
+        indexes = [
+            # Ключ курсорной пагинации отзывов произведения.
+            models.Index(
+                fields=['title', 'pub_date', 'id'],
+                name='review_title_pub_date_idx'
+            ),
+            # Отзывы юзера в порядке публикации.
+            models.Index(
+                fields=['author', 'pub_date'],
+                name='review_author_pub_date_idx'
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['title', 'author'],
@@ -246,6 +399,43 @@ class Review(models.Model):
             )
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Запоминаем загруженную из базы оценку, чтобы при
+        сохранении сдвинуть рейтинг произведения на разницу.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_score = instance.__dict__.get('score')
+        instance._loaded_title_id = instance.__dict__.get('title_id')
+        return instance
+
+    def lock_loaded(self, using):
+        """
+        Перечитывает оценку и произведение отзыва с блокировкой
+        строки: сдвиг рейтинга считается от значения в базе,
+        а не от прочитанного когда-то другим запросом.
+        """
+        row = type(self)._base_manager.using(using).select_for_update(
+        ).filter(pk=self.pk).values_list('score', 'title_id').first()
+        self._loaded_score, self._loaded_title_id = row or (None, None)
+
+    def save(self, *args, **kwargs):
+        """Отзыв и сдвиг рейтинга (reviews.signals) - одна транзакция."""
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self
+        )
+        with transaction.atomic(using=using):
+            if not self._state.adding:
+                self.lock_loaded(using)
+            super().save(*args, **kwargs)
+
+    def delete(self, using=None, keep_parents=False):
+        using = using or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            self.lock_loaded(using)
+            return super().delete(using=using, keep_parents=keep_parents)
+
     def __str__(self):
         return (f'Отзыв {self.author} '
                 f'на произведение {self.title}.')
@@ -273,11 +463,22 @@ class Comments(models.Model):
         auto_now_add=True,
         db_index=True
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения комментария',
+        auto_now=True
+    )
 
     class Meta:
         verbose_name = 'Комментарий',
         verbose_name_plural = 'Комментарии',
         ordering = ['pub_date']
+        indexes = [
+            # Ключ курсорной пагинации комментариев к отзыву.
+            models.Index(
+                fields=['review', 'pub_date', 'id'],
+                name='comment_review_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return (f'Комментарий пользователя {self.author}'
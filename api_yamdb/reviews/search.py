@@ -0,0 +1,100 @@
+"""
+Полнотекстовый поиск по произведениям на SQLite FTS5.
+
+Индекс - внешняя FTS5-таблица над reviews_title (content=...),
+синхронизируемая триггерами на вставку, изменение и удаление.
+При пересборке таблицы миграциями SQLite удаляет ее триггеры,
+поэтому install() идемпотентна и вызывается также на post_migrate.
+"""
+import re
+
+from .models import Title
+
+TITLE_TABLE = Title._meta.db_table
+INDEX_TABLE = f'{TITLE_TABLE}_fts'
+# Совпадение в названии весит больше, чем в описании.
+RANK = 'bm25(10.0, 1.0)'
+
+INSTALL_SQL = (
+    f'''CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} USING fts5(
+        name, description,
+        content='{TITLE_TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )''',
+    f'''CREATE TRIGGER IF NOT EXISTS {INDEX_TABLE}_ai
+    AFTER INSERT ON {TITLE_TABLE} BEGIN
+        INSERT INTO {INDEX_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {INDEX_TABLE}_ad
+    AFTER DELETE ON {TITLE_TABLE} BEGIN
+        INSERT INTO {INDEX_TABLE}({INDEX_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {INDEX_TABLE}_au
+    AFTER UPDATE OF name, description ON {TITLE_TABLE} BEGIN
+        INSERT INTO {INDEX_TABLE}({INDEX_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {INDEX_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END''',
+    f'''INSERT INTO {INDEX_TABLE}({INDEX_TABLE}, rank)
+    VALUES ('rank', '{RANK}')''',
+)
+
+
+def is_supported(connection):
+    return connection.vendor == 'sqlite'
+
+
+def install(connection):
+    """Создает FTS5-индекс и триггеры синхронизации, если их нет."""
+    if not is_supported(connection):
+        return
+    with connection.cursor() as cursor:
+        for sql in INSTALL_SQL:
+            cursor.execute(sql)
+
+
+def rebuild(connection):
+    """Перестраивает индекс целиком по содержимому reviews_title."""
+    if not is_supported(connection):
+        return
+    install(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {INDEX_TABLE}({INDEX_TABLE}) VALUES ('rebuild')"
+        )
+
+
+def build_match(query):
+    """
+    Превращает пользовательский ввод в безопасное FTS5-выражение:
+    каждое слово берется в кавычки и ищется по префиксу,
+    все слова должны встретиться (неявный AND).
+    Возвращает None, если слов в запросе нет.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search(queryset, query):
+    """
+    Фильтрует кверисет произведений по полнотекстовому запросу
+    и сортирует по релевантности (поле 'search_rank').
+    """
+    match = build_match(query)
+    if match is None:
+        return queryset
+    return queryset.extra(
+        tables=[INDEX_TABLE],
+        where=[
+            f'{INDEX_TABLE}.rowid = {TITLE_TABLE}.id',
+            f'{INDEX_TABLE} MATCH %s',
+        ],
+        params=[match],
+        select={'search_rank': f'{INDEX_TABLE}.rank'},
+        order_by=['search_rank', 'id'],
+    )
@@ -0,0 +1,55 @@
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from . import search
+from .models import Review, Title
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_review_save(sender, instance, created, **kwargs):
+    """
+    Сдвигает хранимый рейтинг произведения при создании
+    отзыва или изменении его оценки.
+    """
+    if created:
+        Title.objects.apply_review_delta(instance.title_id, instance.score, 1)
+    else:
+        old_title_id = getattr(instance, '_loaded_title_id', None)
+        old_score = getattr(instance, '_loaded_score', None)
+        if old_title_id is None or old_score is None:
+            # Инстанс собран не из базы - пересчитываем рейтинг честно.
+            Title.objects.filter(pk=instance.title_id).rebuild_ratings()
+        elif old_title_id != instance.title_id:
+            Title.objects.apply_review_delta(old_title_id, -old_score, -1)
+            Title.objects.apply_review_delta(
+                instance.title_id, instance.score, 1
+            )
+        elif old_score != instance.score:
+            Title.objects.apply_review_delta(
+                instance.title_id, instance.score - old_score, 0
+            )
+    instance._loaded_score = instance.score
+    instance._loaded_title_id = instance.title_id
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_review_delete(sender, instance, **kwargs):
+    """
+    Вычитает оценку удаленного отзыва, в том числе при каскадном
+    удалении отзывов вместе с юзером или произведением.
+    """
+    score = getattr(instance, '_loaded_score', None)
+    if score is None:
+        score = instance.score
+    Title.objects.apply_review_delta(instance.title_id, -score, -1)
+
+
+@receiver(post_migrate)
+def install_search_index(sender, using, **kwargs):
+    """
+    Восстанавливает триггеры полнотекстового индекса: SQLite
+    удаляет их, когда миграция пересобирает таблицу произведений.
+    """
+    if sender.label == 'reviews':
+        search.install(connections[using])
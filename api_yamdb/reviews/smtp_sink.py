@@ -0,0 +1,125 @@
+"""
+Локальный SMTP-сервер-"приемник" для тестов и бенчмарков.
+Принимает письма по минимальному подмножеству SMTP и хранит
+их в памяти, ничего никуда не пересылая.
+"""
+import socketserver
+import threading
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, text):
+        self.wfile.write(f'{text}\r\n'.encode('ascii'))
+
+    def handle(self):
+        sink = self.server.sink
+        sink.register(self.connection)
+        try:
+            self.reply('220 yamdb smtp sink')
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                verb = line.decode('utf-8', 'replace').strip()[:4].upper()
+                if verb == 'EHLO':
+                    self.reply('250-yamdb')
+                    self.reply('250-8BITMIME')
+                    self.reply('250 SMTPUTF8')
+                elif verb in ('HELO', 'MAIL', 'RCPT', 'RSET', 'NOOP'):
+                    self.reply('250 OK')
+                elif verb == 'DATA':
+                    self.reply('354 End data with <CR><LF>.<CR><LF>')
+                    sink.store(self.read_data())
+                    self.reply('250 OK')
+                elif verb == 'QUIT':
+                    self.reply('221 Bye')
+                    return
+                else:
+                    self.reply('502 Command not implemented')
+        except OSError:
+            return
+        finally:
+            sink.unregister(self.connection)
+
+    def read_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b'.\r\n', b'.\n'):
+                break
+            if line.startswith(b'..'):
+                line = line[1:]
+            lines.append(line)
+        return b''.join(lines)
+
+
+class SMTPSinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    """
+    Запуск: with SMTPSink() as sink: ... sink.port, sink.messages.
+    'sessions' - количество принятых SMTP-соединений.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.server = SMTPSinkServer((host, port), SMTPSinkHandler)
+        self.server.sink = self
+        self.host, self.port = self.server.server_address
+        self.messages = []
+        self.sessions = 0
+        self.connections = set()
+        self.lock = threading.Lock()
+        self.received = threading.Condition(self.lock)
+        self.thread = None
+
+    def register(self, connection):
+        with self.lock:
+            self.sessions += 1
+            self.connections.add(connection)
+
+    def unregister(self, connection):
+        with self.lock:
+            self.connections.discard(connection)
+
+    def store(self, data):
+        with self.received:
+            self.messages.append(data)
+            self.received.notify_all()
+
+    def wait_for(self, count, timeout=10):
+        """Ждет, пока приемник получит count писем."""
+        with self.received:
+            return self.received.wait_for(
+                lambda: len(self.messages) >= count, timeout
+            )
+
+    def drop_connections(self):
+        """Рвет все открытые соединения, имитируя сбой сервера."""
+        with self.lock:
+            connections = list(self.connections)
+        for connection in connections:
+            try:
+                connection.shutdown(2)
+            except OSError:
+                pass
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name='smtp-sink', daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
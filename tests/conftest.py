@@ -1,6 +1,7 @@
 import os
 import sys
 
+import pytest
 from django.utils.version import get_version
 
 root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -34,3 +35,31 @@ assert get_version() < '3.0.0', 'Пожалуйста, используйте в
 pytest_plugins = [
     'tests.fixtures.fixture_user',
 ]
+
+
+@pytest.fixture(autouse=True)
+def throttle_store(tmp_path, monkeypatch):
+    """
+    Счетчики лимитов во временном файле, свои для каждого теста:
+    запросы тестов не копятся в throttle.sqlite3 проекта.
+    """
+    from api import throttling
+    store = throttling.SlidingWindowStore(str(tmp_path / 'throttle.sqlite3'))
+    monkeypatch.setattr(throttling, '_store', store)
+    return store
+
+
+def pytest_terminal_summary(terminalreporter):
+    """Замеры тестов-бенчмарков, записанные через record_property."""
+    reports = [
+        report for report in terminalreporter.stats.get('passed', [])
+        if report.when == 'call' and report.user_properties
+    ]
+    if not reports:
+        return
+    terminalreporter.section('benchmarks')
+    for report in reports:
+        values = ', '.join(
+            f'{name}={value}' for name, value in report.user_properties
+        )
+        terminalreporter.write_line(f'{report.nodeid}: {values}')
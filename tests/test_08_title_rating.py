@@ -0,0 +1,135 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+from .common import auth_client, create_reviews
+
+
+class Test08TitleRating:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_rating_follows_reviews(self, admin_client, admin):
+        from reviews.models import Title
+        reviews, titles, user, moderator = create_reviews(admin_client, admin)
+        title_id = titles[0]['id']
+        title = Title.objects.get(pk=title_id)
+        assert (title.rating_sum, title.rating_count) == (12, 3), (
+            'Проверьте, что при создании отзыва обновляются '
+            '`rating_sum` и `rating_count` произведения'
+        )
+        assert title.rating == 4
+        response = admin_client.get(f'/api/v1/titles/{title_id}/')
+        assert response.json()['rating'] == 4
+
+        url = f'/api/v1/titles/{title_id}/reviews/{reviews[1]["id"]}/'
+        auth_client(user).patch(url, data={'score': 9})
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (18, 3), (
+            'Проверьте, что при изменении оценки рейтинг сдвигается на разницу'
+        )
+        assert title.rating == 6
+
+        admin_client.delete(url)
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (9, 2), (
+            'Проверьте, что при удалении отзыва его оценка вычитается'
+        )
+
+        moderator.delete()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (5, 1), (
+            'Проверьте, что при каскадном удалении отзывов '
+            'вместе с юзером рейтинг пересчитывается'
+        )
+        admin.delete()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count, title.rating) == (
+            0, 0, None
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_recalculate_ratings_command(self, admin_client, admin):
+        from reviews.models import Title
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        call_command('recalculate_ratings', '--check')
+        Title.objects.update(rating_sum=0, rating_count=0, rating=None)
+        with pytest.raises(CommandError):
+            call_command('recalculate_ratings', '--check')
+        call_command('recalculate_ratings')
+        call_command('recalculate_ratings', '--check')
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.rating_sum, title.rating_count) == (12, 3)
+        assert title.rating == 4
+        title = Title.objects.get(pk=titles[1]['id'])
+        assert (title.rating_sum, title.rating_count, title.rating) == (
+            0, 0, None
+        )
+
+    @pytest.mark.django_db
+    def test_03_full_save_keeps_rating(self):
+        from reviews.models import Title
+        title = Title.objects.create(name='Произведение', year=2000)
+        stale = Title.objects.get(pk=title.pk)
+        # Отзыв, добавленный после того, как объект был прочитан.
+        Title.objects.apply_review_delta(title.pk, 8, 1)
+        stale.name = 'Новое название'
+        stale.save()
+        title.refresh_from_db()
+        assert title.name == 'Новое название'
+        assert (title.rating_sum, title.rating_count, title.rating) == (
+            8, 1, 8
+        ), 'Полный save() не должен затирать рейтинг устаревшими значениями'
+        stale.rating_sum, stale.rating_count, stale.rating = 0, 0, None
+        stale.save(update_fields=Title.RATING_FIELDS)
+        title.refresh_from_db()
+        assert title.rating_count == 0, (
+            'Явно перечисленный рейтинг сохраняется'
+        )
+
+    @pytest.mark.django_db
+    def test_04_stale_review_score(self, admin):
+        from reviews.models import Review, Title
+        title = Title.objects.create(name='Произведение', year=2000)
+        review = Review.objects.create(
+            title=title, author=admin, text='Отзыв', score=5
+        )
+        first = Review.objects.get(pk=review.pk)
+        second = Review.objects.get(pk=review.pk)
+        first.score = 7
+        first.save()
+        # second прочитан до изменения оценки.
+        second.score = 9
+        second.save()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (9, 1), (
+            'Сдвиг рейтинга должен считаться от оценки в базе'
+        )
+        first.delete()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count, title.rating) == (
+            0, 0, None
+        )
+
+    @pytest.mark.django_db
+    def test_05_review_and_rating_atomic(self, admin, monkeypatch):
+        from reviews.models import Review, Title, TitleQuerySet
+        title = Title.objects.create(name='Произведение', year=2000)
+        review = Review.objects.create(
+            title=title, author=admin, text='Отзыв', score=5
+        )
+
+        def fail(*args, **kwargs):
+            raise RuntimeError
+
+        monkeypatch.setattr(TitleQuerySet, 'apply_review_delta', fail)
+        review.score = 8
+        with pytest.raises(RuntimeError):
+            review.save()
+        assert Review.objects.get(pk=review.pk).score == 5, (
+            'Без обновления рейтинга отзыв не должен сохраняться'
+        )
+        with pytest.raises(RuntimeError):
+            Review.objects.create(
+                title=Title.objects.create(name='Другое', year=2000),
+                author=admin, text='Отзыв', score=3
+            )
+        assert Review.objects.count() == 1
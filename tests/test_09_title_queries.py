@@ -0,0 +1,52 @@
+import pytest
+
+
+def create_catalog(size):
+    from reviews.models import Category, Genre, Title, TitleGenre
+    category = Category.objects.create(name='Фильм', slug='films')
+    genres = [
+        Genre.objects.create(name='Драма', slug='drama'),
+        Genre.objects.create(name='Комедия', slug='comedy'),
+    ]
+    Title.objects.bulk_create(
+        Title(name=f'Title {i}', year=2000, description='', category=category,
+              rating_sum=i % 10, rating_count=1, rating=i % 10)
+        for i in range(size)
+    )
+    TitleGenre.objects.bulk_create(
+        TitleGenre(title_id=title_id, genre=genre)
+        for title_id in Title.objects.values_list('id', flat=True)
+        for genre in genres
+    )
+
+
+class Test09TitleQueries:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('page_size', [5, 50, 500])
+    def test_01_title_list_query_count(
+            self, client, django_assert_num_queries, page_size):
+        create_catalog(500)
+        # COUNT(*) для пагинации, произведения с категорией и жанры.
+        with django_assert_num_queries(3):
+            response = client.get(f'/api/v1/titles/?page_size={page_size}')
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert len(results) == page_size, (
+            'Проверьте, что размер страницы `/api/v1/titles/` '
+            'задается параметром `page_size`'
+        )
+        assert all(len(title['genre']) == 2 for title in results)
+        assert all(title['category']['slug'] == 'films' for title in results)
+        assert all(title['rating'] is not None for title in results)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_title_detail_query_count(
+            self, client, django_assert_num_queries):
+        from reviews.models import Title
+        create_catalog(1)
+        title_id = Title.objects.get().id
+        with django_assert_num_queries(2):
+            response = client.get(f'/api/v1/titles/{title_id}/')
+        assert response.status_code == 200
+        assert len(response.json()['genre']) == 2
@@ -0,0 +1,73 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_reviews
+
+
+def walk(client, url):
+    """Проходит все страницы курсорной пагинации, собирая результаты."""
+    results = []
+    queries = []
+    while url:
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == 200
+        data = response.json()
+        assert 'count' not in data, (
+            'Проверьте, что при курсорной пагинации не возвращается `count`'
+        )
+        queries.extend(query['sql'] for query in context.captured_queries)
+        results.extend(data['results'])
+        url = data['next']
+    return results, queries
+
+
+class Test10CursorPagination:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_users_cursor(self, admin_client, django_user_model):
+        django_user_model.objects.bulk_create(
+            django_user_model(username=f'user{i}', email=f'user{i}@yamdb.fake')
+            for i in range(12)
+        )
+        results, queries = walk(
+            admin_client, '/api/v1/users/?cursor=&page_size=5'
+        )
+        usernames = [user['username'] for user in results]
+        expected = list(
+            django_user_model.objects.order_by('-id').values_list(
+                'username', flat=True
+            )
+        )
+        assert usernames == expected, (
+            'Проверьте, что курсорная пагинация `/api/v1/users/` '
+            'отдает всех юзеров в порядке `-id` без пропусков и повторов'
+        )
+        assert not any('COUNT(' in sql for sql in queries), (
+            'Проверьте, что при курсорной пагинации не выполняется COUNT(*)'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_reviews_and_titles_cursor(self, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        results, queries = walk(
+            admin_client,
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/?cursor=&page_size=2'
+        )
+        assert [review['id'] for review in results] == [
+            review['id'] for review in reviews
+        ]
+        assert not any('COUNT(' in sql for sql in queries)
+        results, _ = walk(admin_client, '/api/v1/titles/?cursor=&page_size=1')
+        assert [title['id'] for title in results] == sorted(
+            (title['id'] for title in titles), reverse=True
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_page_number_is_default(self, admin_client):
+        response = admin_client.get('/api/v1/users/')
+        assert 'count' in response.json(), (
+            'Проверьте, что без параметра `cursor` используется '
+            'постраничная пагинация'
+        )
@@ -0,0 +1,47 @@
+import csv
+import os
+
+import pytest
+from django.core.management import call_command
+
+from .conftest import MANAGE_PATH
+
+DATA_PATH = os.path.join(MANAGE_PATH, 'static', 'data')
+
+
+def count_rows(filename):
+    with open(os.path.join(DATA_PATH, filename), encoding='utf-8') as file:
+        return sum(1 for _ in csv.DictReader(file))
+
+
+class Test11ImportCsv:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_import_csv(self):
+        from reviews.models import (
+            Category, Comments, Genre, Review, Title, TitleGenre, User
+        )
+        call_command('import_csv', '--batch-size', '7')
+        expected = {
+            User: 'users.csv',
+            Category: 'category.csv',
+            Genre: 'genre.csv',
+            Title: 'titles.csv',
+            TitleGenre: 'genre_title.csv',
+            Review: 'review.csv',
+            Comments: 'comments.csv',
+        }
+        for model, filename in expected.items():
+            assert model.objects.count() == count_rows(filename), (
+                f'Проверьте, что команда `import_csv` загружает все строки '
+                f'из `{filename}`'
+            )
+        review = Review.objects.get(pk=1)
+        assert review.pub_date.year == 2019, (
+            'Проверьте, что `import_csv` сохраняет `pub_date` из CSV'
+        )
+        assert not Title.objects.inconsistent_ratings().exists(), (
+            'Проверьте, что после импорта рейтинг произведений пересчитан'
+        )
+        call_command('import_csv', '--ignore-conflicts')
+        assert Review.objects.count() == count_rows('review.csv')
@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+
+from .common import create_comments, create_titles
+
+URL = '/api/v1/titles/export/'
+
+
+def read_stream(response):
+    return b''.join(response.streaming_content).decode()
+
+
+class Test12Export:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_export_permissions(self, client, user_client):
+        assert client.get(URL).status_code == 401
+        assert user_client.get(URL).status_code == 403, (
+            'Проверьте, что выгрузка каталога доступна только администратору'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_export_ndjson(self, admin_client, admin):
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        response = admin_client.get(f'{URL}?include=comments')
+        assert response.status_code == 200
+        assert response.streaming, (
+            'Проверьте, что выгрузка каталога отдается потоком'
+        )
+        lines = read_stream(response).splitlines()
+        items = {item['id']: item for item in map(json.loads, lines)}
+        assert set(items) == {title['id'] for title in titles}
+        item = items[titles[0]['id']]
+        assert item['rating'] == 4
+        assert item['category']['slug'] == titles[0]['category']
+        assert {genre['slug'] for genre in item['genre']} == set(
+            titles[0]['genre']
+        )
+        assert [review['id'] for review in item['reviews']] == [
+            review['id'] for review in reviews
+        ]
+        assert [comment['id'] for comment in item['reviews'][0]['comments']] \
+            == [comment['id'] for comment in comments]
+
+        response = admin_client.get(f'{URL}?updated_since=2999-01-01')
+        assert read_stream(response) == '', (
+            'Проверьте, что параметр `updated_since` фильтрует произведения'
+        )
+        response = admin_client.get(f'{URL}?updated_since=вчера')
+        assert response.status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_export_csv(self, admin_client, admin):
+        _, _, titles, _, _ = create_comments(admin_client, admin)
+        response = admin_client.get(f'{URL}?output=csv')
+        assert response['Content-Type'].startswith('text/csv')
+        rows = list(csv.DictReader(io.StringIO(read_stream(response))))
+        assert len(rows) == len(titles)
+        assert admin_client.get(
+            f'{URL}?output=csv&include=reviews'
+        ).status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_export_command(self, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        out = io.StringIO()
+        call_command('export_catalog', '--chunk-size', '1', stdout=out)
+        lines = out.getvalue().splitlines()
+        assert [json.loads(line)['id'] for line in lines] == sorted(
+            title['id'] for title in titles
+        )
@@ -0,0 +1,47 @@
+import pytest
+from django.core.management import call_command
+
+from .common import create_titles
+
+
+class Test13TitleSearch:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_search_titles(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        response = client.get('/api/v1/titles/?search=драма')
+        results = response.json()['results']
+        assert [title['id'] for title in results] == [titles[1]['id']], (
+            'Проверьте, что `/api/v1/titles/?search=` ищет по описанию'
+        )
+        response = client.get('/api/v1/titles/?search=повор')
+        results = response.json()['results']
+        assert [title['id'] for title in results] == [titles[0]['id']], (
+            'Проверьте, что `/api/v1/titles/?search=` ищет по началу слова'
+        )
+        response = client.get('/api/v1/titles/?search="OR*(')
+        assert response.status_code == 200
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_search_ranking_and_sync(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        admin_client.patch(
+            f'/api/v1/titles/{titles[0]["id"]}/',
+            data={'description': 'Проект века'}
+        )
+        response = client.get('/api/v1/titles/?search=проект')
+        ids = [title['id'] for title in response.json()['results']]
+        assert ids == [titles[1]['id'], titles[0]['id']], (
+            'Проверьте, что совпадение в названии ранжируется выше, '
+            'а изменения произведения попадают в индекс'
+        )
+        admin_client.delete(f'/api/v1/titles/{titles[1]["id"]}/')
+        response = client.get('/api/v1/titles/?search=проект')
+        assert response.json()['count'] == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_rebuild_search_index(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        call_command('rebuild_search_index')
+        response = client.get('/api/v1/titles/?search=пике')
+        assert response.json()['count'] == 1
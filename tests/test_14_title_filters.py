@@ -0,0 +1,55 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_titles
+
+
+def result_ids(client, query):
+    response = client.get(f'/api/v1/titles/?{query}')
+    assert response.status_code == 200
+    return sorted(title['id'] for title in response.json()['results'])
+
+
+class Test14TitleFilters:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_genre_modes(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        first, second = titles[0]['id'], titles[1]['id']
+        assert result_ids(client, 'genre=horror,comedy') == [first], (
+            'Проверьте, что фильтр `genre` не дублирует произведения, '
+            'подходящие под несколько жанров'
+        )
+        assert result_ids(client, 'genre=horror,drama') == [first, second]
+        assert result_ids(
+            client, 'genre=horror,comedy&genre_mode=all'
+        ) == [first]
+        assert result_ids(client, 'genre=horror,drama&genre_mode=all') == []
+        assert result_ids(client, 'genre=comedy,nothing&genre_mode=all') == []
+        assert result_ids(client, 'genre=com') == [], (
+            'Проверьте, что фильтр `genre` ищет точное совпадение слага'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_category_exact_multi(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        first, second = titles[0]['id'], titles[1]['id']
+        assert result_ids(client, 'category=films') == [first]
+        assert result_ids(client, 'category=films,books') == [first, second]
+        assert result_ids(client, 'category=film') == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_genre_filter_uses_index(self, client, admin_client):
+        create_titles(admin_client)
+        with CaptureQueriesContext(connection) as context:
+            client.get('/api/v1/titles/?genre=horror,comedy&genre_mode=all')
+        sql = next(
+            query['sql'] for query in context.captured_queries
+            if 'reviews_titlegenre' in query['sql']
+            and 'COUNT(DISTINCT' in query['sql']
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        assert 'titlegenre_genre_title_idx' in plan, plan
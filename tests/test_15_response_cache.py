@@ -0,0 +1,97 @@
+from io import StringIO
+
+import pytest
+from django.test import override_settings
+
+from .common import auth_client, create_titles, create_users_api
+
+
+@pytest.fixture(autouse=True)
+def response_cache(settings):
+    # Кеш ответов выключен по умолчанию.
+    settings.API_RESPONSE_CACHE = {'ENABLED': True}
+
+class Test15ResponseCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_cache_hit_and_invalidation(
+            self, client, admin_client, django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        assert client.get(url)['X-Cache'] == 'MISS'
+        with django_assert_num_queries(0):
+            response = client.get(url)
+        assert response['X-Cache'] == 'HIT', (
+            'Проверьте, что повторный GET-запрос отдается из кеша'
+        )
+        assert response.json()['rating'] is None
+
+        user, _ = create_users_api(admin_client)
+        auth_client(user).post(
+            f'{url}reviews/', data={'text': 'Отлично', 'score': 8}
+        )
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что новый отзыв инвалидирует кеш произведения'
+        )
+        assert response.json()['rating'] == 8
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_genre_changes_invalidate_titles(self, client, admin_client):
+        titles, _, genres = create_titles(admin_client)
+        response = client.get('/api/v1/genres/')
+        assert response['X-Cache'] == 'MISS'
+        assert client.get('/api/v1/genres/')['X-Cache'] == 'HIT'
+        client.get('/api/v1/titles/')
+        admin_client.delete(f'/api/v1/genres/{genres[0]["slug"]}/')
+        response = client.get('/api/v1/genres/')
+        assert response['X-Cache'] == 'MISS'
+        assert len(response.json()['results']) == len(genres) - 1
+        response = client.get('/api/v1/titles/')
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что удаление жанра инвалидирует кеш произведений'
+        )
+        admin_client.patch(
+            f'/api/v1/titles/{titles[1]["id"]}/',
+            data={'genre': [genres[1]['slug']]}
+        )
+        response = client.get(f'/api/v1/titles/{titles[1]["id"]}/')
+        assert [genre['slug'] for genre in response.json()['genre']] == [
+            genres[1]['slug']
+        ]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_cache_can_be_disabled(self, client, admin_client):
+        create_titles(admin_client)
+        with override_settings(API_RESPONSE_CACHE={'ENABLED': False}):
+            client.get('/api/v1/titles/')
+            response = client.get('/api/v1/titles/')
+        assert 'X-Cache' not in response
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_commands_invalidate(self, client, admin_client, admin):
+        from django.core.management import call_command
+        from reviews.models import Title
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        user, _ = create_users_api(admin_client)
+        auth_client(user).post(
+            f'{url}reviews/', data={'text': 'Отлично', 'score': 8}
+        )
+        client.get(url)
+        assert client.get(url)['X-Cache'] == 'HIT'
+        Title.objects.update(rating_sum=0, rating_count=0, rating=None)
+        call_command('recalculate_ratings', stdout=StringIO())
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что recalculate_ratings сбрасывает кеш ответов'
+        )
+        assert response.json()['rating'] == 8
+        client.get('/api/v1/genres/')
+        call_command(
+            'generate_dataset', users=2, titles=2, reviews=2, comments=2,
+            seed=1, stdout=StringIO()
+        )
+        assert client.get('/api/v1/genres/')['X-Cache'] == 'MISS', (
+            'Проверьте, что generate_dataset сбрасывает кеш ответов'
+        )
@@ -0,0 +1,71 @@
+import pytest
+
+from .common import create_reviews, create_titles
+
+
+class Test16ConditionalGet:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_reviews_etag(self, client, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = client.get(url)
+        etag = response['ETag']
+        assert etag.startswith('"'), (
+            'Проверьте, что список отзывов отдает сильный ETag'
+        )
+        assert 'Last-Modified' not in response, (
+            'У списка нет даты, которая менялась бы при удалениях'
+        )
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            'Проверьте, что при совпадении If-None-Match возвращается 304'
+        )
+        response = client.get(
+            url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT'
+        )
+        assert response.status_code == 200
+
+        admin_client.patch(f'{url}{reviews[0]["id"]}/', data={'text': 'new'})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что после изменения отзыва ETag списка меняется'
+        )
+        assert response['ETag'] != etag
+
+        detail = f'{url}{reviews[1]["id"]}/'
+        response = client.get(detail)
+        etag = response['ETag']
+        assert client.get(detail, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        assert client.get(
+            detail, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        ).status_code == 304
+
+        admin_client.delete(f'{url}{reviews[0]["id"]}/')
+        response = client.get(
+            url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT'
+        )
+        assert response.status_code == 200, (
+            'После удаления отзыва список не должен отдавать 304'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_titles_etag(self, client, admin_client, settings):
+        settings.API_RESPONSE_CACHE = {'ENABLED': True}
+        titles, _, genres = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        response = client.get(url)
+        etag = response['ETag']
+        assert 'Last-Modified' not in response, (
+            'Переименование жанра не меняет updated_at произведения'
+        )
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response['X-Cache'] == 'HIT'
+        list_etag = client.get('/api/v1/titles/')['ETag']
+        admin_client.delete(f'/api/v1/genres/{genres[0]["slug"]}/')
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200, (
+            'Проверьте, что удаление жанра меняет ETag произведения'
+        )
+        response = client.get('/api/v1/titles/', HTTP_IF_NONE_MATCH=list_etag)
+        assert response.status_code == 200
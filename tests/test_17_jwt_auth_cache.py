@@ -0,0 +1,42 @@
+import pytest
+
+from .common import auth_client, create_users_api
+
+
+class Test17JWTAuthCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_user_is_not_queried_twice(
+            self, admin_client, django_assert_num_queries):
+        admin_client.get('/api/v1/users/')
+        # COUNT(*) для пагинации и сама страница, без запроса юзера.
+        with django_assert_num_queries(2):
+            response = admin_client.get('/api/v1/users/')
+        assert response.status_code == 200
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_role_change_invalidates_snapshot(self, admin_client):
+        user, _ = create_users_api(admin_client)
+        client_user = auth_client(user)
+        assert client_user.get('/api/v1/users/').status_code == 403
+        admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'role': 'admin'}
+        )
+        assert client_user.get('/api/v1/users/').status_code == 200, (
+            'Проверьте, что смена роли юзера сбрасывает кеш аутентификации'
+        )
+        user.refresh_from_db()
+        user.is_active = False
+        user.save()
+        assert client_user.get('/api/v1/users/').status_code == 401
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_cached_user_can_write(self, user_client, user):
+        user_client.get('/api/v1/users/me/')
+        response = user_client.patch(
+            '/api/v1/users/me/', data={'bio': 'new bio'}
+        )
+        assert response.status_code == 200
+        assert response.json()['bio'] == 'new bio'
+        user.refresh_from_db()
+        assert user.bio == 'new bio'
@@ -0,0 +1,146 @@
+import os
+
+import pytest
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.management import call_command
+from django.test import override_settings
+
+
+@pytest.fixture
+def mail_queue(tmp_path):
+    from reviews import mail as mail_queue_module
+    settings = {
+        'ENABLED': True,
+        'WORKERS': 2,
+        'SPOOL_DIR': str(tmp_path),
+        'BACKOFF': 0.01,
+    }
+    with override_settings(EMAIL_QUEUE=settings):
+        yield mail_queue_module
+        mail_queue_module.shutdown()
+
+
+class Test18MailQueue:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_signup_enqueues_mail(self, client, mail_queue):
+        response = client.post(
+            '/api/v1/auth/signup/',
+            data={'username': 'queued', 'email': 'queued@yamdb.fake'}
+        )
+        assert response.status_code == 200
+        queue = mail_queue.get_queue()
+        queue.join()
+        assert len(mail.outbox) == 1
+        assert mail.outbox[0].to == ['queued@yamdb.fake']
+        stats = queue.snapshot()
+        assert stats['delivered'] == 1
+        assert stats['depth'] == 0
+        assert stats['spooled'] == 0
+
+    def test_02_retries_then_spools(self, tmp_path, monkeypatch):
+        from reviews.mail import MailQueue
+        queue = MailQueue(str(tmp_path), retries=2, backoff=0.001)
+        calls = []
+
+        def broken_send(self, messages):
+            calls.append(messages)
+            raise OSError('smtp down')
+
+        monkeypatch.setattr(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            broken_send,
+        )
+        name = queue.spool(EmailMessage('s', 'b', None, ['a@yamdb.fake']))
+        assert queue.deliver(name) is False
+        assert len(calls) == 3
+        assert queue.spooled() == [name], (
+            'Проверьте, что неотправленное письмо остается в спуле'
+        )
+        monkeypatch.undo()
+        with override_settings(EMAIL_QUEUE={'SPOOL_DIR': str(tmp_path)}):
+            call_command('drain_email_spool')
+        assert queue.spooled() == []
+        assert not os.listdir(tmp_path)
+        assert len(mail.outbox) == 1
+
+    def test_03_batch_failure_not_resent(self, tmp_path, monkeypatch):
+        from reviews.mail import MailQueue
+        queue = MailQueue(str(tmp_path), retries=0, backoff=0.001)
+        sent = []
+        failures = [3]
+
+        def flaky_send(self, messages):
+            # Сбой на третьем письме, дальше сервер работает.
+            for message in messages:
+                if failures and len(sent) + 1 == failures[0]:
+                    failures.pop()
+                    raise OSError('smtp down')
+                sent.append(message.subject)
+            return len(messages)
+
+        monkeypatch.setattr(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            flaky_send,
+        )
+        names = [
+            queue.spool(EmailMessage(str(number), 'b', None, ['a@y.fake']))
+            for number in range(1, 6)
+        ]
+        queue.deliver_batch(names)
+        assert sent == ['1', '2', '3', '4', '5'], (
+            'Письма, ушедшие до сбоя, не должны отправляться повторно'
+        )
+        assert queue.spooled() == []
+        assert queue.snapshot()['delivered'] == 5
+
+    def test_04_spool_keeps_whole_message(self, tmp_path):
+        from email.mime.base import MIMEBase
+        from django.core.mail import EmailMultiAlternatives
+        from reviews.mail import MailQueue
+        queue = MailQueue(str(tmp_path), retries=0)
+        message = EmailMultiAlternatives(
+            'Тема', 'Текст', 'from@yamdb.fake', ['to@yamdb.fake'],
+            cc=['cc@yamdb.fake'], bcc=['bcc@yamdb.fake'],
+            reply_to=['reply@yamdb.fake'], headers={'X-Tag': 'signup'},
+        )
+        message.attach_alternative('<b>Текст</b>', 'text/html')
+        message.attach('data.bin', b'\x00\xff', 'application/octet-stream')
+        message.attach('note.txt', 'заметка', 'text/plain')
+        assert queue.deliver(queue.spool(message))
+        sent = mail.outbox[-1]
+        assert isinstance(sent, EmailMultiAlternatives)
+        for field in ('subject', 'body', 'from_email', 'to', 'cc', 'bcc',
+                      'reply_to', 'extra_headers', 'alternatives',
+                      'attachments'):
+            assert getattr(sent, field) == getattr(message, field), (
+                f'Проверьте, что спул сохраняет поле {field}'
+            )
+        assert sent.recipients() == message.recipients()
+
+        message = EmailMessage('s', 'b', None, ['a@yamdb.fake'])
+        message.attach(MIMEBase('application', 'octet-stream'))
+        with pytest.raises(ValueError):
+            queue.spool(message)
+        assert queue.spooled() == []
+
+    def test_05_corrupt_file_quarantined(self, tmp_path):
+        from reviews.mail import QUARANTINE_DIR, MailQueue
+        queue = MailQueue(str(tmp_path), retries=0)
+        names = [
+            queue.spool(EmailMessage(str(number), 'b', None, ['a@y.fake']))
+            for number in range(3)
+        ]
+        with open(tmp_path / names[1], 'w') as file:
+            file.write('{"subject": ')
+        queue.deliver_batch(names)
+        assert [message.subject for message in mail.outbox] == ['0', '2']
+        assert queue.spooled() == [], (
+            'Битый файл не должен оставаться в спуле'
+        )
+        assert not [
+            name for name in os.listdir(tmp_path) if name.endswith('.sending')
+        ]
+        assert os.listdir(tmp_path / QUARANTINE_DIR) == [names[1]]
+        assert queue.snapshot()['quarantined'] == 1
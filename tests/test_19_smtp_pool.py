@@ -0,0 +1,69 @@
+import pytest
+from django.core.mail import EmailMessage
+
+
+@pytest.fixture
+def sink():
+    from reviews.email_backends import PooledSMTPEmailBackend
+    from reviews.smtp_sink import SMTPSink
+    with SMTPSink() as sink:
+        yield sink
+    PooledSMTPEmailBackend.close_pools()
+
+
+def make_backend(sink, pool_size=2):
+    from reviews.email_backends import PooledSMTPEmailBackend
+    return PooledSMTPEmailBackend(
+        host=sink.host, port=sink.port, pool_size=pool_size
+    )
+
+
+def make_messages(count):
+    return [
+        EmailMessage(f'Код {number}', 'Введите код', 'yamdb@yamdb.fake',
+                     [f'user{number}@yamdb.fake'])
+        for number in range(count)
+    ]
+
+
+class Test19SMTPPool:
+
+    def test_01_connections_are_reused(self, sink):
+        for batch in range(5):
+            assert make_backend(sink).send_messages(make_messages(10)) == 10
+        assert sink.wait_for(50)
+        assert len(sink.messages) == 50
+        assert sink.sessions == 1, (
+            'Проверьте, что бэкенд переиспользует открытое SMTP-соединение'
+        )
+
+    def test_02_reconnects_after_disconnect(self, sink):
+        backend = make_backend(sink)
+        assert backend.send_messages(make_messages(3)) == 3
+        sink.drop_connections()
+        assert backend.send_messages(make_messages(3)) == 3
+        assert sink.wait_for(6)
+        assert len(sink.messages) == 6, (
+            'Проверьте, что после обрыва соединения письма не теряются '
+            'и не дублируются'
+        )
+        assert sink.sessions == 2
+
+    def test_03_queue_batches_through_pool(self, sink, tmp_path, settings):
+        from reviews.mail import MailQueue
+        settings.EMAIL_BACKEND = (
+            'reviews.email_backends.PooledSMTPEmailBackend'
+        )
+        settings.EMAIL_HOST = sink.host
+        settings.EMAIL_PORT = sink.port
+        settings.EMAIL_POOL_SIZE = 2
+        queue = MailQueue(str(tmp_path), workers=2, batch_size=20)
+        for message in make_messages(100):
+            queue.enqueue(message)
+        queue.join()
+        queue.stop()
+        assert sink.wait_for(100)
+        stats = queue.snapshot()
+        assert stats['delivered'] == 100
+        assert stats['spooled'] == 0
+        assert sink.sessions <= 2
@@ -0,0 +1,122 @@
+import pytest
+
+
+@pytest.fixture
+def store(throttle_store):
+    return throttle_store
+
+
+@pytest.fixture
+def rates(store, monkeypatch):
+    from api.throttling import SlidingWindowThrottle
+    rates = {
+        'signup_ip': '5/m',
+        'signup_username': '2/m',
+        'token_ip': '5/m',
+        'token_username': '2/m',
+    }
+    monkeypatch.setattr(SlidingWindowThrottle, 'THROTTLE_RATES', rates)
+    return rates
+
+
+class Test20AuthThrottling:
+    url_signup = '/api/v1/auth/signup/'
+    url_token = '/api/v1/auth/token/'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_signup_username_limit(self, client, rates):
+        data = {'username': 'throttled', 'email': 'throttled@yamdb.fake'}
+        codes = [
+            client.post(self.url_signup, data=data).status_code
+            for _ in range(3)
+        ]
+        assert codes[:2] == [200, 400], (
+            'Повторная регистрация должна отвечать как раньше'
+        )
+        assert codes[2] == 429, (
+            'Проверьте, что превышение лимита по username возвращает 429'
+        )
+        response = client.post(
+            self.url_signup,
+            data={'username': 'THROTTLED', 'email': 'other@yamdb.fake'}
+        )
+        assert response.status_code == 429, (
+            'Лимит по username не должен зависеть от регистра'
+        )
+        assert int(response['Retry-After']) > 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_signup_ip_limit(self, client, rates):
+        for number in range(5):
+            response = client.post(
+                self.url_signup,
+                data={'username': f'ip{number}', 'email': f'ip{number}@y.fake'}
+            )
+            assert response.status_code == 200
+        response = client.post(
+            self.url_signup, data={'username': 'ip5', 'email': 'ip5@y.fake'}
+        )
+        assert response.status_code == 429
+        assert 'Retry-After' in response
+        response = client.post(
+            self.url_signup, REMOTE_ADDR='10.0.0.2',
+            data={'username': 'ip5', 'email': 'ip5@y.fake'}
+        )
+        assert response.status_code == 200, (
+            'Лимит по IP не должен распространяться на другие адреса'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_token_limit(self, client, rates, user):
+        data = {'username': user.username, 'confirmation_code': 'wrong'}
+        codes = [
+            client.post(self.url_token, data=data).status_code
+            for _ in range(3)
+        ]
+        assert codes[:2] == [400, 400]
+        assert codes[2] == 429, (
+            'Проверьте, что подбор кода для одного username ограничен'
+        )
+
+    def test_04_sliding_window(self, store):
+        now = 1000 * 60
+        for _ in range(4):
+            assert store.hit('key', 4, 60, now=now) == (True, None)
+        allowed, wait = store.hit('key', 4, 60, now=now + 30)
+        assert not allowed
+        # Текущее окно заполнено: ждем конца окна и его затухания.
+        assert wait == 30 + 1
+        # В середине следующего окна учитывается половина предыдущего.
+        assert store.hit('key', 4, 60, now=now + 90) == (True, None)
+        assert store.hit('key', 4, 60, now=now + 90) == (True, None)
+        allowed, wait = store.hit('key', 4, 60, now=now + 90)
+        assert not allowed
+        assert wait == 1
+        assert store.hit('key', 4, 60, now=now + 91) == (True, None)
+
+    def test_05_store_shared_between_processes(self, store):
+        from api.throttling import SlidingWindowStore
+        other = SlidingWindowStore(store.path)
+        assert store.hit('shared', 2, 60, now=60)[0]
+        assert other.hit('shared', 2, 60, now=60)[0]
+        assert not store.hit('shared', 2, 60, now=60)[0]
+        assert not other.hit('shared', 2, 60, now=60)[0]
+        store.purge(now=60 * 10)
+        assert other.hit('shared', 2, 60, now=60 * 10)[0]
+
+    def test_06_old_sqlite(self, store, monkeypatch):
+        import sqlite3
+        from django.core.exceptions import ImproperlyConfigured
+        from api.throttling import SlidingWindowStore
+        monkeypatch.setattr(sqlite3, 'sqlite_version_info', (3, 22, 0))
+        with pytest.raises(ImproperlyConfigured):
+            SlidingWindowStore(store.path)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_07_migrate_keeps_counters(self, store):
+        from django.core.management import call_command
+        assert store.hit('kept', 1, 60, now=60)[0]
+        call_command('migrate', verbosity=0)
+        assert not store.hit('kept', 1, 60, now=60)[0], (
+            'migrate не должен сбрасывать счетчики лимитов'
+        )
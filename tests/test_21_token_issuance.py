@@ -0,0 +1,76 @@
+import time
+
+import pytest
+from django.contrib.auth import authenticate
+from django.contrib.auth.tokens import default_token_generator
+
+
+class Test21TokenIssuance:
+    url_token = '/api/v1/auth/token/'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_single_query(self, client, user, django_assert_num_queries):
+        code = default_token_generator.make_token(user)
+        with django_assert_num_queries(1):
+            response = client.post(
+                self.url_token,
+                data={'username': user.username, 'confirmation_code': code}
+            )
+        assert response.status_code == 200
+        assert 'access' in response.json()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_errors(self, client, user, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = client.post(
+                self.url_token,
+                data={'username': 'nobody', 'confirmation_code': 'x'}
+            )
+        assert response.status_code == 404
+        with django_assert_num_queries(1):
+            response = client.post(
+                self.url_token,
+                data={'username': user.username, 'confirmation_code': 'x'}
+            )
+        assert response.status_code == 400
+        user.is_active = False
+        user.save()
+        code = default_token_generator.make_token(user)
+        response = client.post(
+            self.url_token,
+            data={'username': user.username, 'confirmation_code': code}
+        )
+        assert response.status_code == 400, (
+            'Неактивному юзеру токен выдаваться не должен'
+        )
+
+    @pytest.mark.django_db
+    def test_03_backend(self, user):
+        code = default_token_generator.make_token(user)
+        assert authenticate(
+            username=user.username, confirmation_code=code
+        ) == user
+        assert authenticate(
+            username=user.username, confirmation_code='wrong'
+        ) is None
+
+    @pytest.mark.django_db
+    def test_04_benchmark(self, user, django_assert_num_queries,
+                          record_property):
+        from api.serializers import YAMDbTokenObtainSerializer
+        code = default_token_generator.make_token(user)
+        data = {'username': user.username, 'confirmation_code': code}
+        issued = 200
+        # Выдача токена - ровно один запрос, без накопления по серии.
+        with django_assert_num_queries(issued) as context:
+            started = time.perf_counter()
+            for _ in range(issued):
+                serializer = YAMDbTokenObtainSerializer(data=data)
+                assert serializer.is_valid()
+            elapsed = time.perf_counter() - started
+        # Результаты попадают в junit-отчет и в итог прогона
+        # (pytest_terminal_summary в conftest.py).
+        record_property('tokens_per_second', round(issued / elapsed))
+        record_property(
+            'queries_per_token', len(context.captured_queries) / issued
+        )
@@ -0,0 +1,139 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Category, Genre, Title, TitleGenre
+
+
+@pytest.fixture
+def catalog(db):
+    Category.objects.create(name='Книги', slug='books')
+    Category.objects.create(name='Фильмы', slug='movies')
+    for slug in ('drama', 'comedy', 'horror'):
+        Genre.objects.create(name=slug, slug=slug)
+
+
+def make_items(count, start=0):
+    return [
+        {
+            'name': f'Произведение {number}',
+            'year': 2000,
+            'category': 'books',
+            'genre': ['drama', 'comedy'],
+        }
+        for number in range(start, start + count)
+    ]
+
+
+class Test22TitleBulk:
+    url = '/api/v1/titles/bulk/'
+
+    def post(self, client, items):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(self.url, data=items, format='json')
+        return response, len(queries)
+
+    def test_01_create(self, admin_client, catalog):
+        response, _ = self.post(admin_client, make_items(3))
+        assert response.status_code == 201, response.json()
+        data = response.json()
+        assert [item['name'] for item in data] == [
+            'Произведение 0', 'Произведение 1', 'Произведение 2'
+        ]
+        for item in data:
+            title = Title.objects.get(pk=item['id'])
+            assert title.name == item['name']
+            assert title.category.slug == 'books'
+            assert sorted(title.genre.values_list('slug', flat=True)) == [
+                'comedy', 'drama'
+            ]
+        response = admin_client.get(f'/api/v1/titles/{data[0]["id"]}/')
+        assert response.status_code == 200
+        assert response.json()['category']['slug'] == 'books'
+
+    def test_02_queries_do_not_depend_on_size(self, admin_client, catalog):
+        # Первый запрос прогревает кеш аутентификации.
+        self.post(admin_client, make_items(1))
+        _, small = self.post(admin_client, make_items(2))
+        _, large = self.post(admin_client, make_items(100, start=2))
+        assert Title.objects.count() == 103
+        assert TitleGenre.objects.count() == 206
+        assert small == large, (
+            'Проверьте, что число запросов не зависит от размера пакета'
+        )
+
+    def test_03_upsert(self, admin_client, catalog):
+        response, _ = self.post(admin_client, make_items(2))
+        first, second = response.json()
+        items = [
+            {'id': first['id'], 'name': 'Новое имя', 'year': 1999,
+             'category': 'movies', 'genre': ['horror']},
+            {'name': 'Третье', 'year': 2001, 'genre': []},
+        ]
+        response, _ = self.post(admin_client, items)
+        assert response.status_code == 201, response.json()
+        title = Title.objects.get(pk=first['id'])
+        assert (title.name, title.year, title.category.slug) == (
+            'Новое имя', 1999, 'movies'
+        )
+        assert list(title.genre.values_list('slug', flat=True)) == ['horror']
+        assert Title.objects.get(pk=second['id']).genre.count() == 2
+        assert Title.objects.count() == 3
+
+    def test_04_partial_upsert_keeps_fields(self, admin_client, catalog):
+        item = dict(make_items(1)[0], description='Описание')
+        response, _ = self.post(admin_client, [item])
+        pk = response.json()[0]['id']
+        response, _ = self.post(admin_client, [
+            {'id': pk, 'name': 'Новое', 'year': 2001, 'genre': ['horror']},
+        ])
+        assert response.status_code == 201, response.json()
+        title = Title.objects.get(pk=pk)
+        assert (title.name, title.year) == ('Новое', 2001)
+        assert title.description == 'Описание', (
+            'Непереданное описание не должно затираться'
+        )
+        assert title.category.slug == 'books', (
+            'Непереданная категория не должна сбрасываться'
+        )
+        response, _ = self.post(admin_client, [
+            {'id': pk, 'name': 'Новое', 'year': 2001, 'genre': [],
+             'category': None},
+        ])
+        assert response.status_code == 201, response.json()
+        assert Title.objects.get(pk=pk).category is None
+
+    def test_05_errors_are_atomic(self, admin_client, catalog):
+        items = make_items(3)
+        items[1]['genre'] = ['drama', 'unknown']
+        items[2]['category'] = 'music'
+        response, _ = self.post(admin_client, items)
+        assert response.status_code == 400
+        errors = response.json()
+        assert errors[0] == {}
+        assert 'genre' in errors[1]
+        assert 'category' in errors[2]
+        assert Title.objects.count() == 0, (
+            'При ошибке в пакете ничего не должно записываться'
+        )
+        response, _ = self.post(
+            admin_client, [{'id': 999, 'name': 'x', 'year': 2000,
+                            'genre': []}]
+        )
+        assert response.status_code == 400
+        assert 'id' in response.json()[0]
+        response, _ = self.post(admin_client, {'name': 'x'})
+        assert response.status_code == 400
+
+    def test_06_permissions(self, client, user_client, catalog):
+        response = client.post(
+            self.url, data=json.dumps(make_items(1)),
+            content_type='application/json'
+        )
+        assert response.status_code == 401
+        response = user_client.post(
+            self.url, data=make_items(1), format='json'
+        )
+        assert response.status_code == 403
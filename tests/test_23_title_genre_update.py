@@ -0,0 +1,129 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Category, Genre, Title, TitleGenre
+
+
+@pytest.fixture
+def title(db):
+    category = Category.objects.create(name='Книги', slug='books')
+    for slug in ('drama', 'comedy', 'horror'):
+        Genre.objects.create(name=slug, slug=slug)
+    title = Title.objects.create(
+        name='Произведение', year=2000, description='', category=category
+    )
+    for slug in ('drama', 'comedy'):
+        TitleGenre.objects.create(title=title, genre=Genre.objects.get(slug=slug))
+    return title
+
+
+def writes(queries):
+    return [
+        query['sql'].split()[0] for query in queries.captured_queries
+        if query['sql'].split()[0] in ('INSERT', 'UPDATE', 'DELETE')
+    ]
+
+
+class Test23TitleGenreUpdate:
+
+    def patch(self, client, title, data):
+        url = f'/api/v1/titles/{title.pk}/'
+        # Прогреваем кеш аутентификации, чтобы считать только работу вью.
+        client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.patch(url, data=data, format='json')
+        assert response.status_code == 200, response.json()
+        return response, queries
+
+    def test_01_noop(self, admin_client, title):
+        kept = set(TitleGenre.objects.values_list('id', flat=True))
+        response, queries = self.patch(
+            admin_client, title, {'genre': ['comedy', 'drama']}
+        )
+        assert sorted(response.json()['genre']) == ['comedy', 'drama']
+        assert writes(queries) == [], (
+            'Если жанры не изменились, запросов на запись быть не должно'
+        )
+        assert set(TitleGenre.objects.values_list('id', flat=True)) == kept
+
+    def test_02_single_add(self, admin_client, title):
+        kept = set(TitleGenre.objects.values_list('id', flat=True))
+        _, noop = self.patch(
+            admin_client, title, {'genre': ['drama', 'comedy']}
+        )
+        response, queries = self.patch(
+            admin_client, title, {'genre': ['drama', 'comedy', 'horror']}
+        )
+        assert sorted(response.json()['genre']) == [
+            'comedy', 'drama', 'horror'
+        ]
+        assert writes(queries) == ['INSERT', 'UPDATE'], (
+            'Добавление жанра - одна вставка TitleGenre и обновление '
+            'updated_at произведения'
+        )
+        assert len(queries) == len(noop) + 2
+        assert kept < set(TitleGenre.objects.values_list('id', flat=True))
+
+    def test_03_single_remove(self, admin_client, title):
+        kept = TitleGenre.objects.get(genre__slug='drama').pk
+        _, noop = self.patch(
+            admin_client, title, {'genre': ['drama', 'comedy']}
+        )
+        response, queries = self.patch(
+            admin_client, title, {'genre': ['drama']}
+        )
+        assert response.json()['genre'] == ['drama']
+        assert writes(queries) == ['DELETE', 'UPDATE']
+        assert len(queries) == len(noop) + 2, (
+            'Удаление жанра - один DELETE без выборки строк'
+        )
+        assert list(TitleGenre.objects.values_list('id', flat=True)) == [kept]
+
+    def test_04_slugs_resolved_in_one_query(self, admin_client, title):
+        _, one = self.patch(admin_client, title, {'genre': ['drama']})
+        _, three = self.patch(
+            admin_client, title, {'genre': ['drama', 'comedy', 'horror']}
+        )
+        assert len(three) == len(one), (
+            'Проверьте, что слаги жанров проверяются одним запросом'
+        )
+        response = admin_client.patch(
+            f'/api/v1/titles/{title.pk}/',
+            data={'genre': ['drama', 'unknown']}, format='json'
+        )
+        assert response.status_code == 400
+        assert 'genre' in response.json()
+
+    def test_05_list_sees_update(self, admin_client, title):
+        url = '/api/v1/titles/'
+        before = admin_client.get(url).json()['results'][0]
+        assert {genre['slug'] for genre in before['genre']} == {
+            'drama', 'comedy'
+        }
+        self.patch(admin_client, title, {'genre': ['horror']})
+        after = admin_client.get(url).json()['results'][0]
+        assert [genre['slug'] for genre in after['genre']] == ['horror'], (
+            'Проверьте, что смена жанров инвалидирует кеш списка'
+        )
+
+    def test_06_add_and_remove(self, admin_client, title, monkeypatch):
+        from api import cache
+        _, noop = self.patch(
+            admin_client, title, {'genre': ['drama', 'comedy']}
+        )
+        bumps = []
+        bump_versions = cache.bump_versions
+        monkeypatch.setattr(
+            cache, 'bump_versions',
+            lambda *labels: bumps.extend(labels) or bump_versions(*labels)
+        )
+        response, queries = self.patch(
+            admin_client, title, {'genre': ['drama', 'horror']}
+        )
+        assert sorted(response.json()['genre']) == ['drama', 'horror']
+        assert writes(queries) == ['DELETE', 'INSERT', 'UPDATE']
+        assert len(queries) == len(noop) + 3
+        assert bumps.count('reviews.TitleGenre') == 1, (
+            'Версия TitleGenre сбрасывается один раз за изменение'
+        )
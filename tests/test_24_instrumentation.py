@@ -0,0 +1,86 @@
+import pytest
+from django.test import override_settings
+
+from reviews.models import Category, Genre, Title
+
+ENABLED = {'ENABLED': True, 'SAMPLES': 10}
+
+
+@pytest.fixture
+def route_stats():
+    from api.instrumentation import route_stats
+    route_stats.clear()
+    yield route_stats
+    route_stats.clear()
+
+
+@pytest.fixture
+def titles(db):
+    category = Category.objects.create(name='Книги', slug='books')
+    genre = Genre.objects.create(name='Драма', slug='drama')
+    for number in range(3):
+        title = Title.objects.create(
+            name=f'Произведение {number}', year=2000, category=category
+        )
+        title.genre.add(genre)
+
+
+def parse_server_timing(value):
+    result = {}
+    for part in value.split(', '):
+        name, *params = part.split(';')
+        result[name] = dict(param.split('=', 1) for param in params)
+    return result
+
+
+class Test24Instrumentation:
+
+    def test_01_disabled_by_default(self, client, titles):
+        response = client.get('/api/v1/titles/')
+        assert 'Server-Timing' not in response
+        assert 'X-Query-Count' not in response
+
+    @override_settings(REQUEST_INSTRUMENTATION=ENABLED)
+    def test_02_headers(self, client, titles, route_stats):
+        response = client.get('/api/v1/titles/?page_size=50')
+        assert response.status_code == 200
+        assert response['X-Query-Count'] == '3', (
+            'Проверьте, что X-Query-Count считает SQL-запросы вью'
+        )
+        timing = parse_server_timing(response['Server-Timing'])
+        assert set(timing) == {'sql', 'view', 'serialize', 'render', 'total'}
+        assert timing['sql']['desc'] == '"3 queries"'
+        durations = {name: float(timing[name]['dur']) for name in timing}
+        assert durations['serialize'] > 0, (
+            'Проверьте, что время сериализации замеряется отдельно'
+        )
+        # Округление каждого этапа до сотых миллисекунды.
+        assert durations['total'] + 0.03 >= (
+            durations['view'] + durations['serialize'] + durations['render']
+        ), 'Сериализация не должна входить во время вью'
+        assert durations['total'] >= durations['sql']
+
+        title = Title.objects.first()
+        response = client.get(f'/api/v1/titles/{title.pk}/')
+        timing = parse_server_timing(response['Server-Timing'])
+        assert float(timing['serialize']['dur']) > 0
+
+    @override_settings(REQUEST_INSTRUMENTATION=ENABLED)
+    def test_03_route_percentiles(self, client, titles, route_stats):
+        title = Title.objects.first()
+        # Разные URL, чтобы ответы не брались из кеша.
+        for page_size in (7, 8, 9):
+            client.get(f'/api/v1/titles/?page_size={page_size}')
+        client.get(f'/api/v1/titles/{title.pk}/')
+        client.get('/api/v1/titles/999999/')
+        snapshot = route_stats.snapshot()
+        assert snapshot['GET title-list']['count'] == 3
+        assert snapshot['GET title-detail']['count'] == 2
+        route = snapshot['GET title-list']
+        assert route['queries_p50'] == 3
+        assert route['total_p50'] <= route['total_p90'] <= route['total_p99']
+        assert (
+            route['serialize_p50'] <= route['serialize_p90']
+            <= route['serialize_p99']
+        )
+        assert snapshot['GET title-detail']['serialize_p50'] >= 0
@@ -0,0 +1,134 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from django.test import override_settings
+
+from reviews.models import Category, Genre, Title
+
+
+ENABLED = {'ENABLED': True}
+
+
+@pytest.fixture
+def registry():
+    from api.metrics import registry
+    registry.clear()
+    yield registry
+    registry.clear()
+
+
+@pytest.fixture
+def titles(db):
+    category = Category.objects.create(name='Книги', slug='books')
+    genre = Genre.objects.create(name='Драма', slug='drama')
+    for number in range(3):
+        title = Title.objects.create(
+            name=f'Произведение {number}', year=2000, category=category
+        )
+        title.genre.add(genre)
+
+
+def parse(text):
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+class Test25Metrics:
+    list_labels = 'view="TitlesViewSet",action="list"'
+
+    @override_settings(METRICS=ENABLED, API_RESPONSE_CACHE=ENABLED)
+    def test_01_request_metrics(self, client, titles, registry):
+        for page_size in (1, 2, 3):
+            client.get(f'/api/v1/titles/?page_size={page_size}')
+        client.get('/api/v1/titles/?page_size=3')
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        text = response.content.decode()
+        assert '# TYPE yamdb_http_request_duration_seconds histogram' in text
+        samples = parse(text)
+        assert samples[
+            'yamdb_http_requests_total{' + self.list_labels
+            + ',method="GET",status="200"}'
+        ] == 4
+        assert samples[
+            'yamdb_http_request_duration_seconds_count{'
+            + self.list_labels + '}'
+        ] == 4
+        assert samples[
+            'yamdb_http_request_duration_seconds_bucket{'
+            + self.list_labels + ',le="+Inf"}'
+        ] == 4
+        # Три промаха кеша по 3 запроса и одно попадание без запросов.
+        assert samples[
+            'yamdb_http_request_queries_bucket{'
+            + self.list_labels + ',le="0"}'
+        ] == 1
+        assert samples[
+            'yamdb_http_request_queries_sum{' + self.list_labels + '}'
+        ] == 9
+        assert 'yamdb_response_cache_hit_ratio' in samples
+        assert 'yamdb_jwt_cache_entries{cache="token"}' in samples
+
+    def test_02_multiprocess_aggregation(self, client, db, tmp_path,
+                                         registry):
+        from api.metrics import Registry, format_labels
+        other = Registry()
+        labels = format_labels(view='GenresViewSet', action='list')
+        other.inc('yamdb_http_requests_total', labels, 5)
+        other.observe('yamdb_http_request_queries', labels, 2)
+        state = dict(other.dump(), pid=dead_pid(), gauges={
+            'yamdb_email_queue_depth': {'': 7},
+        })
+        (tmp_path / f'metrics-{state["pid"]}.json').write_text(
+            json.dumps(state)
+        )
+        alive = dict(state, pid=os.getppid())
+        (tmp_path / f'metrics-{alive["pid"]}.json').write_text(
+            json.dumps(alive)
+        )
+        settings = dict(ENABLED, DIR=str(tmp_path))
+        with override_settings(METRICS=settings):
+            client.get('/api/v1/genres/')
+            samples = parse(client.get('/metrics').content.decode())
+        assert samples['yamdb_http_requests_total{' + labels + '}'] == 5, (
+            'Проверьте, что /metrics складывает метрики живых процессов'
+        )
+        assert samples[
+            'yamdb_http_request_queries_count{' + labels + '}'
+        ] == 2
+        assert samples['yamdb_email_queue_depth'] == 7
+        assert not (tmp_path / f'metrics-{state["pid"]}.json').exists(), (
+            'Файлы умерших процессов должны удаляться'
+        )
+        assert (tmp_path / f'metrics-{os.getpid()}.json').exists(), (
+            'Проверьте, что процесс сбрасывает метрики в общую папку'
+        )
+
+    def test_03_access(self, client, db, registry):
+        assert client.get('/metrics').status_code == 404, (
+            'По умолчанию /metrics выключен'
+        )
+        with override_settings(METRICS=dict(ENABLED, TOKEN='secret')):
+            assert client.get('/metrics').status_code == 401
+            response = client.get(
+                '/metrics', HTTP_AUTHORIZATION='Bearer wrong'
+            )
+            assert response.status_code == 401
+            response = client.get(
+                '/metrics', HTTP_AUTHORIZATION='Bearer secret'
+            )
+            assert response.status_code == 200
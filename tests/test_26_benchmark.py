@@ -0,0 +1,83 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from reviews.models import Comments, Review, Title, User
+
+
+def counts():
+    return [
+        model.objects.count() for model in (Title, Review, Comments, User)
+    ]
+
+
+class Test26Benchmark:
+
+    @pytest.mark.django_db
+    def test_01_generate_dataset(self):
+        call_command(
+            'generate_dataset', users=10, titles=20, reviews=150,
+            comments=100, seed=1, batch_size=40, stdout=StringIO()
+        )
+        assert User.objects.count() == 10
+        assert Title.objects.count() == 20
+        assert Comments.objects.count() == 100
+        reviews = Review.objects.count()
+        assert 0 < reviews <= 150
+        pairs = set(Review.objects.values_list('title_id', 'author_id'))
+        assert len(pairs) == reviews, (
+            'У произведения не может быть двух отзывов одного юзера'
+        )
+        assert not Title.objects.inconsistent_ratings().exists()
+        assert all(title.genre.exists() for title in Title.objects.all())
+        # Повторный запуск дописывает данные после существующих id.
+        call_command(
+            'generate_dataset', users=5, titles=5, reviews=10, comments=10,
+            seed=2, stdout=StringIO()
+        )
+        assert User.objects.count() == 15
+        assert Title.objects.count() == 25
+
+    @pytest.mark.django_db
+    def test_02_benchmark_api(self, tmp_path):
+        devnull = StringIO()
+        call_command(
+            'generate_dataset', users=10, titles=10, reviews=50,
+            comments=50, seed=1, stdout=devnull
+        )
+        before = counts()
+        output = tmp_path / 'result.json'
+        call_command(
+            'benchmark_api', iterations=3, warmup=1, seed=1,
+            output=str(output), stdout=devnull
+        )
+        report = json.loads(output.read_text())
+        assert report['meta']['dataset']['titles'] == 10
+        routes = report['routes']
+        for name, result in routes.items():
+            assert result['requests'] == 3
+            assert result['errors'] == 0, name
+            assert result['p50_ms'] <= result['p99_ms']
+        assert {
+            'title_create', 'title_update', 'title_delete', 'titles_bulk',
+            'titles_export', 'review_create', 'review_update',
+            'review_delete', 'comment_create', 'comment_update',
+            'comment_delete', 'user_detail', 'signup', 'token',
+        } <= set(routes), 'Проверьте, что замеряются все маршруты API'
+        assert counts() == before, 'Пишущие запросы должны откатываться'
+        assert not User.objects.filter(
+            username__startswith='bench_signup'
+        ).exists(), 'Регистрации бенчмарка должны откатываться'
+        assert not User.objects.filter(username='benchmark_admin').exists()
+        assert report['meta']['response_cache'] is False
+        assert routes['titles_list']['cache_hit_ratio'] is None
+        second = tmp_path / 'second.json'
+        call_command(
+            'benchmark_api', iterations=2, warmup=1, routes='titles_list',
+            cache=True, output=str(second), compare=str(output),
+            stdout=devnull
+        )
+        result = json.loads(second.read_text())['routes']['titles_list']
+        assert result['cache_hit_ratio'] == 1.0
@@ -0,0 +1,153 @@
+import asyncio
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from reviews.models import Comments, Review
+
+
+@pytest.fixture
+def dataset(transactional_db):
+    call_command(
+        'generate_dataset', users=10, titles=30, reviews=40, comments=20,
+        seed=1, stdout=StringIO()
+    )
+
+
+class Test27Loadtest:
+
+    def test_01_mixed_traffic(self, live_server, dataset, tmp_path):
+        reviews, comments = Review.objects.count(), Comments.objects.count()
+        output = tmp_path / 'loadtest.json'
+        stdout = StringIO()
+        # Один виртуальный юзер: тестовая база SQLite в памяти
+        # блокирует таблицы при параллельной записи из потоков сервера.
+        call_command(
+            'loadtest', url=live_server.url, users=1, duration=30,
+            requests=60, seed=1, output=str(output),
+            mix='browse=1,title=1,reviews=1,comments=1,review=2,comment=2',
+            stdout=stdout,
+        )
+        report = json.loads(output.read_text())
+        assert report['requests'] >= 60
+        assert report['errors'] == 0, {
+            route: result['statuses']
+            for route, result in report['routes'].items()
+        }
+        assert {'titles_list', 'token', 'review_create'} <= set(
+            report['routes']
+        )
+        for result in report['routes'].values():
+            assert result['p50_ms'] <= result['p99_ms']
+        assert report['routes']['token']['statuses'] == {
+            '200': report['routes']['token']['requests']
+        }, 'Виртуальный юзер должен получить токен один раз'
+        assert Review.objects.count() > reviews
+        assert Comments.objects.count() > comments
+        assert 'Итого' in stdout.getvalue()
+
+    def test_02_concurrent_reads(self, live_server, dataset, tmp_path):
+        output = tmp_path / 'loadtest.json'
+        call_command(
+            'loadtest', url=live_server.url, users=8, duration=30,
+            requests=80, seed=1, output=str(output),
+            mix='browse=1,title=1,reviews=1,comments=1', stdout=StringIO(),
+        )
+        report = json.loads(output.read_text())
+        assert report['users'] == 8
+        assert report['requests'] >= 80
+        assert report['errors'] == 0
+        assert 'token' not in report['routes'], (
+            'Сценарии чтения не должны запрашивать токен'
+        )
+
+    def test_03_invalid_mix(self, dataset):
+        with pytest.raises(CommandError):
+            call_command('loadtest', mix='unknown=1', stdout=StringIO())
+        with pytest.raises(CommandError):
+            call_command('loadtest', mix='browse=0', stdout=StringIO())
+
+    def test_04_shared_accounts(self):
+        from reviews.loadtest import Account, LoadTest
+
+        class FakeServer(LoadTest):
+            posted = []
+            logins = 0
+
+            async def call(self, client, route, method, path, body=None,
+                           token=None):
+                self.sent += 1
+                # Отдаем управление другим виртуальным юзерам посреди
+                # запроса, как при настоящей сети.
+                await asyncio.sleep(0.001)
+                if route == 'token':
+                    FakeServer.logins += 1
+                    return 200, json.dumps({'access': 'token'}).encode()
+                if route == 'review_create':
+                    if path in self.posted:
+                        self.record(route, 0, 400)
+                        return 400, b''
+                    self.posted.append(path)
+                    self.record(route, 0, 201)
+                    return 201, b''
+                self.record(route, 0, 200)
+                return 200, b'{}'
+
+        test = FakeServer(
+            'http://testserver', 8, list(range(1, 21)), [],
+            [Account('shared', 'code', ())], duration=30, max_requests=60,
+            mix={'review': 1, 'comment': 1}, seed=1,
+        )
+        report = asyncio.run(test.run())
+        statuses = report['routes']['review_create']['statuses']
+        assert statuses == {'201': len(test.posted)}, (
+            'Виртуальные юзеры с общим аккаунтом не должны писать '
+            'повторные отзывы'
+        )
+        assert FakeServer.logins == 1, 'Общий аккаунт входит один раз'
+
+    def test_05_retry_idempotent_only(self):
+        from reviews.loadtest import HTTPClient, HTTPError
+        received = []
+
+        async def handle(reader, writer):
+            # Первый запрос на соединении получает ответ, второй
+            # обрывается, как при закрытии простаивавшего соединения.
+            for number in range(2):
+                head = await reader.readuntil(b'\r\n\r\n')
+                length = int(head.split(b'Content-Length: ')[1].split()[0])
+                await reader.readexactly(length)
+                received.append(head.split()[0].decode())
+                if number:
+                    break
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n{}')
+                await writer.drain()
+            writer.close()
+
+        async def run(method):
+            server = await asyncio.start_server(handle, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            client = HTTPClient('127.0.0.1', port, timeout=5)
+            try:
+                await client.request('GET', '/')
+                return await client.request(method, '/', body={})
+            finally:
+                await client.close()
+                server.close()
+                await server.wait_closed()
+
+        assert asyncio.run(run('GET')) == (200, b'{}')
+        assert received == ['GET', 'GET', 'GET'], (
+            'GET после обрыва соединения повторяется'
+        )
+        received.clear()
+        with pytest.raises(
+            (ConnectionError, asyncio.IncompleteReadError, HTTPError)
+        ):
+            asyncio.run(run('POST'))
+        assert received == ['GET', 'POST'], (
+            'POST после обрыва соединения не должен отправляться повторно'
+        )
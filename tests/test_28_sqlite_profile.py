@@ -0,0 +1,144 @@
+import json
+import sqlite3
+import threading
+import time
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections, transaction
+
+from api_yamdb.db.base import retry_locked
+
+ALIAS = 'production_profile'
+
+
+@pytest.fixture
+def production_db(tmp_path, django_db_blocker):
+    connections.databases[ALIAS] = dict(
+        settings.DATABASE_PROFILES['production'],
+        ENGINE='api_yamdb.db', NAME=str(tmp_path / 'db.sqlite3'),
+        OPTIONS={'timeout': 0.01},
+    )
+    connections.ensure_defaults(ALIAS)
+    connections.prepare_test_settings(ALIAS)
+    with django_db_blocker.unblock():
+        connection = connections[ALIAS]
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (value INTEGER)')
+        yield connection
+        connection.close()
+    del connections[ALIAS]
+    del connections.databases[ALIAS]
+
+
+def hold_write_lock(path, seconds):
+    """Держит блокировку записи из другого соединения seconds секунд."""
+    locked = threading.Event()
+
+    def target():
+        conn = sqlite3.connect(path, isolation_level=None)
+        conn.execute('BEGIN IMMEDIATE')
+        locked.set()
+        time.sleep(seconds)
+        conn.execute('COMMIT')
+        conn.close()
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    locked.wait()
+    return thread
+
+
+class Test28SQLiteProfile:
+
+    def test_01_pragmas(self, production_db):
+        with production_db.cursor() as cursor:
+            values = {}
+            for name in ('journal_mode', 'synchronous', 'cache_size',
+                         'mmap_size', 'temp_store'):
+                cursor.execute(f'PRAGMA {name}')
+                values[name] = cursor.fetchone()[0]
+        assert values == {
+            'journal_mode': 'wal',
+            'synchronous': 1,
+            'cache_size': -65536,
+            'mmap_size': 268435456,
+            'temp_store': 2,
+        }, 'Прагмы профиля должны применяться к каждому соединению'
+
+    def test_02_immediate_transactions(self, production_db):
+        other = sqlite3.connect(
+            production_db.settings_dict['NAME'], timeout=0,
+            isolation_level=None,
+        )
+        with transaction.atomic(using=ALIAS):
+            # Транзакция еще ничего не писала, но блокировку уже держит.
+            with pytest.raises(sqlite3.OperationalError, match='locked'):
+                other.execute('BEGIN IMMEDIATE')
+            # Читатели в WAL не блокируются.
+            assert other.execute('SELECT COUNT(*) FROM item').fetchone()
+        other.execute('BEGIN IMMEDIATE')
+        other.execute('ROLLBACK')
+        other.close()
+
+    def test_03_busy_retry(self, production_db):
+        thread = hold_write_lock(production_db.settings_dict['NAME'], 0.3)
+        started = time.monotonic()
+        with production_db.cursor() as cursor:
+            cursor.execute('INSERT INTO item VALUES (1)')
+        thread.join()
+        assert time.monotonic() - started >= 0.2, (
+            'Запись должна дождаться снятия блокировки повторами'
+        )
+        thread = hold_write_lock(production_db.settings_dict['NAME'], 0.3)
+        with transaction.atomic(using=ALIAS):
+            with production_db.cursor() as cursor:
+                cursor.execute('INSERT INTO item VALUES (2)')
+        thread.join()
+        with production_db.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM item')
+            assert cursor.fetchone()[0] == 2
+
+    def test_04_retry_locked(self, monkeypatch):
+        delays = []
+        monkeypatch.setattr(time, 'sleep', delays.append)
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 4:
+                raise sqlite3.OperationalError('database is locked')
+            return 'ok'
+
+        assert retry_locked(flaky, 10, 0.01, 0.02) == 'ok'
+        assert len(delays) == 3
+        assert all(0 <= delay <= 0.02 for delay in delays)
+
+        def broken():
+            calls.append(1)
+            raise sqlite3.OperationalError('no such table: item')
+
+        calls.clear()
+        with pytest.raises(sqlite3.OperationalError, match='no such table'):
+            retry_locked(broken, 10, 0.01, 0.02)
+        assert len(calls) == 1, 'Повторять можно только блокировки'
+
+        def locked():
+            raise sqlite3.OperationalError('database is locked')
+
+        with pytest.raises(sqlite3.OperationalError, match='locked'):
+            retry_locked(locked, 0, 0.01, 0.02)
+
+    def test_05_db_benchmark(self, tmp_path):
+        output = tmp_path / 'result.json'
+        call_command(
+            'db_benchmark', workers=2, duration=0.5, titles=10, reviews=30,
+            comments=10, seed=1, output=str(output), stdout=StringIO()
+        )
+        report = json.loads(output.read_text())
+        assert set(report['profiles']) == {'development', 'production'}
+        for profile, result in report['profiles'].items():
+            assert result['read']['operations'] > 0, profile
+            assert result['write']['operations'] > 0, profile
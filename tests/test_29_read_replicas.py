@@ -0,0 +1,140 @@
+import sqlite3
+from io import StringIO
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connections
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from api import replicas
+from reviews.models import Category, Title, User
+
+ALIAS = 'replica_test'
+
+
+@pytest.fixture
+def replica(tmp_path, transactional_db):
+    connections.databases[ALIAS] = {
+        'ENGINE': 'api_yamdb.db',
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+        'PRAGMAS': {'query_only': 'ON'},
+    }
+    connections.ensure_defaults(ALIAS)
+    connections.prepare_test_settings(ALIAS)
+    shared_cache = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(tmp_path / 'cache'),
+    }}
+    with override_settings(DATABASE_REPLICAS=[ALIAS], CACHES=shared_cache):
+        yield ALIAS
+    connections[ALIAS].close()
+    del connections[ALIAS]
+    del connections.databases[ALIAS]
+    replicas._ready.discard(ALIAS)
+
+
+def titles_count(client):
+    response = client.get('/api/v1/titles/')
+    assert response.status_code == 200
+    return response.json()['count']
+
+
+class Test29ReadReplicas:
+
+    def test_01_router(self, replica):
+        router = replicas.ReplicaRouter()
+        assert router.db_for_read(Title) == 'default', (
+            'Вне HTTP-запроса чтения должны идти в основную базу'
+        )
+        token = replicas.use_replicas.set(True)
+        try:
+            assert router.db_for_read(Title) == 'default', (
+                'Пока в реплику ничего не скопировано, читать с нее нельзя'
+            )
+            replicas.refresh(ALIAS)
+            assert router.db_for_read(Title) == ALIAS
+            assert router.db_for_read(Category) == ALIAS
+            assert router.db_for_read(User) == 'default'
+            assert router.db_for_write(Title) == 'default'
+        finally:
+            replicas.use_replicas.reset(token)
+        assert router.allow_migrate('default', 'reviews')
+        assert not router.allow_migrate(ALIAS, 'reviews')
+
+    def test_02_refresh(self, replica):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        Title.objects.create(name='Первый', year=2000, category=category)
+        replicas.refresh(ALIAS)
+        reader = sqlite3.connect(connections.databases[ALIAS]['NAME'])
+        assert reader.execute(
+            'SELECT name FROM reviews_title'
+        ).fetchall() == [('Первый',)]
+        Title.objects.create(name='Второй', year=2001, category=category)
+        # Обновление не мешает открытому соединению читателя.
+        replicas.refresh(ALIAS)
+        assert reader.execute(
+            'SELECT COUNT(*) FROM reviews_title'
+        ).fetchone()[0] == 2
+        reader.close()
+        with pytest.raises(Exception, match='readonly'):
+            with connections[ALIAS].cursor() as cursor:
+                cursor.execute('DELETE FROM reviews_title')
+
+    def test_03_read_your_writes(self, replica, admin_client):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        Title.objects.create(name='Первый', year=2000, category=category)
+        call_command('refresh_replicas', once=True, stdout=StringIO())
+        Title.objects.create(name='Второй', year=2001, category=category)
+        anonymous = APIClient()
+        assert titles_count(anonymous) == 1, (
+            'Безопасные запросы должны читать с реплики'
+        )
+        response = admin_client.post('/api/v1/titles/', data={
+            'name': 'Третий', 'year': 2002, 'category': 'movie',
+        })
+        assert response.status_code == 201
+        assert titles_count(anonymous) == 1
+        assert titles_count(admin_client) == 3, (
+            'После записи клиент должен читать из основной базы, '
+            'в том числе мимо ответов из кеша, собранных с реплики'
+        )
+        call_command('refresh_replicas', once=True, stdout=StringIO())
+        assert titles_count(anonymous) == 3, (
+            'После обновления реплики ответы из кеша не должны устаревать'
+        )
+        with override_settings(DATABASE_REPLICATION={'STICKY_SECONDS': 0}):
+            admin_client.post('/api/v1/titles/', data={
+                'name': 'Четвертый', 'year': 2003, 'category': 'movie',
+            })
+        assert titles_count(admin_client) == 3, (
+            'Когда срок привязки истек, клиент снова читает с реплики'
+        )
+
+    def test_04_anonymous_stickiness(self, replica):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        Title.objects.create(name='Первый', year=2000, category=category)
+        call_command('refresh_replicas', once=True, stdout=StringIO())
+        Title.objects.create(name='Второй', year=2001, category=category)
+        writer, other = APIClient(), APIClient()
+        writer.post('/api/v1/auth/signup/', data={
+            'username': 'anon', 'email': 'anon@yamdb.fake',
+        })
+        assert titles_count(writer) == 2, (
+            'Аноним после записи читает из основной базы'
+        )
+        assert titles_count(other) == 1, (
+            'Запись одного анонима не должна привязывать к основной '
+            'базе остальных клиентов с тем же IP'
+        )
+
+    def test_05_process_local_cache(self, replica):
+        local_cache = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}
+        with override_settings(CACHES=local_cache):
+            with pytest.raises(ImproperlyConfigured, match='YAMDB_CACHE_DIR'):
+                replicas.ReplicaMiddleware(lambda request: None)
+            with pytest.raises(ImproperlyConfigured):
+                call_command('refresh_replicas', once=True, stdout=StringIO())
@@ -0,0 +1,146 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.models import Category, Comments, Genre, Review, Title, User
+
+
+def client_for(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}'
+    )
+    return client
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[3] for row in cursor.fetchall()]
+
+
+def plan_problems(sql, plan, allow_sort=False):
+    """
+    Полные сканы и сортировки во временном B-дереве. Скан допустим
+    только в запросе без WHERE: это первая страница списка по ключу
+    сортировки с LIMIT или COUNT(*) постраничной пагинации.
+    """
+    problems = []
+    for detail in plan:
+        if 'TEMP B-TREE' in detail:
+            if not allow_sort:
+                problems.append(detail)
+        elif (detail.startswith('SCAN ') and 'VIRTUAL TABLE' not in detail
+              and ' WHERE ' in sql):
+            problems.append(detail)
+    return problems
+
+
+class Test30QueryPlans:
+
+    @pytest.fixture
+    def data(self, admin):
+        call_command(
+            'generate_dataset', users=20, titles=40, reviews=200,
+            comments=200, seed=1, stdout=StringIO()
+        )
+        review = Review.objects.filter(comments__isnull=False).first()
+        return {
+            'title': review.title_id,
+            'review': review.id,
+            'comment': review.comments.first().id,
+            'category': Category.objects.first().slug,
+            'genre': Genre.objects.first().slug,
+            'year': Title.objects.first().year,
+            'author': User.objects.exclude(
+                reviews__title_id=review.title_id
+            ).exclude(pk=admin.pk).first(),
+        }
+
+    def get_routes(self, data):
+        titles = '/api/v1/titles/'
+        title = f'{titles}{data["title"]}/'
+        reviews = f'{title}reviews/'
+        comments = f'{reviews}{data["review"]}/comments/'
+        return {
+            'titles_list': ('get', titles),
+            'titles_cursor': ('get', f'{titles}?cursor='),
+            'titles_genre': ('get', f'{titles}?genre={data["genre"]}'),
+            'titles_category': (
+                'get', f'{titles}?category={data["category"]}'),
+            'titles_year': ('get', f'{titles}?year={data["year"]}'),
+            'titles_category_year': (
+                'get',
+                f'{titles}?category={data["category"]}&year={data["year"]}'),
+            'title_detail': ('get', title),
+            'reviews_list': ('get', reviews),
+            'reviews_cursor': ('get', f'{reviews}?cursor='),
+            'review_detail': ('get', f'{reviews}{data["review"]}/'),
+            'comments_list': ('get', comments),
+            'comments_cursor': ('get', f'{comments}?cursor='),
+            'comment_detail': ('get', f'{comments}{data["comment"]}/'),
+            'genres_list': ('get', '/api/v1/genres/'),
+            'categories_list': ('get', '/api/v1/categories/'),
+            'users_list': ('get', '/api/v1/users/'),
+            'users_me': ('get', '/api/v1/users/me/'),
+            'review_create': ('post', reviews, {'text': 'Отзыв', 'score': 7}),
+            'comment_create': ('post', comments, {'text': 'Комментарий'}),
+        }
+
+    @pytest.mark.django_db
+    def test_01_routes_use_indexes(self, admin, data):
+        admin_client = client_for(admin)
+        author_client = client_for(data['author'])
+        failures = []
+        for name, (method, url, *body) in self.get_routes(data).items():
+            client = admin_client if method == 'get' else author_client
+            with CaptureQueriesContext(connection) as context:
+                response = getattr(client, method)(url, *body)
+            assert response.status_code < 300, (name, response.content)
+            for query in context.captured_queries:
+                sql = query['sql']
+                problems = plan_problems(sql, explain(sql))
+                if problems:
+                    failures.append(f'{name}: {problems} in {sql}')
+        assert not failures, (
+            'Запросы API должны идти по индексам без полных сканов '
+            'и сортировок:\n' + '\n'.join(failures)
+        )
+
+    @pytest.mark.django_db
+    def test_02_search_sorts_only_by_rank(self, admin, data):
+        # Сортировка по релевантности FTS5 без временного B-дерева
+        # невозможна, но полных сканов быть не должно.
+        with CaptureQueriesContext(connection) as context:
+            client_for(admin).get('/api/v1/titles/?search=мир')
+        for query in context.captured_queries:
+            sql = query['sql']
+            assert not plan_problems(sql, explain(sql), allow_sort=True), sql
+
+    @pytest.mark.django_db
+    def test_03_review_uniqueness_check(self, data):
+        review = Review.objects.get(pk=data['review'])
+        queryset = Review.objects.filter(
+            title_id=review.title_id, author_id=review.author_id
+        )
+        plan = explain(str(queryset.query))
+        assert any('unique_review' in detail or 'autoindex' in detail
+                   for detail in plan), plan
+        plan = explain(str(
+            Review.objects.filter(author_id=review.author_id)
+            .order_by('pub_date').query
+        ))
+        assert plan == [
+            'SEARCH reviews_review USING INDEX review_author_pub_date_idx '
+            '(author_id=?)'
+        ], plan
+        plan = explain(str(
+            Comments.objects.filter(review_id=review.id)
+            .order_by('pub_date', 'id').query
+        ))
+        assert not plan_problems('WHERE', plan), plan
@@ -0,0 +1,122 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Review, Title
+
+
+@pytest.fixture
+def dataset(db):
+    call_command(
+        'generate_dataset', users=10, titles=20, reviews=60, comments=60,
+        seed=1, stdout=StringIO()
+    )
+    return Review.objects.filter(comments__isnull=False).first()
+
+
+def get(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200, response.content
+    return response.json(), [query['sql'] for query in context.captured_queries]
+
+
+class Test31SparseFields:
+
+    @pytest.mark.django_db
+    def test_01_titles(self, client, dataset):
+        full, full_queries = get(client, '/api/v1/titles/')
+        data, queries = get(client, '/api/v1/titles/?fields=id,name')
+        assert [set(item) for item in data['results']] == [
+            {'id', 'name'}
+        ] * len(full['results'])
+        assert [item['name'] for item in data['results']] == [
+            item['name'] for item in full['results']
+        ]
+        assert len(queries) == len(full_queries) - 1, (
+            'Без жанров в ответе их предвыборка не нужна'
+        )
+        select = queries[-1]
+        assert 'JOIN' not in select, 'Без категории в ответе джойн не нужен'
+        assert '"description"' not in select
+        assert '"category_id"' not in select
+
+        data, queries = get(client, '/api/v1/titles/?omit=genre,description')
+        item = data['results'][0]
+        assert set(item) == {'id', 'name', 'year', 'rating', 'category'}
+        assert set(item['category']) == {'name', 'slug'}
+        assert 'JOIN' in queries[-1]
+
+        title = Title.objects.first()
+        data, queries = get(
+            client, f'/api/v1/titles/{title.pk}/?fields=name,genre'
+        )
+        assert set(data) == {'name', 'genre'}
+        assert len(queries) == 2
+
+    @pytest.mark.django_db
+    def test_02_reviews_and_comments(self, client, dataset):
+        url = f'/api/v1/titles/{dataset.title_id}/reviews/'
+        data, queries = get(client, f'{url}?cursor=&fields=id,score')
+        assert data['results'] and all(
+            set(item) == {'id', 'score'} for item in data['results']
+        )
+        assert '"text"' not in queries[-1]
+        # Авторы не запрошены - запросов на каждый отзыв нет.
+        assert len(queries) == 2
+        data, _ = get(client, f'{url}?omit=text')
+        assert set(data['results'][0]) == {'id', 'author', 'score', 'pub_date'}
+
+        url = f'{url}{dataset.pk}/comments/'
+        data, queries = get(client, f'{url}?fields=text')
+        assert data['results'] and all(
+            set(item) == {'text'} for item in data['results']
+        )
+        comment = data['results'][0]
+        data, _ = get(client, f'{url}?omit=id,author,pub_date')
+        assert data['results'][0] == comment
+
+    @pytest.mark.django_db
+    def test_03_users_genres_categories(self, admin_client, dataset):
+        data, queries = get(admin_client, '/api/v1/users/?fields=username')
+        assert all(set(item) == {'username'} for item in data['results'])
+        assert '"email"' not in queries[-1]
+        data, _ = get(admin_client, '/api/v1/users/me/?omit=bio,role')
+        assert set(data) == {'email', 'username', 'first_name', 'last_name'}
+        for url in ('/api/v1/genres/', '/api/v1/categories/'):
+            data, _ = get(admin_client, f'{url}?fields=slug')
+            assert all(set(item) == {'slug'} for item in data['results'])
+
+    @pytest.mark.django_db
+    def test_04_errors_and_writes(self, admin_client, dataset):
+        response = admin_client.get('/api/v1/titles/?fields=id,secret')
+        assert response.status_code == 400
+        assert 'secret' in response.json()['fields']
+        response = admin_client.get('/api/v1/genres/?omit=id')
+        assert response.status_code == 400, (
+            'Поле, которого нет в ответе, тоже неизвестно'
+        )
+        response = admin_client.post('/api/v1/genres/?fields=slug', data={
+            'name': 'Новый', 'slug': 'new-genre',
+        })
+        assert response.status_code == 201
+        assert response.json() == {'name': 'Новый', 'slug': 'new-genre'}, (
+            'На запись параметр fields не действует'
+        )
+
+    @pytest.mark.django_db
+    def test_05_conditional_and_cache(self, client, dataset):
+        url = '/api/v1/titles/?fields=id'
+        response = client.get(url)
+        etag = response['ETag']
+        assert client.get('/api/v1/titles/')['ETag'] != etag
+        assert client.get(
+            url, HTTP_IF_NONE_MATCH=etag
+        ).status_code == 304
+        full = client.get('/api/v1/titles/').json()
+        assert set(full['results'][0]) != {'id'}, (
+            'Урезанный ответ не должен попадать в кеш полного'
+        )
@@ -0,0 +1,107 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api import fast
+from reviews.models import Category, Genre, Review, Title
+
+NO_CACHE = {'ENABLED': False}
+
+
+@pytest.fixture
+def dataset(db):
+    call_command(
+        'generate_dataset', users=10, titles=30, reviews=120, comments=120,
+        seed=1, stdout=StringIO()
+    )
+    # Пограничные случаи: без категории, жанров и рейтинга.
+    Title.objects.create(name='Сирота', year=1999, description='')
+    Genre.objects.create(name='Пустой', slug='empty')
+    Category.objects.create(name='Пустая', slug='empty')
+    return Review.objects.filter(comments__isnull=False).first()
+
+
+def get_urls(review):
+    titles = '/api/v1/titles/'
+    reviews = f'{titles}{review.title_id}/reviews/'
+    comments = f'{reviews}{review.pk}/comments/'
+    category = Category.objects.exclude(slug='empty').first().slug
+    genre = Genre.objects.exclude(slug='empty').first().slug
+    return [
+        titles,
+        f'{titles}?page_size=500',
+        f'{titles}?page=2&page_size=7',
+        f'{titles}?cursor=&page_size=9',
+        f'{titles}?genre={genre}&category={category}',
+        f'{titles}?search=мир',
+        f'{titles}?name=zzz',
+        f'{reviews}?page_size=500',
+        f'{reviews}?cursor=',
+        f'{comments}?page_size=500',
+        f'{comments}?cursor=&page_size=2',
+        '/api/v1/genres/?page_size=500',
+        '/api/v1/genres/?search=Пуст',
+        '/api/v1/categories/?page_size=500',
+    ]
+
+
+def fetch(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200, (url, response.content)
+    return response, len(context.captured_queries)
+
+
+class Test32FastLists:
+
+    @pytest.mark.django_db
+    @override_settings(API_RESPONSE_CACHE=NO_CACHE)
+    def test_01_byte_identical(self, client, dataset, monkeypatch):
+        urls = get_urls(dataset)
+        fast_responses = [fetch(client, url) for url in urls]
+        monkeypatch.setattr(
+            fast.FastListMixin, 'use_fast_path', lambda self: False
+        )
+        for url, (response, queries) in zip(urls, fast_responses):
+            expected, expected_queries = fetch(client, url)
+            assert response.content == expected.content, (
+                f'{url}: быстрый путь должен отдавать те же байты, '
+                f'что и сериализатор'
+            )
+            assert response['ETag'] == expected['ETag'], url
+            assert queries <= expected_queries, url
+
+    @pytest.mark.django_db
+    @override_settings(API_RESPONSE_CACHE=NO_CACHE)
+    def test_02_fallback(self, client, dataset, monkeypatch):
+        calls = []
+        original = fast.RowSerializer.serialize
+        monkeypatch.setattr(
+            fast.RowSerializer, 'serialize',
+            lambda self, rows: calls.append(1) or original(self, rows)
+        )
+        client.get('/api/v1/titles/')
+        assert calls, 'Списки должны собираться быстрым путем'
+        calls.clear()
+        response = client.get('/api/v1/titles/?fields=id,name')
+        assert set(response.json()['results'][0]) == {'id', 'name'}
+        response = client.get(f'/api/v1/titles/{dataset.title_id}/')
+        assert response.status_code == 200
+        assert not calls, (
+            'С fields/omit и для отдельного объекта работает сериализатор'
+        )
+
+    def test_03_plans(self):
+        from api import serializers as s
+        for serializer_class in (
+            s.TitleListSerializer, s.ReviewSerializer, s.CommentSerializer,
+            s.GenreSerializer, s.CategorySerializer,
+        ):
+            assert fast.compile_serializer(serializer_class).plan.items
+        plan = fast.compile_serializer(s.TitleListSerializer).plan
+        assert 'category__slug' in plan.lookups
+        assert plan.many[0].ordering == ['-title_id', '-genre_id']